@@ -4,21 +4,25 @@ from typing import List, Dict, Any
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+from rule_miner import combined_score
+from rule_ast import canonical_rule
+from results_store import load_results as load_verification_results
 
 def load_results(rules_file: str, verification_file: str) -> List[Dict]:
     """Load synthesized rules and their verification results"""
     with open(rules_file, "r") as f:
         rules = json.load(f)
     
-    with open(verification_file, "r") as f:
-        verification_results = json.load(f)
+    verification_results = load_verification_results(verification_file)
     
-    # Combine results
+    # Combine results, matching rules by canonical form since verification
+    # skips duplicates
+    satisfaction = {canonical_rule(rule): score for rule, score in rules}
     results = []
-    for rule, verification in zip(rules, verification_results):
+    for verification in verification_results:
         result = {
             "rule": verification["rule"],
-            "satisfaction_score": rule[1],
+            "satisfaction_score": satisfaction.get(canonical_rule(verification["rule"]), 0.0),
             "consistency_score": verification["overall_consistency"],
             "counterexamples": len(verification["counterexamples"]),
             "num_scenes": len(verification["consistency_scores"]),
@@ -33,8 +37,7 @@ def rank_rules(results: List[Dict]) -> List[Dict]:
     # Calculate combined score (weighted average)
     for result in results:
         # Weight satisfaction and consistency equally
-        combined_score = (result["satisfaction_score"] + result["consistency_score"]) / 2
-        result["combined_score"] = combined_score
+        result["combined_score"] = combined_score(result["satisfaction_score"], result["consistency_score"])
     
     # Sort by combined score
     results.sort(key=lambda x: x["combined_score"], reverse=True)
@@ -1,7 +1,26 @@
 import json
 import os
+import argparse
 import torch
 import ltn
+from data_utils_clevr import (pad_scene_features, iter_scene_batches, gather_scene_batch,
+                              attribute_one_hots, scene_object_index, scene_pairs,
+                              AttributePredicate, RelationPredicate)
+from export_torchscript import script_module, artifact_path, save_artifact, report, ATOL, INT8_ATOL
+from spatial_relations import RELATION_NAMES, pad_relation_tensors
+
+parser = argparse.ArgumentParser(description="Train the Rubber predicate on Rubber(x) & Metal(y) & LeftOf(x, y)")
+parser.add_argument("--epochs", type=int, default=5)
+parser.add_argument("--batch-size", type=int, default=64, help="Scenes per batch")
+parser.add_argument("--accum-steps", type=int, default=1, help="Batches per optimizer step")
+parser.add_argument("--no-shuffle", action="store_true", help="Visit scenes in file order")
+parser.add_argument("--lr", type=float, default=0.01)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--scripted", action="store_true",
+                    help="Also evaluate the rule with a TorchScript artifact of the trained Rubber net")
+parser.add_argument("--quantize", action="store_true",
+                    help="int8 dynamic quantization of the TorchScript artifact")
+args = parser.parse_args()
 
 # Load CLEVR validation scenes. The CLEVR dataset location can be provided via
 # the CLEVR_DIR environment variable. By default we look for a local
@@ -11,90 +30,96 @@ scenes_path = os.path.join(clevr_dir, "scenes", "CLEVR_val_scenes.json")
 with open(scenes_path, "r") as f:
     data = json.load(f)
 
+# Per-object x-coordinates padded once to [S, Nmax, 1], one-hot tables of the
+# ground-truth color/shape/size/material and the [S, Nmax, Nmax] left-of
+# matrices from the CLEVR relationships. Scenes with fewer than two objects
+# have no pairs and are dropped.
+scenes = [scene for scene in data['scenes'] if len(scene['objects']) >= 2]
+features, mask = pad_scene_features(scenes, lambda obj: [obj['3d_coords'][0]])
+one_hots = attribute_one_hots(scenes)
+left_of = pad_relation_tensors(scenes)[:, RELATION_NAMES.index("is_left_of")]
+
 class RubberModelLearnable(torch.nn.Module):
     def __init__(self):
         super().__init__()
         self.fc = torch.nn.Linear(1, 1)
 
-    def forward(self, x, idx):
-        # Safely get the index
-        i = idx.value.item() if hasattr(idx, "value") else idx.item()
-
-        # Ensure x[i] is [1] and convert to shape [1, 1]
-        x_i = x[i].unsqueeze(0)  # [1, 1]
-
-        # Pass through linear layer
-        out = self.fc(x_i)       # [1, 1]
-
-        # Apply sigmoid and squeeze to scalar
-        return torch.sigmoid(out).squeeze()  # shape: []
-
-
+    def forward(self, x):
+        # x: [..., 3] individuals (scene, object, x-coordinate) -> [...] truth values
+        return torch.sigmoid(self.fc(x[..., 2:])).squeeze(-1)
 
 
-# Fixed metal predicate
-class MetalModel(torch.nn.Module):
-    def forward(self, x, idx):
-        return torch.tensor([
-            1.0 if materials[i.item()] == 'metal' else 0.0 for i in idx
-        ], dtype=torch.float32)
-
-# Spatial predicate: is_left(x1, x2)
-class LeftOfModel(torch.nn.Module):
-    def forward(self, x1, x2):
-        return (x1 < x2).float()
-
+torch.manual_seed(args.seed)
 Rubber = ltn.Predicate(RubberModelLearnable())
-Metal = ltn.Predicate(MetalModel())
-LeftOf = ltn.Predicate(LeftOfModel())
-
-optimizer = torch.optim.Adam(Rubber.parameters(), lr=0.01)
-epochs = 5
-
-for epoch in range(epochs):
-    total_loss = 0
-    truth_vals = []
-
-    for scene in data['scenes']:
-        objects = scene['objects']
-
-        features = []
-        materials = []
-
-        for obj in objects:
-            x = obj['3d_coords'][0]
-            features.append([x])
-            materials.append(obj['material'])
-
-        if len(features) < 2:
-            continue
-
-        features = torch.tensor(features, dtype=torch.float32)
-        X_data = ltn.Constant(features)
-
-        for i in range(len(features)):
-            for j in range(len(features)):
-                if i == j:
-                    continue
-
-                xi = ltn.Constant(features[i].unsqueeze(0))
-                xj = ltn.Constant(features[j].unsqueeze(0))
-                idx_i = ltn.Constant(torch.tensor(i))
-                idx_j = ltn.Constant(torch.tensor(j))
-
-                pred_rubber = Rubber(X_data, idx_i).value
-                pred_metal = Metal(X_data, idx_j).value
-                pred_left = LeftOf(xi, xj).value
-
-                implication = pred_rubber * pred_metal * pred_left
-                logic_loss = 1 - implication
-
-                total_loss += logic_loss
-                truth_vals.append(implication.item())
-
+# Fixed metal predicate: ground-truth lookup by (scene, object) index
+Metal = ltn.Predicate(AttributePredicate(one_hots, "material", "metal"))
+# Fixed spatial predicate: precomputed left_of[scene, x, y] lookup
+LeftOf = ltn.Predicate(RelationPredicate(left_of))
+
+# Product t-norm and arithmetic-mean quantifier: the satisfaction of
+# Forall x, y (x != y): Rubber(x) & Metal(y) & LeftOf(x, y) is the mean of
+# rubber_i * metal_j * left_ij over all ordered pairs of distinct objects
+# of a scene.
+And = ltn.Connective(ltn.fuzzy_ops.AndProd(stable=False))
+Forall = ltn.Quantifier(ltn.fuzzy_ops.AggregPMean(p=1, stable=False), quantifier="f")
+
+optimizer = torch.optim.Adam(Rubber.parameters(), lr=args.lr)
+generator = torch.Generator().manual_seed(args.seed)
+
+for epoch in range(args.epochs):
+    truth_sum = 0.0
+    pair_count = 0
     optimizer.zero_grad()
-    total_loss.backward()
-    optimizer.step()
 
-    avg_satisfaction = sum(truth_vals) / len(truth_vals) if truth_vals else 1.0
+    batches = list(iter_scene_batches(len(scenes), args.batch_size,
+                                      shuffle=not args.no_shuffle, generator=generator))
+    for step, batch_idx in enumerate(batches):
+        x, valid = gather_scene_batch(features, mask, batch_idx)        # [B, N, 1], [B, N]
+        first, second = scene_pairs(x, valid, batch_idx)                # [P, 3] each
+
+        # Only the distinct pairs within each scene are grounded (P = sum of
+        # N_s * (N_s - 1)); ltn.diag pairs row p of x with row p of y instead
+        # of broadcasting to every pair of objects across the batch.
+        o1, o2 = ltn.diag(ltn.Variable("x", first), ltn.Variable("y", second))
+        rule = And(And(Rubber(o1), Metal(o2)), LeftOf(o1, o2))
+        sat = Forall([o1, o2], rule).value
+
+        loss = (1 - sat) / args.accum_steps
+        loss.backward()
+        if (step + 1) % args.accum_steps == 0 or step + 1 == len(batches):
+            optimizer.step()
+            optimizer.zero_grad()
+
+        num_pairs = len(first)
+        truth_sum += sat.item() * num_pairs
+        pair_count += num_pairs
+
+    avg_satisfaction = truth_sum / pair_count if pair_count else 1.0
     print(f"Epoch {epoch+1}: Logic Satisfaction = {avg_satisfaction:.4f}")
+
+def rule_satisfaction(rubber_model):
+    """Satisfaction of the rule over all scenes with ``rubber_model`` as Rubber"""
+    RubberEval = ltn.Predicate(rubber_model)
+    truth_sum, pair_count = 0.0, 0
+    with torch.no_grad():
+        for batch_idx in iter_scene_batches(len(scenes), args.batch_size, shuffle=False):
+            x, valid = gather_scene_batch(features, mask, batch_idx)
+            first, second = scene_pairs(x, valid, batch_idx)
+            o1, o2 = ltn.diag(ltn.Variable("x", first), ltn.Variable("y", second))
+            sat = Forall([o1, o2], And(And(RubberEval(o1), Metal(o2)), LeftOf(o1, o2))).value
+            truth_sum += sat.item() * len(first)
+            pair_count += len(first)
+    return truth_sum / pair_count if pair_count else 1.0
+
+if args.scripted:
+    # Script the trained Rubber net and evaluate the rule with both versions
+    rubber_model = Rubber.model.eval()
+    individuals = torch.cat([scene_object_index(torch.arange(len(scenes)), features.shape[1]).float(),
+                             features], dim=-1)[mask]  # [num_objects, 3]
+    path = artifact_path(".", "rubber_model_scripted.pt", args.quantize)
+    save_artifact(script_module(rubber_model, individuals, args.quantize), path, {"quantized": args.quantize})
+    scripted = torch.jit.load(path)
+    label = "int8 TorchScript" if args.quantize else "TorchScript"
+    print(f"Logic Satisfaction (eager Rubber): {rule_satisfaction(rubber_model):.4f}")
+    print(f"Logic Satisfaction ({label} Rubber): {rule_satisfaction(scripted):.4f}")
+    report(path, rubber_model, scripted, individuals, INT8_ATOL if args.quantize else ATOL)
@@ -2,6 +2,14 @@
 import json
 import torch
 
+# Attribute vocabularies of CLEVR (properties.json order)
+CLEVR_ATTRIBUTE_VALUES = {
+    "color":    ["gray", "red", "blue", "green", "brown", "purple", "cyan", "yellow"],
+    "shape":    ["cube", "sphere", "cylinder"],
+    "size":     ["large", "small"],
+    "material": ["rubber", "metal"],
+}
+
 def load_clevr_scenes(json_path):
     """
     Returns a list of scene dictionaries as given in CLEVR_val_scenes.json
@@ -31,3 +39,119 @@ def extract_object_data_for_scene(scene):
         obj_list.append((feat, labels))
     return obj_list
 
+
+def pad_scene_features(scenes, feature_fn):
+    """
+    Stack per-object features of all scenes into one zero-padded tensor, once.
+    feature_fn(obj) -> list of F floats for one CLEVR object.
+    Returns:
+      - features: torch.Tensor of shape [S, Nmax, F]
+      - mask:     torch.BoolTensor of shape [S, Nmax], True for real objects
+    """
+    num_feats = len(feature_fn(scenes[0]["objects"][0])) if scenes and scenes[0]["objects"] else 0
+    max_objects = max((len(scene["objects"]) for scene in scenes), default=0)
+    features = torch.zeros(len(scenes), max_objects, num_feats, dtype=torch.float32)
+    mask = torch.zeros(len(scenes), max_objects, dtype=torch.bool)
+    for s, scene in enumerate(scenes):
+        objs = scene["objects"]
+        if objs:
+            features[s, :len(objs)] = torch.tensor([feature_fn(obj) for obj in objs], dtype=torch.float32)
+            mask[s, :len(objs)] = True
+    return features, mask
+
+def iter_scene_batches(num_scenes, batch_size, shuffle=True, generator=None):
+    """
+    Yield LongTensors of scene indices, batch_size at a time.
+    With shuffle=True the order is redrawn on every call (one call per epoch).
+    """
+    order = torch.randperm(num_scenes, generator=generator) if shuffle else torch.arange(num_scenes)
+    for start in range(0, num_scenes, batch_size):
+        yield order[start:start + batch_size]
+
+def gather_scene_batch(features, mask, batch_idx):
+    """
+    Select the scenes in batch_idx and trim padding to the largest of them.
+    Returns (features [B, Nb, F], mask [B, Nb]).
+    """
+    batch_mask = mask[batch_idx]
+    n_max = int(batch_mask.sum(dim=1).max()) if len(batch_idx) else 0
+    return features[batch_idx, :n_max], batch_mask[:, :n_max]
+
+def pair_mask(mask):
+    """
+    Ordered pairs (i, j) of distinct real objects in each padded scene.
+    mask: [B, N] -> torch.BoolTensor [B, N, N]
+    """
+    n = mask.shape[1]
+    distinct = ~torch.eye(n, dtype=torch.bool, device=mask.device)
+    return mask[:, :, None] & mask[:, None, :] & distinct
+
+def attribute_one_hots(scenes, attribute_values=CLEVR_ATTRIBUTE_VALUES):
+    """
+    One-hot encode the ground-truth attributes of every object, once at load.
+    Returns {attribute: torch.Tensor [S, Nmax, K]}, zero rows on padding.
+    """
+    max_objects = max((len(scene["objects"]) for scene in scenes), default=0)
+    one_hots = {}
+    for attribute, values in attribute_values.items():
+        value2idx = {v: k for k, v in enumerate(values)}
+        table = torch.zeros(len(scenes), max_objects, len(values), dtype=torch.float32)
+        for s, scene in enumerate(scenes):
+            for o, obj in enumerate(scene["objects"]):
+                table[s, o, value2idx[obj[attribute]]] = 1.0
+        one_hots[attribute] = table
+    return one_hots
+
+def scene_object_index(batch_idx, num_objects):
+    """
+    (scene, object) index grid for a batch of scenes.
+    batch_idx: [B] scene indices -> torch.LongTensor [B, num_objects, 2]
+    """
+    scene_ids = batch_idx.view(-1, 1).expand(-1, num_objects)
+    obj_ids = torch.arange(num_objects).view(1, -1).expand(len(batch_idx), -1)
+    return torch.stack([scene_ids, obj_ids], dim=-1)
+
+def scene_pairs(features, mask, batch_idx):
+    """
+    Ordered pairs of distinct objects within each scene of a batch, laid out
+    block-diagonally: only the [B, N, N] pair_mask entries, never pairs
+    across scenes. Rows are (scene index, object index, *features) of the
+    two objects, to be paired with ltn.diag.
+    features: [B, N, F], mask: [B, N], batch_idx: [B] -> ([P, 2 + F], [P, 2 + F])
+    """
+    idx = scene_object_index(batch_idx, features.shape[1]).float()
+    rows = torch.cat([idx, features], dim=-1)  # [B, N, 2 + F]
+    b, i, j = pair_mask(mask).nonzero(as_tuple=True)
+    return rows[b, i], rows[b, j]
+
+class AttributePredicate(torch.nn.Module):
+    """
+    Ground-truth attribute predicate such as Metal(o) or Red(o), backed by a
+    precomputed one-hot table. Individuals are (scene, object) index pairs,
+    so it can be wrapped in ltn.Predicate and fed batched indices:
+    forward(idx [..., 2]) -> [...] truth values in {0, 1}.
+    """
+    def __init__(self, one_hots, attribute, value, attribute_values=CLEVR_ATTRIBUTE_VALUES):
+        super().__init__()
+        col = attribute_values[attribute].index(value)
+        self.register_buffer("table", one_hots[attribute][..., col].contiguous())  # [S, Nmax]
+
+    def forward(self, idx):
+        idx = idx.long()
+        return self.table[idx[..., 0], idx[..., 1]]
+
+class RelationPredicate(torch.nn.Module):
+    """
+    Precomputed binary spatial predicate such as LeftOf(x, y), backed by a
+    padded [S, Nmax, Nmax] relation table (see spatial_relations.py).
+    forward(idx1 [..., 2+], idx2 [..., 2+]) -> [...] truth values in {0, 1},
+    reading (scene, object) from the first two columns (scene_pairs rows
+    work as is). Both objects must be of one scene.
+    """
+    def __init__(self, relations):
+        super().__init__()
+        self.register_buffer("table", torch.as_tensor(relations, dtype=torch.float32).contiguous())
+
+    def forward(self, idx1, idx2):
+        idx1, idx2 = idx1.long(), idx2.long()
+        return self.table[idx1[..., 0], idx1[..., 1], idx2[..., 1]]
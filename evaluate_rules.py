@@ -4,20 +4,31 @@ from typing import List, Dict, Any
 import random
 import os
 from copy import deepcopy
+from rule_cache import open_rule_cache
+from rule_ast import GroundingTensor, compile_rule, dedupe_rules
+
+SATISFACTION_THRESHOLD = 0.5
 
 class RuleEvaluator:
-    def __init__(self, predicates: List[str], clevr_dir: str):
+    def __init__(self, predicates: List[str], clevr_dir: str, use_cache: bool = True):
         self.predicates = predicates
         self.clevr_dir = clevr_dir
+        self.scenes_path = os.path.join(self.clevr_dir, "scenes", "CLEVR_val_scenes.json")
         self.scenes = self._load_scenes()
+        # Predicates are read straight off the CLEVR objects; all scenes are
+        # evaluated at once, in self.scenes order
+        self.groundings = GroundingTensor.from_scenes(list(self.scenes.values()), values=lambda obj: obj)
+        self.scene_index = {scene_id: s for s, scene_id in enumerate(self.scenes)}
+        self._scene_scores = {}
+        # Dataset-wide satisfaction per rule, persisted across runs
+        self.cache = open_rule_cache(self.scenes_path) if use_cache else None
         
     def _load_scenes(self) -> Dict[str, Dict]:
         """Load and organize CLEVR scenes"""
         scenes = {}
-        scenes_dir = os.path.join(self.clevr_dir, "scenes")
         
         # Load validation scenes
-        with open(os.path.join(scenes_dir, "CLEVR_val_scenes.json"), "r") as f:
+        with open(self.scenes_path, "r") as f:
             val_data = json.load(f)
             for scene in val_data["scenes"]:
                 scenes[scene["image_filename"]] = scene
@@ -39,11 +50,12 @@ class RuleEvaluator:
             
             # Sample scenes where rule is satisfied
             satisfied_scenes = []
+            scene_ids = list(self.scenes.keys())
+            scores = self._scene_satisfaction(rule)
             for _ in range(num_samples):
-                scene_id = random.choice(list(self.scenes.keys()))
-                scene = self.scenes[scene_id]
-                if self._check_rule_satisfaction(rule, scene):
-                    satisfied_scenes.append(scene)
+                scene_id = random.choice(scene_ids)
+                if scores[self.scene_index[scene_id]]:
+                    satisfied_scenes.append(self.scenes[scene_id])
             
             # Store examples
             for scene in satisfied_scenes:
@@ -70,10 +82,8 @@ class RuleEvaluator:
             }
             
             # Find a scene that satisfies the rule
-            for scene_id, scene in self.scenes.items():
-                if self._check_rule_satisfaction(rule, scene):
-                    original_scene = scene
-                    break
+            satisfied = np.flatnonzero(self._scene_satisfaction(rule))
+            original_scene = self.scenes[list(self.scenes.keys())[satisfied[0]]]
             
             # Store original satisfaction
             rule_results["original_satisfaction"] = self._check_rule_satisfaction(rule, original_scene)
@@ -106,17 +116,15 @@ class RuleEvaluator:
                 "test_satisfaction": 0
             }
             
+            scores = self._scene_satisfaction(rule)
+            
             # Calculate satisfaction on train set
-            train_satisfaction = []
-            for scene_id in train_scenes:
-                train_satisfaction.append(self._check_rule_satisfaction(rule, self.scenes[scene_id]))
-            rule_results["train_satisfaction"] = np.mean(train_satisfaction)
+            train_idx = [self.scene_index[scene_id] for scene_id in train_scenes]
+            rule_results["train_satisfaction"] = np.mean(scores[train_idx])
             
             # Calculate satisfaction on test set
-            test_satisfaction = []
-            for scene_id in test_scenes:
-                test_satisfaction.append(self._check_rule_satisfaction(rule, self.scenes[scene_id]))
-            rule_results["test_satisfaction"] = np.mean(test_satisfaction)
+            test_idx = [self.scene_index[scene_id] for scene_id in test_scenes]
+            rule_results["test_satisfaction"] = np.mean(scores[test_idx])
             
             results.append(rule_results)
         
@@ -137,22 +145,24 @@ class RuleEvaluator:
             }
             
             # Calculate performance
-            performance = []
-            for scene in self.scenes.values():
-                performance.append(self._check_rule_satisfaction(rule, scene))
-            rule_results["performance"] = np.mean(performance)
+            rule_results["performance"] = self._dataset_satisfaction(rule)
             
             # Calculate random rule performance
             for random_rule in random_rules:
-                random_performance = []
-                for scene in self.scenes.values():
-                    random_performance.append(self._check_rule_satisfaction(random_rule, scene))
-                rule_results["random_rule_performance"].append(np.mean(random_performance))
+                rule_results["random_rule_performance"].append(self._dataset_satisfaction(random_rule))
             
             results.append(rule_results)
         
         return results
     
+    def _dataset_satisfaction(self, rule: str) -> float:
+        """Mean of _check_rule_satisfaction over all scenes, cached per rule"""
+        def compute():
+            return float(np.mean(self._scene_satisfaction(rule)))
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute("scene_satisfaction", rule, compute, threshold=SATISFACTION_THRESHOLD)
+    
     def _perturb_scene(self, scene: Dict, level: float) -> Dict:
         """Perturb scene attributes by given level"""
         perturbed_scene = deepcopy(scene)
@@ -185,35 +195,26 @@ class RuleEvaluator:
         
         return random_rules
     
+    def _scene_satisfaction(self, rule: str) -> np.ndarray:
+        """_check_rule_satisfaction of every scene in self.scenes order, memoized per rule"""
+        if rule not in self._scene_scores:
+            self._scene_scores[rule] = self._satisfied_scenes(rule, self.groundings)
+        return self._scene_scores[rule]
+    
+    @staticmethod
+    def _satisfied_scenes(rule: str, groundings: GroundingTensor) -> np.ndarray:
+        """
+        1.0 for every scene with an object that meets each of the rule's
+        predicates (predicates an object lacks are ignored), else 0.0
+        """
+        body, head, valid = compile_rule(rule).holds(groundings, SATISFACTION_THRESHOLD, missing=1.0)
+        satisfied = (body & head & valid).any(axis=tuple(range(1, body.ndim)))
+        return satisfied.astype(np.float64)
+    
     def _check_rule_satisfaction(self, rule: str, scene: Dict) -> float:
         """Check if a rule is satisfied in a scene"""
-        if "<-" in rule:
-            head, body = rule.split("<-")
-        else:
-            head, body = rule.split("\u2190")
-        head = head.strip()
-        body = body.strip()
-        
-        # Get predicate names
-        predicates = set()
-        parts = body.split("&") if "&" in body else body.split("\u2227")
-        for part in [head] + parts:
-            pred_name, _ = part.split("(")
-            predicates.add(pred_name.strip())
-        
-        # Check each object
-        for obj in scene["objects"]:
-            satisfies = True
-            for pred in predicates:
-                if pred in obj:
-                    if obj[pred] < 0.5:  # threshold for satisfaction
-                        satisfies = False
-                        break
-            
-            if satisfies:
-                return 1.0
-        
-        return 0.0
+        groundings = GroundingTensor.from_scenes([scene], values=lambda obj: obj)
+        return float(self._satisfied_scenes(rule, groundings)[0])
 
 def evaluate_rules(rules_file: str, clevr_dir: str, output_dir: str):
     """Main evaluation function"""
@@ -231,7 +232,7 @@ def evaluate_rules(rules_file: str, clevr_dir: str, output_dir: str):
     
     # Load rules
     with open(rules_file, "r") as f:
-        rules = [rule["rule"] for rule in json.load(f)]
+        rules = dedupe_rules([rule["rule"] for rule in json.load(f)])
     
     # Evaluate interpretability
     print("\n=== Evaluating Interpretability ===")
@@ -257,6 +258,9 @@ def evaluate_rules(rules_file: str, clevr_dir: str, output_dir: str):
     with open(os.path.join(output_dir, "baseline_results.json"), "w") as f:
         json.dump(baseline, f, indent=2)
     
+    if evaluator.cache is not None:
+        evaluator.cache.close()
+    
     print("\n=== Evaluation Summary ===")
     print(f"Results saved to: {output_dir}")
     print("\nTop 5 rules analysis:")
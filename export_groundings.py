@@ -1,118 +1,297 @@
 import os
 import sys
+import argparse
+import math
+import tempfile
+import multiprocessing
 import torch
 import json
+import numpy as np
 
 # Add root directory (LTN/) to Python path
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(ROOT_DIR)
 
 # ─── Import predicate network definitions ────────────────────────────────────
-from models.color_net import ColorNet
-from models.size_net import SizeNet
-from models.material_net import MaterialNet
-from models.shape_net import ShapeNet
+from predicate_nets import MODEL_DIR, load_fused_predicate_net
+from export_torchscript import load_scripted_predicate_net
 
 # ─── Import CLEVR data loading utilities ────────────────────────────────────
 from data_utils_clevr import load_clevr_scenes, extract_object_data_for_scene
+from grounding_store import write_grounding_store
+from spatial_relations import write_relation_store
+from grounding_cache import GroundingCache, model_fingerprint, scene_hash
 
 # ─── Configuration ──────────────────────────────────────────────────────────
-MODEL_DIR = "models/"
 # Allow overriding the CLEVR dataset path via the CLEVR_DIR environment
 # variable. This makes the script portable across operating systems.
 CLEVR_DIR = os.getenv("CLEVR_DIR", "CLEVR_v1.0")
 SCENES_JSON = os.path.join(CLEVR_DIR, "scenes", "CLEVR_val_scenes.json")
 OUT_DIR = "data/groundings/"
+STORE_DIR = "data/groundings_store/"
+CACHE_DIR = "data/groundings_cache/"
+BATCH_SIZE = 4096  # Objects per forward pass; 1 reproduces per-object export
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# ─── Load trained predicate networks ────────────────────────────────────────
-# ─── Load trained predicate networks ────────────────────────────────────────
 
-#  Load full ColorNet model object
-color_net = ColorNet().to(device)
-color_net.load_state_dict(torch.load(os.path.join(MODEL_DIR, "color_net.pt")))
-color_net.eval()
+# ─── Batched inference ──────────────────────────────────────────────────────
+def net_device(net):
+    """Device of the net's parameters (TorchScript/quantized nets run on CPU)"""
+    params = list(net.parameters())
+    return params[0].device if params else torch.device("cpu")
 
 
-# Load other models as state_dicts
-shape_net = ShapeNet().to(device)
-shape_net.load_state_dict(torch.load(os.path.join(MODEL_DIR, "shape_net.pt")))
-shape_net.eval()
+def predict_truth_matrix(net, feats, batch_size=BATCH_SIZE, device=None):
+    """
+    Run the fused predicate net once per batch of object features.
+    feats: float32 tensor [N, 3] of 3d_coords.
+    Returns a float32 array [N, num_predicates] in ``net.predicate_names`` order.
+    """
+    if device is None:
+        device = net_device(net)
+    chunks = []
+    with torch.no_grad():
+        for start in range(0, feats.shape[0], batch_size):
+            x = feats[start:start + batch_size].to(device)
+            chunks.append(net(x).cpu())
+    if not chunks:
+        return np.zeros((0, len(net.predicate_names)), dtype=np.float32)
+    return torch.cat(chunks).numpy().astype(np.float32, copy=False)
 
-size_net = SizeNet().to(device)
-size_net.load_state_dict(torch.load(os.path.join(MODEL_DIR, "size_net.pt")))
-size_net.eval()
 
-material_net = MaterialNet().to(device)
-material_net.load_state_dict(torch.load(os.path.join(MODEL_DIR, "material_net.pt")))
-material_net.eval()
+def stack_scene_features(scenes):
+    """
+    Stack every object's 3d_coords into one [N, 3] tensor.
+    Returns (features, scene_offsets) where scene i owns rows
+    scene_offsets[i]:scene_offsets[i + 1].
+    """
+    feats = []
+    scene_offsets = [0]
+    for scene in scenes:
+        obj_data = extract_object_data_for_scene(scene)
+        feats.extend(feat_tensor for feat_tensor, _ in obj_data)
+        scene_offsets.append(len(feats))
+    features = torch.stack(feats) if feats else torch.zeros((0, 3), dtype=torch.float32)
+    return features, np.asarray(scene_offsets, dtype=np.int64)
 
 
-# ─── Build reverse lookup maps for labels ───────────────────────────────────
-idx2color = {v: k for k, v in color_net.color2idx.items()}
-idx2shape = {v: k for k, v in shape_net.shape2idx.items()}
-idx2size  = {v: k for k, v in size_net.size2idx.items()}
-idx2mat   = {v: k for k, v in material_net.mat2idx.items()}
+# ─── Multi-process sharded inference ────────────────────────────────────────
+_worker_net = None
 
-# ─── Load CLEVR scenes ──────────────────────────────────────────────────────
-all_scenes = load_clevr_scenes(SCENES_JSON)
 
-# ─── Export groundings for each scene ───────────────────────────────────────
-for scene_idx, scene in enumerate(all_scenes):
-    obj_data = extract_object_data_for_scene(scene)
-    scene_objects = []
+def _init_export_worker(model_dir, num_threads, scripted_path=None):
+    """Pool initializer: pin intra-op threads and load the net once per worker"""
+    global _worker_net
+    torch.set_num_threads(num_threads)
+    if scripted_path:
+        _worker_net = load_scripted_predicate_net(scripted_path)
+    else:
+        _worker_net = load_fused_predicate_net(model_dir, torch.device("cpu"))
+
+
+def _export_shard(task):
+    """Ground one shard of object rows and save it as ``shard_path``"""
+    shard_path, scenes, skip_rows, num_rows, batch_size = task
+    features, _ = stack_scene_features(scenes)
+    features = features[skip_rows:skip_rows + num_rows]
+    truth = predict_truth_matrix(_worker_net, features, batch_size=batch_size,
+                                 device=torch.device("cpu"))
+    np.save(shard_path, truth)
+    return shard_path
+
+
+def predict_truth_matrix_sharded(scenes, workers, batch_size=BATCH_SIZE,
+                                 threads_per_worker=None, model_dir=MODEL_DIR, scripted_path=None):
+    """
+    Ground ``scenes`` across a pool of ``workers`` processes.
+    Shards are cut on batch boundaries of the global object-row order, so every
+    forward pass sees exactly the rows it would see in the serial path, and
+    the shards are merged back in shard order.
+    Returns a float32 array [N, num_predicates].
+    """
+    counts = [len(scene["objects"]) for scene in scenes]
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    total = int(offsets[-1])
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    num_batches = math.ceil(total / batch_size)
+    rows_per_shard = max(1, math.ceil(num_batches / workers)) * batch_size
+
+    with tempfile.TemporaryDirectory(prefix="export_shards_") as shard_dir:
+        tasks = []
+        for shard_idx, row_start in enumerate(range(0, total, rows_per_shard)):
+            row_end = min(row_start + rows_per_shard, total)
+            # Scenes overlapping [row_start, row_end); a scene straddling a
+            # shard boundary is read by both neighbouring shards.
+            first = int(np.searchsorted(offsets, row_start, side="right")) - 1
+            last = int(np.searchsorted(offsets, row_end, side="left"))
+            shard_path = os.path.join(shard_dir, f"shard_{shard_idx:05d}.npy")
+            tasks.append((shard_path, scenes[first:last], row_start - int(offsets[first]),
+                          row_end - row_start, batch_size))
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_export_worker,
+                      initargs=(model_dir, threads_per_worker, scripted_path)) as pool:
+            shard_paths = pool.map(_export_shard, tasks)
+
+        return np.concatenate([np.load(path) for path in shard_paths])
+
+
+def predict_scenes(scenes, features, net, batch_size=BATCH_SIZE, workers=1, threads_per_worker=None):
+    """Truth matrix for the stacked ``features`` of ``scenes``, serial or sharded"""
+    if workers > 1 and features.shape[0] > 0:
+        return predict_truth_matrix_sharded(scenes, workers, batch_size, threads_per_worker,
+                                            scripted_path=getattr(net, "path", None))
+    return predict_truth_matrix(net, features, batch_size=batch_size)
+
+
+def compute_groundings(scenes, net, batch_size=BATCH_SIZE, workers=1, threads_per_worker=None):
+    """
+    Ground all scenes in a single batched pass.
+    Returns (names, truth [N, P], positions [N, 3], scene_offsets [S + 1]).
+    """
+    features, scene_offsets = stack_scene_features(scenes)
+    truth = predict_scenes(scenes, features, net, batch_size, workers, threads_per_worker)
+    return net.predicate_names, truth, features.numpy(), scene_offsets
+
+
+def compute_groundings_cached(scenes, net, cache, batch_size=BATCH_SIZE, workers=1,
+                              threads_per_worker=None):
+    """
+    Like ``compute_groundings`` but only runs the nets on scenes whose content
+    hash is not in ``cache``; newly computed rows are added to the cache.
+    Returns (names, truth, positions, scene_offsets, hashes, changed) where
+    ``changed`` lists the indices of the scenes that had to be recomputed.
+    """
+    features, scene_offsets = stack_scene_features(scenes)
+    hashes = [scene_hash(scene) for scene in scenes]
+    changed = [i for i, key in enumerate(hashes) if key not in cache]
+
+    if changed:
+        rows = np.concatenate([np.arange(scene_offsets[i], scene_offsets[i + 1]) for i in changed])
+        new_truth = predict_scenes([scenes[i] for i in changed], features[torch.as_tensor(rows)],
+                                   net, batch_size, workers, threads_per_worker)
+        start = 0
+        for i in changed:
+            count = scene_offsets[i + 1] - scene_offsets[i]
+            cache.put(hashes[i], new_truth[start:start + count])
+            start += count
 
-    for obj_idx, (feat_tensor, _) in enumerate(obj_data):
-        x = feat_tensor.unsqueeze(0).to(device)  # Shape: [1, 3]
-
-        with torch.no_grad():
-            p_color = color_net(x)[0].cpu().tolist()
-            p_shape = shape_net(x)[0].cpu().tolist()
-            p_size  = size_net(x)[0].cpu().tolist()
-            p_mat   = material_net(x)[0].cpu().tolist()
-
-        # Build flat predicate dictionary (15 predicates total)
-        predicates = {}
-
-        # Add color predicates: is_red, is_blue, ...
-        for idx, prob in enumerate(p_color):
-            color_name = idx2color[idx]
-            predicates[f"is_{color_name}"] = prob
-
-        # Add shape predicates: is_cube, is_sphere, ...
-        for idx, prob in enumerate(p_shape):
-            shape_name = idx2shape[idx]
-            predicates[f"is_{shape_name}"] = prob
-
-        # Add size predicates: is_small, is_large
-        for idx, prob in enumerate(p_size):
-            size_name = idx2size[idx]
-            predicates[f"is_{size_name}"] = prob
-
-        # Add material predicates: is_rubber, is_metal
-        for idx, prob in enumerate(p_mat):
-            mat_name = idx2mat[idx]
-            predicates[f"is_{mat_name}"] = prob
-
-        # Build object entry
-        obj_entry = {
-            "idx": obj_idx,                     # Object ID within the scene
-            "position": feat_tensor.tolist(),   # Coordinates: [x, y, z]
-            "predicates": predicates            # Dict of 15 soft-truth values
-        }
-        scene_objects.append(obj_entry)
-
-    # Build the final scene grounding dictionary
-    scene_dict = {
-        "scene_id": scene_idx,
+    names = net.predicate_names
+    if scenes:
+        truth = np.concatenate([cache.get(key) for key in hashes])
+    else:
+        truth = np.zeros((0, len(names)), dtype=np.float32)
+    return names, truth, features.numpy(), scene_offsets, hashes, changed
+
+
+def build_scene_dict(scene_id, names, truth, positions):
+    """Build one scene grounding dictionary from its rows of the matrices"""
+    scene_objects = []
+    for obj_idx, (row, position) in enumerate(zip(truth.tolist(), positions.tolist())):
+        scene_objects.append({
+            "idx": obj_idx,                          # Object ID within the scene
+            "position": position,                    # Coordinates: [x, y, z]
+            "predicates": dict(zip(names, row))      # Dict of 15 soft-truth values
+        })
+    return {
+        "scene_id": scene_id,
         "objects": scene_objects
     }
 
-    # Save as JSON file
-    out_path = os.path.join(OUT_DIR, f"scene_{scene_idx:04d}.json")
-    with open(out_path, "w") as fp:
-        json.dump(scene_dict, fp, indent=2)
 
-    print(f"✓ Exported scene {scene_idx:04d} -> {out_path}")
+# ─── Writers ────────────────────────────────────────────────────────────────
+def write_json_groundings(out_dir, scene_ids, names, truth, positions, scene_offsets, only=None):
+    """
+    Save one scene_XXXX.json per scene (the original layout).
+    If ``only`` is given, just the scenes at those indices are (re)written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for i, scene_id in enumerate(scene_ids):
+        if only is not None and i not in only:
+            continue
+        rows = slice(scene_offsets[i], scene_offsets[i + 1])
+        scene_dict = build_scene_dict(scene_id, names, truth[rows], positions[rows])
+
+        out_path = os.path.join(out_dir, f"scene_{scene_id:04d}.json")
+        with open(out_path, "w") as fp:
+            json.dump(scene_dict, fp, indent=2)
+
+        print(f"✓ Exported scene {scene_id:04d} -> {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export predicate groundings for CLEVR scenes")
+    parser.add_argument("--scenes", default=SCENES_JSON, help="CLEVR scenes JSON file")
+    parser.add_argument("--out-dir", default=None,
+                        help=f"Output directory (default: {OUT_DIR} for json, {STORE_DIR} for store)")
+    parser.add_argument("--format", choices=["json", "store"], default="json",
+                        help="Per-scene JSON files or a columnar grounding store")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Objects per forward pass of each predicate net")
+    parser.add_argument("--cache-dir", default=CACHE_DIR,
+                        help="Content-hashed cache of previously exported scenes")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute and rewrite every scene")
+    parser.add_argument("--scripted", default=None, metavar="PATH",
+                        help="Use a TorchScript artifact from export_torchscript.py (CPU)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Shard inference across this many processes (CPU)")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="torch.set_num_threads per worker (default: cores // workers)")
+    args = parser.parse_args()
+
+    if args.scripted:
+        net = load_scripted_predicate_net(args.scripted)
+    else:
+        net = load_fused_predicate_net(device=device)
+
+    # ─── Load CLEVR scenes ──────────────────────────────────────────────────
+    all_scenes = load_clevr_scenes(args.scenes)
+    scene_ids = list(range(len(all_scenes)))
+
+    # ─── Export groundings for all scenes ───────────────────────────────────
+    if args.no_cache:
+        names, truth, positions, scene_offsets = compute_groundings(
+            all_scenes, net, args.batch_size, args.workers, args.threads_per_worker)
+    else:
+        cache = GroundingCache(args.cache_dir, model_fingerprint(net), net.predicate_names)
+        if cache.evicted:
+            print(f"Model weights changed: evicted {cache.evicted} cached scenes")
+        names, truth, positions, scene_offsets, hashes, changed = compute_groundings_cached(
+            all_scenes, net, cache, args.batch_size, args.workers, args.threads_per_worker)
+        print(f"Recomputed {len(changed)}/{len(all_scenes)} scenes ({len(all_scenes) - len(changed)} cached)")
+
+    if args.format == "store":
+        out_dir = args.out_dir or STORE_DIR
+        write_grounding_store(out_dir, names, truth, positions, scene_offsets, scene_ids)
+    else:
+        out_dir = args.out_dir or OUT_DIR
+        only = None
+        if not args.no_cache:
+            # Rewrite a file only if its scene changed since it was last written.
+            only = set()
+            written = {}
+            recomputed = set(changed)
+            for i, scene_id in enumerate(scene_ids):
+                filename = f"scene_{scene_id:04d}.json"
+                if (i in recomputed or cache.written.get(filename) != hashes[i]
+                        or not os.path.exists(os.path.join(out_dir, filename))):
+                    only.add(i)
+                written[filename] = hashes[i]
+            cache.written = written
+        write_json_groundings(out_dir, scene_ids, names, truth, positions, scene_offsets, only=only)
+
+    # Pairwise left/right/front/behind matrices from the CLEVR relationships,
+    # written next to the groundings for training, synthesis and verification.
+    write_relation_store(out_dir, all_scenes)
+
+    if not args.no_cache:
+        cache.save(keep=hashes)
+
+    print(f"\n All {len(all_scenes)} scenes exported successfully to {out_dir}")
+
 
-print(f"\n All {len(all_scenes)} scenes exported successfully to {OUT_DIR}")
+if __name__ == "__main__":
+    main()
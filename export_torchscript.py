@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import torch
+from torch import nn
+
+# Add root directory (LTN/) to Python path
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT_DIR)
+
+# ─── Configuration ──────────────────────────────────────────────────────────
+MODEL_DIR = "models/"
+SCRIPTED_DIR = os.path.join(MODEL_DIR, "scripted")
+PREDICATE_ARTIFACT = "predicate_net.pt"
+LTN_ARTIFACT = "ltn_model.pt"
+INT8_SUFFIX = "_int8"      # predicate_net_int8.pt etc. for quantized artifacts
+META_FILE = "meta.json"  # Stored inside the TorchScript archive
+ATOL = 1e-4              # Parity tolerance for float32 artifacts
+INT8_ATOL = 5e-2         # int8 weights need a looser bound
+BENCH_BATCH = 4096
+BENCH_REPEATS = 20
+
+
+# ─── Scripting ──────────────────────────────────────────────────────────────
+def script_module(module, example_input, quantize=False):
+    """
+    Turn an eager module into TorchScript for CPU inference, optionally with
+    int8 dynamic quantization of its nn.Linear layers. Falls back to tracing
+    when the module's forward is not scriptable.
+    """
+    module = module.cpu().eval()
+    if quantize:
+        module = torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        try:
+            scripted = torch.jit.script(module)
+        except Exception:
+            scripted = torch.jit.trace(module, example_input)
+    return torch.jit.freeze(scripted) if not quantize else scripted
+
+
+def artifact_path(out_dir, filename, quantize=False):
+    """Path of an artifact, with INT8_SUFFIX for quantized ones"""
+    if quantize:
+        stem, ext = os.path.splitext(filename)
+        filename = f"{stem}{INT8_SUFFIX}{ext}"
+    return os.path.join(out_dir, filename)
+
+
+def save_artifact(scripted, path, meta):
+    """Save a TorchScript module with a JSON metadata record inside the archive"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.jit.save(scripted, path, _extra_files={META_FILE: json.dumps(meta)})
+
+
+class ScriptedPredicateNet(nn.Module):
+    """
+    TorchScript predicate net with the same interface as FusedPredicateNet:
+    forward([N, 3]) -> [N, 15] plus ``predicate_names``/``predicate_index``.
+    ``fingerprint`` is the sha256 of the artifact file, used by the export
+    cache in place of the (possibly quantized) state dict.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        extra_files = {META_FILE: ""}
+        self.path = path
+        self.module = torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+        self.meta = json.loads(extra_files[META_FILE])
+        self.predicate_names = self.meta["predicate_names"]
+        self.predicate_index = {name: col for col, name in enumerate(self.predicate_names)}
+        with open(path, "rb") as f:
+            self.fingerprint = hashlib.sha256(f.read()).hexdigest()
+
+    def forward(self, x):
+        return self.module(x)
+
+
+def load_scripted_predicate_net(path=os.path.join(SCRIPTED_DIR, PREDICATE_ARTIFACT)):
+    """Load an artifact written by ``export_predicate_net``"""
+    return ScriptedPredicateNet(path).eval()
+
+
+# ─── Parity and benchmarking ────────────────────────────────────────────────
+def check_parity(eager, scripted, x, atol=ATOL):
+    """Max absolute difference between eager and scripted outputs on ``x``"""
+    with torch.no_grad():
+        max_diff = (eager(x) - scripted(x)).abs().max().item()
+    return {"max_abs_diff": max_diff, "atol": atol, "passed": max_diff <= atol}
+
+
+def benchmark(module, x, repeats=BENCH_REPEATS):
+    """Median latency (ms per batch) and throughput (rows/s) of ``module(x)``"""
+    timings = []
+    with torch.no_grad():
+        module(x)  # warm-up (TorchScript optimizes on the first calls)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            module(x)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    return {"latency_ms": median * 1000.0, "throughput": x.shape[0] / median}
+
+
+def report(name, eager, scripted, x, atol=ATOL):
+    """Print parity and eager-vs-scripted latency for one artifact"""
+    parity = check_parity(eager, scripted, x, atol)
+    eager_bench = benchmark(eager, x)
+    scripted_bench = benchmark(scripted, x)
+    status = "✓" if parity["passed"] else "❌"
+    print(f"{status} {name}: max |eager - scripted| = {parity['max_abs_diff']:.2e} (atol {atol:.0e})")
+    print(f"    eager    {eager_bench['latency_ms']:8.3f} ms/batch  {eager_bench['throughput']:12.0f} rows/s")
+    print(f"    scripted {scripted_bench['latency_ms']:8.3f} ms/batch  {scripted_bench['throughput']:12.0f} rows/s")
+    return {"parity": parity, "eager": eager_bench, "scripted": scripted_bench}
+
+
+def sample_coords(n):
+    """Random 3d_coords in the CLEVR range (x, y in [-3, 3], z in [0.35, 0.7])"""
+    coords = torch.rand(n, 3)
+    coords[:, :2] = coords[:, :2] * 6.0 - 3.0
+    coords[:, 2] = coords[:, 2] * 0.35 + 0.35
+    return coords
+
+
+# ─── Export steps ───────────────────────────────────────────────────────────
+def export_predicate_net(out_dir=SCRIPTED_DIR, model_dir=MODEL_DIR, quantize=False,
+                         batch_size=BENCH_BATCH, atol=None):
+    """Script the fused predicate net, check parity and report speed"""
+    # Imported here so the scripting helpers work without the models/ package.
+    from predicate_nets import load_fused_predicate_net
+
+    atol = atol if atol is not None else (INT8_ATOL if quantize else ATOL)
+    eager = load_fused_predicate_net(model_dir)
+    x = sample_coords(batch_size)
+    scripted = script_module(eager, x, quantize=quantize)
+    path = artifact_path(out_dir, PREDICATE_ARTIFACT, quantize)
+    save_artifact(scripted, path, {"predicate_names": eager.predicate_names, "quantized": quantize})
+    result = report(path, eager, load_scripted_predicate_net(path), x, atol)
+    if not result["parity"]["passed"]:
+        raise ValueError(f"Scripted predicate net exceeds parity tolerance: {result['parity']}")
+    return path
+
+
+def export_ltn_model(out_dir=SCRIPTED_DIR, model_path="ltn_model.pt", quantize=False,
+                     batch_size=BENCH_BATCH, atol=None):
+    """Script the ltn_model.pt scorer, check parity and report speed"""
+    from predicate_nets import load_ltn_model
+
+    atol = atol if atol is not None else (INT8_ATOL if quantize else ATOL)
+    eager = load_ltn_model(model_path)
+    x = torch.rand(batch_size, eager.fc[0].in_features)
+    scripted = script_module(eager, x, quantize=quantize)
+    path = artifact_path(out_dir, LTN_ARTIFACT, quantize)
+    save_artifact(scripted, path, {"quantized": quantize})
+    result = report(path, eager, torch.jit.load(path, map_location="cpu"), x, atol)
+    if not result["parity"]["passed"]:
+        raise ValueError(f"Scripted LTN model exceeds parity tolerance: {result['parity']}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export predicate nets and ltn_model.pt to TorchScript")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--ltn-model", default="ltn_model.pt")
+    parser.add_argument("--out-dir", default=SCRIPTED_DIR)
+    parser.add_argument("--quantize", action="store_true", help="int8 dynamic quantization of nn.Linear")
+    parser.add_argument("--batch-size", type=int, default=BENCH_BATCH, help="Rows per parity/benchmark batch")
+    parser.add_argument("--atol", type=float, default=None,
+                        help=f"Parity tolerance (default: {ATOL} float32, {INT8_ATOL} int8)")
+    args = parser.parse_args()
+
+    export_predicate_net(args.out_dir, args.model_dir, args.quantize, args.batch_size, args.atol)
+    if os.path.exists(args.ltn_model):
+        export_ltn_model(args.out_dir, args.ltn_model, args.quantize, args.batch_size, args.atol)
+
+    print(f"\n TorchScript artifacts saved to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-import json
+from results_store import load_summaries
 
-with open("rule_verification_results.json", "r") as f:
-    data = json.load(f)
+# Per-rule counts, from the packed results if present, else the JSON
+data = load_summaries("rule_verification_results.json")
 
 summary_lines = [
     "# 🧠 Rule Consistency Report\n",
@@ -10,9 +10,8 @@ summary_lines = [
 ]
 
 for rule in data:
-    scores = rule["consistency_scores"]
-    if scores:
-        avg = sum(scores) / len(scores)
+    if rule["num_scores"]:
+        avg = rule["avg_score"]
         summary_lines.append(f"| `{rule['rule']}` | `{avg:.2f}` |")
 
 with open("consistency_report.md", "w") as f:
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# ─── Incremental export cache ───────────────────────────────────────────────
+# Caches the truth-matrix rows produced by export_groundings.py, keyed by a
+# content hash of each scene's objects. The whole cache is tagged with a
+# fingerprint of the predicate-net weights and is dropped when they change.
+#
+#   index.json   model fingerprint, predicate table, scene hash -> row range,
+#                and which scene hash was last written to each output file
+#   truth.npy    float32 [num_cached_objects, num_predicates]
+CACHE_VERSION = 1
+INDEX_FILE = "index.json"
+TRUTH_FILE = "truth.npy"
+
+
+def model_fingerprint(net) -> str:
+    """sha256 over the state dict of the (fused) predicate net"""
+    if getattr(net, "fingerprint", None):
+        # TorchScript artifacts carry the hash of their file.
+        return net.fingerprint
+    h = hashlib.sha256()
+    for name, tensor in sorted(net.state_dict().items()):
+        h.update(name.encode())
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+def scene_hash(scene: Dict) -> str:
+    """sha256 of a CLEVR scene's objects in canonical JSON form"""
+    payload = json.dumps(scene.get("objects", []), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class GroundingCache:
+    """Scene-hash keyed cache of grounding rows for one model fingerprint"""
+
+    def __init__(self, cache_dir: str, fingerprint: str, predicates: List[str]):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.predicates = list(predicates)
+        self.rows: Dict[str, np.ndarray] = {}
+        self.written: Dict[str, str] = {}
+        self.evicted = 0
+        self._load()
+
+    def _load(self):
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if (index.get("version") != CACHE_VERSION
+                or index.get("model") != self.fingerprint
+                or index.get("predicates") != self.predicates):
+            # Weights (or the predicate table) changed: every entry is stale.
+            self.evicted = len(index.get("scenes", {}))
+            return
+        truth = np.load(os.path.join(self.cache_dir, TRUTH_FILE))
+        for key, (start, count) in index["scenes"].items():
+            self.rows[key] = truth[start:start + count]
+        self.written = index.get("written", {})
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.rows.get(key)
+
+    def put(self, key: str, truth_rows: np.ndarray):
+        self.rows[key] = np.asarray(truth_rows, dtype=np.float32)
+
+    def save(self, keep: Optional[List[str]] = None):
+        """
+        Write the cache back to disk. If ``keep`` is given, only those scene
+        hashes are retained so entries for removed or edited scenes go away.
+        """
+        keys = list(dict.fromkeys(keep)) if keep is not None else list(self.rows)
+        keys = [k for k in keys if k in self.rows]
+        self.evicted += len(self.rows) - len(keys)
+
+        scenes = {}
+        chunks = []
+        start = 0
+        for key in keys:
+            count = self.rows[key].shape[0]
+            scenes[key] = [start, count]
+            chunks.append(self.rows[key])
+            start += count
+        truth = np.concatenate(chunks) if chunks else np.zeros((0, len(self.predicates)), dtype=np.float32)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_truth = os.path.join(self.cache_dir, f".{TRUTH_FILE}.tmp")
+        with open(tmp_truth, "wb") as f:
+            np.save(f, truth.astype(np.float32, copy=False))
+        os.replace(tmp_truth, os.path.join(self.cache_dir, TRUTH_FILE))
+
+        index = {
+            "version": CACHE_VERSION,
+            "model": self.fingerprint,
+            "predicates": self.predicates,
+            "scenes": scenes,
+            "written": self.written
+        }
+        tmp_index = os.path.join(self.cache_dir, f".{INDEX_FILE}.tmp")
+        with open(tmp_index, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_index, os.path.join(self.cache_dir, INDEX_FILE))
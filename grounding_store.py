@@ -0,0 +1,229 @@
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+# ─── On-disk layout ─────────────────────────────────────────────────────────
+# A grounding store is a directory holding a handful of flat arrays instead of
+# one JSON file per scene:
+#
+#   meta.json           predicate-name table, counts and format version
+#   truth.npy           float32 [num_objects, num_predicates] soft truth values
+#                       (NaN where an object has no value for a predicate)
+#   positions.npy       float32 [num_objects, 3] object coordinates
+#   scene_offsets.npy   int64   [num_scenes + 1] row range of every scene
+#   scene_ids.npy       int64   [num_scenes] the "scene_id" of every scene
+#
+# All arrays are opened with ``mmap_mode="r"`` so opening even the full CLEVR
+# val set only touches the pages that are actually read.
+STORE_VERSION = 1
+META_FILE = "meta.json"
+TRUTH_FILE = "truth.npy"
+POSITIONS_FILE = "positions.npy"
+OFFSETS_FILE = "scene_offsets.npy"
+SCENE_IDS_FILE = "scene_ids.npy"
+POSITION_DIM = 3
+SCENE_PREFIX = "scene_"  # Per-scene JSON files are scene_<id>.json
+
+
+def is_grounding_store(path: str) -> bool:
+    """Return True if ``path`` is a columnar grounding store directory"""
+    return os.path.isfile(os.path.join(path, META_FILE)) and \
+        os.path.isfile(os.path.join(path, TRUTH_FILE))
+
+
+class GroundingStore:
+    """Read-only, memory-mapped view over a columnar grounding store"""
+
+    def __init__(self, store_dir: str, mmap: bool = True):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_FILE), "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported grounding store version in {store_dir}: {self.meta.get('version')}")
+
+        mmap_mode = "r" if mmap else None
+        self.predicates: List[str] = list(self.meta["predicates"])
+        self.truth = np.load(os.path.join(store_dir, TRUTH_FILE), mmap_mode=mmap_mode)
+        self.positions = np.load(os.path.join(store_dir, POSITIONS_FILE), mmap_mode=mmap_mode)
+        self.scene_offsets = np.load(os.path.join(store_dir, OFFSETS_FILE), mmap_mode=mmap_mode)
+        self.scene_ids = np.load(os.path.join(store_dir, SCENE_IDS_FILE), mmap_mode=mmap_mode)
+        self._pred_index = {name: idx for idx, name in enumerate(self.predicates)}
+        self._object_scene = None
+
+    def __len__(self) -> int:
+        return len(self.scene_ids)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for scene_idx in range(len(self)):
+            yield self.scene(scene_idx)
+
+    @property
+    def num_objects(self) -> int:
+        return self.truth.shape[0]
+
+    @property
+    def object_scene(self) -> np.ndarray:
+        """Scene index of every object row, shape [num_objects]"""
+        if self._object_scene is None:
+            counts = np.diff(self.scene_offsets)
+            self._object_scene = np.repeat(np.arange(len(self), dtype=np.int64), counts)
+        return self._object_scene
+
+    def predicate_index(self, name: str) -> int:
+        """Column of ``name`` in the truth matrix"""
+        return self._pred_index[name]
+
+    def scene_slice(self, scene_idx: int) -> slice:
+        """Row range of one scene in the object-level arrays"""
+        return slice(int(self.scene_offsets[scene_idx]), int(self.scene_offsets[scene_idx + 1]))
+
+    def scene_name(self, scene_idx: int) -> str:
+        """File name the scene had in the per-scene JSON layout"""
+        return f"scene_{int(self.scene_ids[scene_idx]):04d}.json"
+
+    def scene(self, scene_idx: int) -> Dict:
+        """Rebuild one scene in the per-scene JSON schema"""
+        rows = self.scene_slice(scene_idx)
+        truth = np.asarray(self.truth[rows])
+        positions = np.asarray(self.positions[rows])
+        objects = []
+        for obj_idx in range(truth.shape[0]):
+            predicates = {
+                name: float(value)
+                for name, value in zip(self.predicates, truth[obj_idx].tolist())
+                if value == value  # skip NaN (missing predicate)
+            }
+            objects.append({
+                "idx": obj_idx,
+                "position": positions[obj_idx].tolist(),
+                "predicates": predicates
+            })
+        return {"scene_id": int(self.scene_ids[scene_idx]), "objects": objects}
+
+    def to_scene_dicts(self) -> List[Dict]:
+        """Materialize every scene in the per-scene JSON schema"""
+        return list(self)
+
+
+def _save_array(store_dir: str, filename: str, array: np.ndarray):
+    """Write one array next to its final name, then move it into place"""
+    tmp_path = os.path.join(store_dir, f".{filename}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, os.path.join(store_dir, filename))
+
+
+def write_grounding_store(store_dir: str, predicates: List[str], truth: np.ndarray,
+                          positions: np.ndarray, scene_offsets: np.ndarray,
+                          scene_ids: np.ndarray) -> str:
+    """Write already-columnar groundings to ``store_dir``"""
+    truth = np.ascontiguousarray(truth, dtype=np.float32)
+    positions = np.ascontiguousarray(positions, dtype=np.float32)
+    scene_offsets = np.ascontiguousarray(scene_offsets, dtype=np.int64)
+    scene_ids = np.ascontiguousarray(scene_ids, dtype=np.int64)
+
+    if truth.ndim != 2 or truth.shape[1] != len(predicates):
+        raise ValueError(f"truth matrix must be [num_objects, {len(predicates)}], got {list(truth.shape)}")
+    if positions.shape != (truth.shape[0], POSITION_DIM):
+        raise ValueError(f"positions must be [{truth.shape[0]}, {POSITION_DIM}], got {list(positions.shape)}")
+    if len(scene_offsets) != len(scene_ids) + 1 or scene_offsets[-1] != truth.shape[0]:
+        raise ValueError("scene_offsets must have num_scenes + 1 entries ending at num_objects")
+
+    os.makedirs(store_dir, exist_ok=True)
+    meta_path = os.path.join(store_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    _save_array(store_dir, TRUTH_FILE, truth)
+    _save_array(store_dir, POSITIONS_FILE, positions)
+    _save_array(store_dir, OFFSETS_FILE, scene_offsets)
+    _save_array(store_dir, SCENE_IDS_FILE, scene_ids)
+
+    # meta.json is written last: a store is only visible once it is complete.
+    meta = {
+        "version": STORE_VERSION,
+        "predicates": list(predicates),
+        "num_scenes": int(len(scene_ids)),
+        "num_objects": int(truth.shape[0])
+    }
+    tmp_meta = os.path.join(store_dir, f".{META_FILE}.tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, meta_path)
+    return store_dir
+
+
+def write_scenes_to_store(scenes: List[Dict], store_dir: str,
+                          predicates: Optional[List[str]] = None) -> str:
+    """Write scenes in the per-scene JSON schema to a columnar store"""
+    if predicates is None:
+        # Keep first-seen order so the table matches the exported dict order.
+        seen = {}
+        for scene in scenes:
+            for obj in scene.get("objects", []):
+                for name in obj.get("predicates", {}):
+                    seen.setdefault(name, len(seen))
+        predicates = list(seen)
+    pred_index = {name: idx for idx, name in enumerate(predicates)}
+
+    num_objects = sum(len(scene.get("objects", [])) for scene in scenes)
+    truth = np.full((num_objects, len(predicates)), np.nan, dtype=np.float32)
+    positions = np.zeros((num_objects, POSITION_DIM), dtype=np.float32)
+    scene_offsets = np.zeros(len(scenes) + 1, dtype=np.int64)
+    scene_ids = np.zeros(len(scenes), dtype=np.int64)
+
+    row = 0
+    for scene_idx, scene in enumerate(scenes):
+        scene_ids[scene_idx] = scene.get("scene_id", scene_idx)
+        for obj in scene.get("objects", []):
+            for name, value in obj.get("predicates", {}).items():
+                if name in pred_index:
+                    truth[row, pred_index[name]] = value
+            position = obj.get("position", [])[:POSITION_DIM]
+            positions[row, :len(position)] = position
+            row += 1
+        scene_offsets[scene_idx + 1] = row
+
+    return write_grounding_store(store_dir, predicates, truth, positions, scene_offsets, scene_ids)
+
+
+def json_scene_files(json_dir: str) -> List[str]:
+    """Sorted per-scene JSON file names (``scene_*.json``) in ``json_dir``"""
+    return sorted(f for f in os.listdir(json_dir) if f.startswith(SCENE_PREFIX) and f.endswith(".json"))
+
+
+def _load_json_dir(json_dir: str) -> List[Dict]:
+    """Load every per-scene JSON file in ``json_dir`` in file-name order"""
+    scenes = []
+    for filename in json_scene_files(json_dir):
+        with open(os.path.join(json_dir, filename), "r") as f:
+            scenes.append(json.load(f))
+    return scenes
+
+
+def convert_json_dir(json_dir: str, store_dir: str) -> str:
+    """Convert a directory of per-scene grounding JSON files into a store"""
+    return write_scenes_to_store(_load_json_dir(json_dir), store_dir)
+
+
+def load_grounding_scenes(path: str) -> List[Dict]:
+    """
+    Load scenes from either a grounding store or a per-scene JSON directory.
+    Kept for legacy callers that want scene dicts: a store is rebuilt scene by
+    scene here, so the miner, synthesizer and verifier read it as a matrix instead.
+    """
+    if is_grounding_store(path):
+        return GroundingStore(path).to_scene_dicts()
+    return _load_json_dir(path)
+
+
+if __name__ == "__main__":
+    # Usage: python grounding_store.py [json_dir] [store_dir]
+    json_dir = sys.argv[1] if len(sys.argv) > 1 else "data/groundings"
+    store_dir = sys.argv[2] if len(sys.argv) > 2 else "data/groundings_store"
+    convert_json_dir(json_dir, store_dir)
+    store = GroundingStore(store_dir)
+    print(f"✓ Converted {len(store)} scenes ({store.num_objects} objects, "
+          f"{len(store.predicates)} predicates) from {json_dir} -> {store_dir}")
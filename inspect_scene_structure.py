@@ -1,10 +1,11 @@
 import os
 import json
+from grounding_store import json_scene_files
 
 GROUNDINGS_DIR = "data/groundings"
 
 def inspect_structure():
-    files = [f for f in os.listdir(GROUNDINGS_DIR) if f.endswith(".json")]
+    files = json_scene_files(GROUNDINGS_DIR)
     
     print(f"Found {len(files)} JSON files in {GROUNDINGS_DIR}")
     
@@ -1,25 +1,45 @@
 from typing import Dict, List
 
 
+def left_of_matrix(scene: Dict) -> List[List[bool]]:
+    """
+    left[i][j] is True iff object i is left of object j. Taken from the CLEVR
+    ``relationships`` field when present (relationships["left"][j] lists the
+    objects left of j), otherwise from the x positions.
+    """
+    objects = scene.get("objects", [])
+    n = len(objects)
+    left = [[False] * n for _ in range(n)]
+    relationships = scene.get("relationships")
+    if relationships:
+        for j, related in enumerate(relationships.get("left", [])):
+            for i in related:
+                left[i][j] = True
+        return left
+    xs = [obj["position"][0] for obj in objects]
+    for i in range(n):
+        for j in range(n):
+            left[i][j] = xs[i] < xs[j]
+    return left
+
+
 def compute_groundings(scenes: List[Dict]) -> List[Dict]:
     """Convert scenes into simple predicate groundings."""
     groundings = []
     for scene in scenes:
         objects = scene.get("objects", [])
         scene_grounding = []
-        # compute pairwise relations
         for obj in objects:
             preds = {
                 f"color_{obj['color']}": True,
                 f"shape_{obj['shape']}": True,
             }
             scene_grounding.append({"id": obj["id"], "predicates": preds, "position": obj["position"]})
-        # add left_of relations
+        # add left_of relations from the precomputed matrix
+        left = left_of_matrix(scene)
         for i, a in enumerate(scene_grounding):
-            for b in scene_grounding[i + 1 :]:
-                if a["position"][0] < b["position"][0]:
+            for j, b in enumerate(scene_grounding):
+                if left[i][j]:
                     a.setdefault("relations", []).append({"left_of": b["id"]})
-                elif a["position"][0] > b["position"][0]:
-                    b.setdefault("relations", []).append({"left_of": a["id"]})
         groundings.append({"scene_id": scene["id"], "objects": scene_grounding})
     return groundings
@@ -1,8 +1,9 @@
 import sys
 from pathlib import Path
 
-# Allow running as a script
+# Allow running as a script; the repository root provides rule_ast
 sys.path.append(str(Path(__file__).resolve().parent))
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 import data
 import ground
@@ -1,21 +1,13 @@
 from typing import List, Dict, Tuple
 
+from rule_ast import GroundingTensor, compile_rule
+
 
 def verify_rules(rules: List[Tuple[str, float]], groundings: List[Dict]) -> List[Dict]:
     """Verify each rule across scenes."""
+    tensor = GroundingTensor.from_scenes(groundings)
     results = []
     for rule, score in rules:
-        head, body = rule.split(" <- ")
-        body_pred = body.replace("(X)", "")
-        head_pred = head.replace("(X)", "")
-        consistent = True
-        for scene in groundings:
-            for obj in scene.get("objects", []):
-                preds = obj.get("predicates", {})
-                if body_pred in preds and head_pred not in preds:
-                    consistent = False
-                    break
-            if not consistent:
-                break
+        consistent = not compile_rule(rule).violations(tensor).any()
         results.append({"rule": rule, "satisfaction": score, "consistent": consistent})
     return results
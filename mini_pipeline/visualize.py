@@ -1,15 +1,13 @@
 from typing import List, Dict
 
+from rule_ast import CompiledRule, GroundingTensor, compile_rule
+
 
 def visualize_rule(rule: str, groundings: List[Dict]) -> None:
     """Print objects satisfying the rule."""
-    head, body = rule.split(" <- ")
-    body_pred = body.replace("(X)", "")
-    head_pred = head.replace("(X)", "")
-    for scene in groundings:
-        matching = []
-        for obj in scene.get("objects", []):
-            preds = obj.get("predicates", {})
-            if body_pred in preds and head_pred in preds:
-                matching.append(obj["id"])
+    tensor = GroundingTensor.from_scenes(groundings)
+    body, head, valid = compile_rule(rule).holds(tensor)
+    satisfied = CompiledRule.per_object(body & head & valid)
+    for scene, mask in zip(groundings, satisfied):
+        matching = [obj["id"] for obj, ok in zip(scene.get("objects", []), mask) if ok]
         print(f"Scene {scene['scene_id']}: Objects {matching} satisfy '{rule}'")
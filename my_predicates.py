@@ -2,30 +2,44 @@
 import os
 import json
 import random
+import numpy as np
+from grounding_store import GroundingStore, is_grounding_store, json_scene_files, write_grounding_store
 
-GROUNDINGS_DIR = "data/groundings"
+GROUNDINGS_DIR = os.getenv("GROUNDINGS_DIR", "data/groundings")
 PREDICATES = ["is_red", "is_cube", "is_sphere", "is_large"]
 
-for filename in os.listdir(GROUNDINGS_DIR):
-    if filename.endswith(".json"):
+def sample_predicates():
+    is_cube = random.random() < 0.7  # 70% chance cube
+    is_red = is_cube and (random.random() < 0.9)  # 90% chance red if cube
+    is_sphere = not is_cube and (random.random() < 0.5)  # spheres if not cubes
+    is_large = random.random() < 0.6  # 60% chance large
+
+    return {
+        "is_red": 1.0 if is_red else 0.0,
+        "is_cube": 1.0 if is_cube else 0.0,
+        "is_sphere": 1.0 if is_sphere else 0.0,
+        "is_large": 1.0 if is_large else 0.0
+    }
+
+if is_grounding_store(GROUNDINGS_DIR):
+    # Columnar store: rebuild the truth matrix and keep the scene layout as is.
+    store = GroundingStore(GROUNDINGS_DIR, mmap=False)
+    truth = np.array(
+        [[sample_predicates()[p] for p in PREDICATES] for _ in range(store.num_objects)],
+        dtype=np.float32
+    ).reshape(store.num_objects, len(PREDICATES))
+    write_grounding_store(GROUNDINGS_DIR, PREDICATES, truth, store.positions,
+                          store.scene_offsets, store.scene_ids)
+else:
+    for filename in json_scene_files(GROUNDINGS_DIR):
         path = os.path.join(GROUNDINGS_DIR, filename)
         with open(path, "r") as f:
             data = json.load(f)
 
         for obj in data.get("objects", []):
-            is_cube = random.random() < 0.7  # 70% chance cube
-            is_red = is_cube and (random.random() < 0.9)  # 90% chance red if cube
-            is_sphere = not is_cube and (random.random() < 0.5)  # spheres if not cubes
-            is_large = random.random() < 0.6  # 60% chance large
-
-            obj["predicates"] = {
-                "is_red": 1.0 if is_red else 0.0,
-                "is_cube": 1.0 if is_cube else 0.0,
-                "is_sphere": 1.0 if is_sphere else 0.0,
-                "is_large": 1.0 if is_large else 0.0
-            }
+            obj["predicates"] = sample_predicates()
 
         with open(path, "w") as f:
             json.dump(data, f, indent=2)
 
-print("✅ Correlated predicate values written!")
\ No newline at end of file
+print("✅ Correlated predicate values written!")
@@ -1,17 +1,16 @@
-import json
 import matplotlib.pyplot as plt
+from results_store import load_summaries
 
-# Load rule verification results
-with open("rule_verification_results.json", "r") as f:
-    data = json.load(f)
+# Load per-rule counts, from the packed results if present, else the JSON
+data = load_summaries("rule_verification_results.json")
 
 # Calculate average consistency scores
 rules = [
     {
         "rule": d["rule"].replace("←", "<-"),
-        "avg_score": sum(d["consistency_scores"]) / len(d["consistency_scores"])
+        "avg_score": d["avg_score"]
     }
-    for d in data
+    for d in data if d["num_scores"]
 ]
 
 # Sort rules by consistency score
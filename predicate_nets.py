@@ -0,0 +1,111 @@
+import os
+import sys
+import torch
+from torch import nn
+
+# Add root directory (LTN/) to Python path
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT_DIR)
+
+# ─── Import predicate network definitions ────────────────────────────────────
+from models.color_net import ColorNet
+from models.size_net import SizeNet
+from models.material_net import MaterialNet
+from models.shape_net import ShapeNet
+
+MODEL_DIR = "models/"
+
+# Head order of the fused network and of every exported grounding matrix:
+# (group, net class, weights file, label2idx attribute)
+PREDICATE_HEADS = [
+    ("color", ColorNet, "color_net.pt", "color2idx"),
+    ("shape", ShapeNet, "shape_net.pt", "shape2idx"),
+    ("size", SizeNet, "size_net.pt", "size2idx"),
+    ("material", MaterialNet, "material_net.pt", "mat2idx"),
+]
+
+
+def load_predicate_nets(model_dir=MODEL_DIR, device=torch.device("cpu")):
+    """
+    Load the four predicate networks in eval mode.
+    Returns a list of (net, label2idx) pairs in PREDICATE_HEADS order.
+    """
+    nets = []
+    for _, net_cls, weights_file, label_attr in PREDICATE_HEADS:
+        net = net_cls().to(device)
+        net.load_state_dict(torch.load(os.path.join(model_dir, weights_file), map_location=device))
+        net.eval()
+        nets.append((net, getattr(net, label_attr)))
+    return nets
+
+
+def predicate_names(nets):
+    """
+    Flat predicate-name table (15 predicates total), one column per net
+    output: is_red, is_blue, ..., is_cube, ..., is_small, ..., is_rubber, ...
+    """
+    names = []
+    for _, label2idx in nets:
+        idx2label = {v: k for k, v in label2idx.items()}
+        names.extend(f"is_{idx2label[idx]}" for idx in range(len(idx2label)))
+    return names
+
+
+class FusedPredicateNet(nn.Module):
+    """
+    All four predicate nets as one module: a single forward pass over the
+    [N, 3] coordinate features returns the [N, 15] grounding matrix.
+    Column order is fixed by PREDICATE_HEADS and each net's label2idx.
+    """
+
+    def __init__(self, nets):
+        super().__init__()
+        self.heads = nn.ModuleList([net for net, _ in nets])
+        self.predicate_names = predicate_names(nets)
+        self.predicate_index = {name: col for col, name in enumerate(self.predicate_names)}
+
+        # Column range of every head, e.g. head_slices["shape"] -> slice(8, 11)
+        self.head_slices = {}
+        start = 0
+        for (group, *_), (_, label2idx) in zip(PREDICATE_HEADS, nets):
+            self.head_slices[group] = slice(start, start + len(label2idx))
+            start += len(label2idx)
+
+    def forward(self, x):
+        return torch.cat([head(x) for head in self.heads], dim=1)
+
+
+def load_fused_predicate_net(model_dir=MODEL_DIR, device=torch.device("cpu")):
+    """Load the four predicate nets and wrap them in a FusedPredicateNet"""
+    fused = FusedPredicateNet(load_predicate_nets(model_dir, device)).to(device)
+    fused.eval()
+    return fused
+
+
+class LTNModel(nn.Module):
+    """
+    Scorer stored in ltn_model.pt: maps a row of the 15-predicate grounding
+    matrix to a single truth value. Layer sizes are read from the checkpoint;
+    fc.1 holds no parameters and is taken to be a ReLU.
+    """
+
+    def __init__(self, num_predicates=15, hidden=32):
+        super().__init__()
+        self.fc = nn.Sequential(
+            nn.Linear(num_predicates, hidden),
+            nn.ReLU(),
+            nn.Linear(hidden, 1)
+        )
+
+    def forward(self, x):
+        return torch.sigmoid(self.fc(x)).squeeze(-1)
+
+
+def load_ltn_model(path="ltn_model.pt", device=torch.device("cpu")):
+    """Load ltn_model.pt into an LTNModel in eval mode"""
+    state_dict = torch.load(path, map_location=device)
+    hidden, num_predicates = state_dict["fc.0.weight"].shape
+    model = LTNModel(num_predicates, hidden).to(device)
+    model.load_state_dict(state_dict)
+    model.eval()
+    return model
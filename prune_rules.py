@@ -1,20 +1,33 @@
 import json
-
-with open("rule_verification_results.json", "r") as f:
-    data = json.load(f)
+from results_store import load_packed_results, save_results
 
 THRESHOLD = 0.5
-filtered_rules = []
+RESULTS_FILE = "rule_verification_results.json"
+PRUNED_FILE = "pruned_rules.json"
+
+if __name__ == "__main__":
+    # Packed results are pruned on their precomputed counts; only the kept
+    # rules are unpacked and written back in the same format (which removes
+    # an older pruned_rules.json, see results_store.save_results)
+    packed = load_packed_results(RESULTS_FILE)
+    if packed is not None:
+        keep = (packed.num_scores > 0) & (packed.consistency >= THRESHOLD)
+        filtered_rules = [packed.result(r) for r in keep.nonzero()[0]]
+        paths = save_results(PRUNED_FILE, filtered_rules, "packed")
+    else:
+        with open(RESULTS_FILE, "r") as f:
+            data = json.load(f)
+
+        filtered_rules = []
 
-for rule in data:
-    scores = rule.get("consistency_scores", [])
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        if avg_score >= THRESHOLD:
-            filtered_rules.append(rule)
+        for rule in data:
+            scores = rule.get("consistency_scores", [])
+            if scores:
+                avg_score = sum(scores) / len(scores)
+                if avg_score >= THRESHOLD:
+                    filtered_rules.append(rule)
 
-# Save pruned rules
-with open("pruned_rules.json", "w") as f:
-    json.dump(filtered_rules, f, indent=2)
+        # Save pruned rules
+        paths = save_results(PRUNED_FILE, filtered_rules, "json")
 
-print(f" Pruned and saved {len(filtered_rules)} high-consistency rules to 'pruned_rules.json'")
+    print(f" Pruned and saved {len(filtered_rules)} high-consistency rules to {', '.join(repr(p) for p in paths)}")
@@ -1,12 +1,12 @@
-import json
+from results_store import load_summaries
 
-with open("rule_verification_results.json", "r") as f:
-    data = json.load(f)
+# Per-rule counts, from the packed results if present, else the JSON
+data = [rule for rule in load_summaries("rule_verification_results.json") if rule["num_scores"]]
 
 # Filter and sort by average consistency score (descending)
-filtered = sorted(data, key=lambda x: sum(x['consistency_scores']) / len(x['consistency_scores']), reverse=True)
+filtered = sorted(data, key=lambda x: x['avg_score'], reverse=True)
 
 top_rules = filtered[:5]  # Adjust the number of top rules you want
 for rule in top_rules:
-    avg = sum(rule['consistency_scores']) / len(rule['consistency_scores'])
+    avg = rule['avg_score']
     print(f"{rule['rule']} -> Avg Score: {avg:.2f}")
@@ -0,0 +1,193 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# ─── Bit-packed verification results ────────────────────────────────────────
+# Holds the rule_verification_results.json list (see verify_rule_consistency)
+# as a few flat arrays in one .npz next to the JSON path:
+#
+#   rules, methods                  str [R]
+#   score_bits                      uint8 [R, ceil(S / 8)] np.packbits of each
+#                                   rule's per-scene consistency_scores
+#   num_scores, num_consistent      int64 [R] precomputed counts
+#   violations                      int64 [R]
+#   scene_names, object_ids         str, every scene / object id named by a
+#                                   counterexample (the id index)
+#   object_id_is_int                bool, ids that were ints (restored on load;
+#                                   files without it hold str ids only)
+#   cx_offsets                      int64 [R + 1]  counterexamples of rule r are
+#                                   entries cx_offsets[r]:cx_offsets[r + 1]
+#   cx_scenes                       int64 [E] scene_names index of each entry
+#   cx_object_offsets, cx_objects   int64 [E + 1], [O] its object_ids indices
+#
+# Readers use the counts without unpacking anything; load_results falls back
+# to the JSON file when no packed file exists (or the JSON is newer).
+RESULTS_VERSION = 1
+PACKED_SUFFIX = ".npz"
+FORMATS = ("packed", "json", "both")
+
+
+def packed_path(json_path: str) -> str:
+    """Path of the packed results belonging to ``json_path``"""
+    return os.path.splitext(json_path)[0] + PACKED_SUFFIX
+
+
+def _index(names: Dict[Any, int], name: Any) -> int:
+    return names.setdefault(name, len(names))
+
+
+def write_packed_results(path: str, results: List[Dict]) -> str:
+    """Write verification result dicts to ``path`` in the packed format"""
+    lengths = np.array([len(r["consistency_scores"]) for r in results], dtype=np.int64)
+    width = int(lengths.max(initial=0))
+    scores = np.zeros((len(results), width), dtype=bool)
+    for r, result in enumerate(results):
+        scores[r, :lengths[r]] = result["consistency_scores"]
+
+    scenes, objects = {}, {}
+    cx_offsets, cx_scenes, cx_object_offsets, cx_objects = [0], [], [0], []
+    for result in results:
+        for example in result["counterexamples"]:
+            cx_scenes.append(_index(scenes, example["scene"]))
+            cx_objects.extend(_index(objects, obj) for obj in example["objects"])
+            cx_object_offsets.append(len(cx_objects))
+        cx_offsets.append(len(cx_scenes))
+
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            version=np.int64(RESULTS_VERSION),
+            rules=np.array([r["rule"] for r in results], dtype=str),
+            methods=np.array([r.get("method", "") for r in results], dtype=str),
+            score_bits=np.packbits(scores, axis=1),
+            num_scores=lengths,
+            num_consistent=scores.sum(axis=1).astype(np.int64),
+            violations=np.array([r.get("violations", 0) for r in results], dtype=np.int64),
+            scene_names=np.array(list(scenes), dtype=str),
+            object_ids=np.array([str(obj) for obj in objects], dtype=str),
+            object_id_is_int=np.array([isinstance(obj, (int, np.integer)) for obj in objects], dtype=bool),
+            cx_offsets=np.array(cx_offsets, dtype=np.int64),
+            cx_scenes=np.array(cx_scenes, dtype=np.int64),
+            cx_object_offsets=np.array(cx_object_offsets, dtype=np.int64),
+            cx_objects=np.array(cx_objects, dtype=np.int64),
+        )
+    return path
+
+
+class PackedResults:
+    """Read-only view over packed verification results"""
+
+    def __init__(self, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        if int(arrays["version"]) != RESULTS_VERSION:
+            raise ValueError(f"Unsupported results version in {path}: {int(arrays['version'])}")
+        self.rules: List[str] = arrays["rules"].tolist()
+        self.methods: List[str] = arrays["methods"].tolist()
+        self.score_bits = arrays["score_bits"]
+        self.num_scores = arrays["num_scores"]
+        self.num_consistent = arrays["num_consistent"]
+        self.violations = arrays["violations"]
+        self.scene_names = arrays["scene_names"]
+        is_int = arrays.get("object_id_is_int", np.zeros(len(arrays["object_ids"]), dtype=bool))
+        self.object_ids: List[Any] = [int(obj) if flag else obj
+                                      for obj, flag in zip(arrays["object_ids"].tolist(), is_int.tolist())]
+        self.cx_offsets = arrays["cx_offsets"]
+        self.cx_scenes = arrays["cx_scenes"]
+        self.cx_object_offsets = arrays["cx_object_offsets"]
+        self.cx_objects = arrays["cx_objects"]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @property
+    def consistency(self) -> np.ndarray:
+        """overall_consistency of every rule (1.0 for rules without scores)"""
+        return np.divide(self.num_consistent, self.num_scores,
+                         out=np.ones(len(self), dtype=np.float64), where=self.num_scores > 0)
+
+    def scores(self, r: int) -> np.ndarray:
+        """Per-scene consistency of rule ``r`` as a bool vector"""
+        return np.unpackbits(self.score_bits[r], count=int(self.num_scores[r])).astype(bool)
+
+    def counterexamples(self, r: int) -> List[Dict]:
+        examples = []
+        for e in range(self.cx_offsets[r], self.cx_offsets[r + 1]):
+            objects = self.cx_objects[self.cx_object_offsets[e]:self.cx_object_offsets[e + 1]]
+            examples.append({"scene": str(self.scene_names[self.cx_scenes[e]]),
+                             "objects": [self.object_ids[obj] for obj in objects.tolist()]})
+        return examples
+
+    def result(self, r: int) -> Dict:
+        """Rule ``r`` in the rule_verification_results.json schema"""
+        return {
+            "rule": self.rules[r],
+            "consistency_scores": self.scores(r).tolist(),
+            "overall_consistency": float(self.consistency[r]),
+            "violations": int(self.violations[r]),
+            "counterexamples": self.counterexamples(r),
+            "method": self.methods[r],
+        }
+
+    def to_dicts(self) -> List[Dict]:
+        return [self.result(r) for r in range(len(self))]
+
+
+def _use_packed(json_path: str) -> bool:
+    packed = packed_path(json_path)
+    if not os.path.exists(packed):
+        return False
+    return not os.path.exists(json_path) or os.path.getmtime(packed) >= os.path.getmtime(json_path)
+
+
+def load_packed_results(json_path: str) -> Optional[PackedResults]:
+    """PackedResults belonging to ``json_path``, or None if only the JSON is current"""
+    return PackedResults(packed_path(json_path)) if _use_packed(json_path) else None
+
+
+def load_results(json_path: str) -> List[Dict]:
+    """Verification result dicts, from the packed file if present, else the JSON"""
+    packed = load_packed_results(json_path)
+    if packed is not None:
+        return packed.to_dicts()
+    with open(json_path, "r") as f:
+        return json.load(f)
+
+
+def load_summaries(json_path: str) -> List[Dict]:
+    """
+    Per rule {"rule", "num_consistent", "num_scores", "avg_score"} without
+    unpacking scores; avg_score is None for rules without scores.
+    """
+    packed = load_packed_results(json_path)
+    if packed is not None:
+        counts = zip(packed.rules, packed.num_consistent.tolist(), packed.num_scores.tolist())
+    else:
+        with open(json_path, "r") as f:
+            counts = [(r["rule"], sum(r.get("consistency_scores", [])), len(r.get("consistency_scores", [])))
+                      for r in json.load(f)]
+    return [{"rule": rule, "num_consistent": k, "num_scores": n, "avg_score": k / n if n else None}
+            for rule, k, n in counts]
+
+
+def save_results(json_path: str, results: List[Dict], fmt: str = "packed") -> List[str]:
+    """
+    Write ``results`` packed (next to ``json_path``), as JSON, or both;
+    returns the paths. Writing only the packed file removes an older JSON
+    at ``json_path`` so that nothing reads it stale.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown results format {fmt!r}, expected one of {FORMATS}")
+    paths = []
+    if fmt in ("json", "both"):
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        paths.append(json_path)
+    if fmt in ("packed", "both"):
+        paths.append(write_packed_results(packed_path(json_path), results))
+    if fmt == "packed" and os.path.exists(json_path):
+        os.remove(json_path)
+        print(f"Removed stale {json_path} (results are in {packed_path(json_path)})")
+    return paths
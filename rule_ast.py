@@ -0,0 +1,410 @@
+import itertools
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from spatial_relations import RELATION_NAMES, coordinate_relations, load_relation_store, relation_matrices
+
+# ─── Compiled rules ─────────────────────────────────────────────────────────
+# A rule such as  head(X,Y) <- body1(X) & body2(Y) & is_left_of(X,Y)  is
+# parsed once into a Rule (head atom, body atoms) and compiled into a
+# CompiledRule that evaluates every variable binding of every scene at once:
+#
+#   bindings        one array axis per variable: [S, Nmax, ..., Nmax]
+#   unary atom      p(V)   -> padded truth column of p along the axis of V
+#   binary atom     r(U,V) -> padded relation tensor r on the axes of U and V
+#   body            product t-norm of its atoms (an empty body is true)
+#
+# Groundings are wrapped in a GroundingTensor: padded [S, Nmax] predicate
+# columns built on first use, NaN where an object carries no grounding for the
+# predicate, plus relation tensors. Callers choose how a missing grounding
+# reads (``missing``), e.g. false for the mini pipeline's sets of true
+# predicates. Both parse_rule and compile_rule are memoized on the rule string.
+#
+# canonical_rule gives every logically identical spelling of a rule one
+# string: variables renamed to X, Y, Z, ... in order of first appearance
+# (head first), repeated body atoms dropped and the body sorted, with the
+# body-only variables named so that the sorted body is smallest. dedupe_rules
+# uses it to keep one candidate per canonical rule and to drop tautologies,
+# i.e. rules whose head is one of their body atoms.
+ARROW_RE = re.compile(r"<-|←")
+ATOM_RE = re.compile(r"(\w+)\s*\(([^)]*)\)")
+THRESHOLD = 0.5        # Truth value at or above which a grounding counts as true
+MAX_CACHED_RULES = 1 << 16
+CANONICAL_VARIABLES = ["X", "Y", "Z", "W", "V", "U"]
+MAX_RENAMED_VARIABLES = 6  # Body-only variables beyond this keep their order of appearance
+
+T = TypeVar("T")
+
+
+class Atom(NamedTuple):
+    name: str
+    args: Tuple[str, ...]
+
+    @property
+    def arity(self) -> int:
+        return len(self.args)
+
+    def __str__(self) -> str:
+        return f"{self.name}({','.join(self.args)})"
+
+
+class Rule(NamedTuple):
+    head: Atom
+    body: Tuple[Atom, ...]
+
+    @property
+    def atoms(self) -> Tuple[Atom, ...]:
+        return (self.head,) + self.body
+
+    @property
+    def variables(self) -> Tuple[str, ...]:
+        """Distinct variables in order of appearance, head variables first"""
+        return tuple(dict.fromkeys(var for atom in self.atoms for var in atom.args))
+
+    @property
+    def arity(self) -> int:
+        return len(self.variables)
+
+    @property
+    def predicates(self) -> Tuple[str, ...]:
+        """Distinct names of the unary atoms"""
+        return tuple(dict.fromkeys(atom.name for atom in self.atoms if atom.arity == 1))
+
+    @property
+    def relations(self) -> Tuple[str, ...]:
+        """Distinct names of the binary atoms"""
+        return tuple(dict.fromkeys(atom.name for atom in self.atoms if atom.arity == 2))
+
+    def rename(self, names: Dict[str, str]) -> "Rule":
+        """Rule with atom names replaced according to ``names``"""
+        def sub(atom):
+            return Atom(names.get(atom.name, atom.name), atom.args)
+        return Rule(sub(self.head), tuple(sub(atom) for atom in self.body))
+
+    def __str__(self) -> str:
+        return f"{self.head} <- " + " & ".join(str(atom) for atom in self.body)
+
+
+def _parse_atoms(text: str) -> List[Atom]:
+    return [Atom(name, tuple(arg.strip() for arg in args.split(",") if arg.strip()))
+            for name, args in ATOM_RE.findall(text)]
+
+
+@lru_cache(maxsize=MAX_CACHED_RULES)
+def parse_rule(rule: str) -> Rule:
+    """
+    Parse ``head <- b1 & b2 ...``. Accepts the ASCII and Unicode arrow and
+    conjunction ("<-"/"←", "&"/"∧").
+    """
+    parts = ARROW_RE.split(rule)
+    if len(parts) != 2:
+        raise ValueError(f"Not a rule (expected 'head <- body'): {rule!r}")
+    head = _parse_atoms(parts[0])
+    if len(head) != 1:
+        raise ValueError(f"Rule head must be a single atom: {rule!r}")
+    return Rule(head[0], tuple(_parse_atoms(parts[1])))
+
+
+def _canonical_variable(i: int) -> str:
+    return CANONICAL_VARIABLES[i] if i < len(CANONICAL_VARIABLES) else f"V{i}"
+
+
+def canonical_form(rule: Rule) -> Rule:
+    """Alpha-renamed rule with a sorted, duplicate-free body (see canonical_rule)"""
+    def renamed(atom, names):
+        return Atom(atom.name, tuple(names[var] for var in atom.args))
+
+    head_vars = list(dict.fromkeys(rule.head.args))
+    body_vars = [var for var in rule.variables if var not in head_vars]
+    names = {var: _canonical_variable(i) for i, var in enumerate(head_vars)}
+    fresh = [_canonical_variable(len(head_vars) + i) for i in range(len(body_vars))]
+    orders = (itertools.permutations(fresh) if len(body_vars) <= MAX_RENAMED_VARIABLES else [fresh])
+
+    best = None
+    for order in orders:
+        names.update(zip(body_vars, order))
+        body = tuple(sorted(set(renamed(atom, names) for atom in rule.body)))
+        if best is None or body < best:
+            best = body
+    return Rule(renamed(rule.head, names), best)
+
+
+def is_tautology(rule: Rule) -> bool:
+    """True if the head is one of the body atoms, so the rule holds everywhere"""
+    return rule.head in rule.body
+
+
+@lru_cache(maxsize=MAX_CACHED_RULES)
+def canonical_rule(rule: str) -> str:
+    """Canonical spelling of ``rule``: ASCII connectives, single spaces, canonical_form"""
+    return str(canonical_form(parse_rule(rule)))
+
+
+def dedupe_rules(rules: Iterable[T], rule_of: Callable[[T], str] = lambda rule: rule) -> List[T]:
+    """
+    First of every group of ``rules`` with the same canonical_rule, without
+    tautologies. ``rule_of`` extracts the rule string from an entry, e.g.
+    ``lambda r: r[0]`` for [rule, score] pairs.
+    """
+    kept, seen, dropped = [], set(), 0
+    for entry in rules:
+        key = canonical_rule(rule_of(entry))
+        if key in seen or is_tautology(parse_rule(key)):
+            dropped += 1
+            continue
+        seen.add(key)
+        kept.append(entry)
+    if dropped:
+        print(f"Dropped {dropped} duplicate or tautological rules, {len(kept)} left")
+    return kept
+
+
+class GroundingTensor:
+    """
+    Padded groundings of S scenes with at most Nmax objects each.
+    ``mask`` [S, Nmax] marks real objects; ``column(name)`` is the float32
+    [S, Nmax] truth of a predicate (NaN where missing) and ``relation(name)``
+    the float32 [S, Nmax, Nmax] truth of a relation (NaN where unknown).
+    """
+
+    def __init__(self, sizes: Sequence[int],
+                 build_column: Callable[[str], np.ndarray],
+                 build_relations: Callable[[], Dict[str, np.ndarray]]):
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self.max_objects = int(self.sizes.max(initial=0))
+        self.mask = np.arange(self.max_objects)[None, :] < self.sizes[:, None]
+        self._build_column = build_column
+        self._build_relations = build_relations
+        self._columns: Dict[str, np.ndarray] = {}
+        self._relations: Optional[Dict[str, np.ndarray]] = None
+
+    @property
+    def num_scenes(self) -> int:
+        return len(self.sizes)
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = self._build_column(name)
+        return self._columns[name]
+
+    def relation(self, name: str) -> np.ndarray:
+        if self._relations is None:
+            self._relations = self._build_relations()
+        if name not in self._relations:
+            return np.full(self.mask.shape + (self.max_objects,), np.nan, dtype=np.float32)
+        return self._relations[name]
+
+    def take(self, scenes: Sequence[int]) -> "GroundingTensor":
+        """GroundingTensor of the given scenes (by index), cut from this one's groundings"""
+        scenes = np.asarray(scenes, dtype=np.int64)
+        sizes = self.sizes[scenes]
+        n = int(sizes.max(initial=0))
+
+        def build_relations():
+            if self._relations is None:
+                self._relations = self._build_relations()
+            return {name: values[scenes, :n, :n] for name, values in self._relations.items()}
+
+        return GroundingTensor(sizes, lambda name: self.column(name)[scenes, :n], build_relations)
+
+    def has_predicate(self, name: str) -> bool:
+        """True if some object carries a grounding for ``name``"""
+        return bool((~np.isnan(self.column(name))).any())
+
+    def has_relation(self, name: str) -> bool:
+        """True if ``name`` is known for some scene"""
+        return bool((~np.isnan(self.relation(name))).any())
+
+    def _empty(self) -> np.ndarray:
+        return np.full(self.mask.shape, np.nan, dtype=np.float32)
+
+    @classmethod
+    def from_scenes(cls, scenes: List[Dict],
+                    values: Callable[[Dict], Dict] = lambda obj: obj["predicates"]) -> "GroundingTensor":
+        """
+        Wrap scene dicts; ``values(obj)`` gives an object's {predicate: truth}.
+        Relations come from a scene's ``relations`` dict (see
+        spatial_relations.attach_relations), else from its CLEVR
+        ``relationships`` or object coordinates.
+        """
+        sizes = [len(scene.get("objects", [])) for scene in scenes]
+
+        def build_column(name):
+            column = tensor._empty()
+            for s, scene in enumerate(scenes):
+                for i, obj in enumerate(scene.get("objects", [])):
+                    truth = values(obj)
+                    if name in truth:
+                        column[s, i] = float(truth[name])
+            return column
+
+        def build_relations():
+            n = tensor.max_objects
+            padded = {name: np.full((len(scenes), n, n), np.nan, dtype=np.float32) for name in RELATION_NAMES}
+            for s, scene in enumerate(scenes):
+                matrices = scene.get("relations")
+                if not isinstance(matrices, dict):
+                    if not _has_geometry(scene):
+                        continue
+                    matrices = dict(zip(RELATION_NAMES, relation_matrices(scene)))
+                for name, matrix in matrices.items():
+                    k = len(matrix)
+                    padded.setdefault(name, np.full((len(scenes), n, n), np.nan, dtype=np.float32))
+                    padded[name][s, :k, :k] = matrix
+            return padded
+
+        tensor = cls(sizes, build_column, build_relations)
+        return tensor
+
+    @classmethod
+    def from_matrix(cls, names: Sequence[str], truth: np.ndarray, offsets: np.ndarray,
+                    relations: Optional[np.ndarray] = None,
+                    relation_names: Sequence[str] = RELATION_NAMES) -> "GroundingTensor":
+        """
+        Wrap a flat [num_objects, P] grounding matrix with its scene offsets
+        (see rule_miner.grounding_matrix) and optionally the padded uint8
+        relation tensors [S, R, Nmax, Nmax] of spatial_relations.
+        """
+        index = {name: p for p, name in enumerate(names)}
+
+        def build_column(name):
+            column = tensor._empty()
+            if name in index:
+                # Scene-major rows line up with the row-major real slots of the mask
+                column[tensor.mask] = truth[:, index[name]]
+            return column
+
+        def build_relations():
+            if relations is None:
+                return {}
+            n = tensor.max_objects
+            return {name: np.asarray(relations[:, r, :n, :n], dtype=np.float32)
+                    for r, name in enumerate(relation_names)}
+
+        tensor = cls(np.diff(np.asarray(offsets, dtype=np.int64)), build_column, build_relations)
+        return tensor
+
+    @classmethod
+    def from_store(cls, store, start: int = 0, stop: Optional[int] = None) -> "GroundingTensor":
+        """
+        Scenes ``start`` up to ``stop`` of a grounding_store.GroundingStore,
+        read from its truth matrix and offsets without building scene dicts.
+        Relations come from a relation store next to it (by scene_id, as in
+        spatial_relations.attach_relations), else from object positions.
+        """
+        stop = len(store) if stop is None else stop
+        offsets = np.asarray(store.scene_offsets[start:stop + 1], dtype=np.int64)
+        truth = np.asarray(store.truth[offsets[0]:offsets[-1]], dtype=np.float32)
+        positions = np.asarray(store.positions[offsets[0]:offsets[-1]], dtype=np.float64)
+        scene_ids = np.asarray(store.scene_ids[start:stop])
+        offsets = offsets - offsets[0]
+        sizes = np.diff(offsets)
+
+        relations = load_relation_store(store.store_dir)
+        names = relations.names if relations is not None else RELATION_NAMES
+        n = int(sizes.max(initial=0))
+        padded = np.zeros((len(sizes), len(names), n, n), dtype=np.uint8)
+        for s, size in enumerate(sizes.tolist()):
+            scene_id = int(scene_ids[s])
+            if relations is not None and 0 <= scene_id < len(relations):
+                matrices = relations.scene(scene_id)
+            else:
+                matrices = dict(zip(RELATION_NAMES, coordinate_relations(positions[offsets[s]:offsets[s + 1]])))
+                matrices = np.stack([matrices.get(name, np.zeros((size, size), np.uint8)) for name in names])
+            padded[s, :, :size, :size] = matrices
+        return cls.from_matrix(store.predicates, truth, offsets, padded, names)
+
+
+def _has_geometry(scene: Dict) -> bool:
+    objects = scene.get("objects", [])
+    return bool(scene.get("relationships")) or all(
+        "3d_coords" in obj or "position" in obj for obj in objects)
+
+
+class CompiledRule:
+    """
+    Vectorized evaluator of one rule over a GroundingTensor. Results have
+    shape [S, Nmax, ..., Nmax] with one object axis per rule variable (in
+    Rule.variables order).
+    """
+
+    def __init__(self, rule: Rule):
+        for atom in rule.atoms:
+            if atom.arity not in (1, 2):
+                raise ValueError(f"Only unary and binary atoms are supported, got {atom} in {rule}")
+        self.rule = rule
+        self.variables = rule.variables
+        self._axes = {var: a for a, var in enumerate(self.variables)}
+
+    def _atom_truth(self, atom: Atom, groundings: GroundingTensor, missing: float) -> np.ndarray:
+        if atom.arity == 1:
+            values = groundings.column(atom.name)
+            axes = (self._axes[atom.args[0]],)
+        else:
+            values = groundings.relation(atom.name)
+            a, b = (self._axes[arg] for arg in atom.args)
+            if a == b:
+                values = np.diagonal(values, axis1=1, axis2=2)
+                axes = (a,)
+            elif a > b:
+                values = values.transpose(0, 2, 1)
+                axes = (b, a)
+            else:
+                axes = (a, b)
+        values = np.where(np.isnan(values), np.float32(missing), values)
+        shape = [groundings.num_scenes] + [1] * len(self.variables)
+        for axis in axes:
+            shape[1 + axis] = groundings.max_objects
+        return values.reshape(shape)
+
+    def _shape(self, groundings: GroundingTensor) -> Tuple[int, ...]:
+        return (groundings.num_scenes,) + (groundings.max_objects,) * len(self.variables)
+
+    def valid(self, groundings: GroundingTensor) -> np.ndarray:
+        """Bindings whose variables all refer to real (unpadded) objects"""
+        valid = np.ones(self._shape(groundings), dtype=bool)
+        for axis in range(len(self.variables)):
+            shape = [groundings.num_scenes] + [1] * len(self.variables)
+            shape[1 + axis] = groundings.max_objects
+            valid &= groundings.mask.reshape(shape)
+        return valid
+
+    def evaluate(self, groundings: GroundingTensor, missing: float = 0.0
+                 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Fuzzy (body, head, valid) of every binding; the body is a product t-norm"""
+        shape = self._shape(groundings)
+        body = np.ones(shape, dtype=np.float32)
+        for atom in self.rule.body:
+            body = body * self._atom_truth(atom, groundings, missing)
+        head = np.broadcast_to(self._atom_truth(self.rule.head, groundings, missing), shape)
+        return body, head, self.valid(groundings)
+
+    def holds(self, groundings: GroundingTensor, threshold: float = THRESHOLD, missing: float = 0.0
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Crisp (body, head, valid): every body atom, resp. the head, is >= threshold"""
+        shape = self._shape(groundings)
+        body = np.ones(shape, dtype=bool)
+        for atom in self.rule.body:
+            body = body & (self._atom_truth(atom, groundings, missing) >= threshold)
+        head = np.broadcast_to(self._atom_truth(self.rule.head, groundings, missing) >= threshold, shape)
+        return body, head, self.valid(groundings)
+
+    def violations(self, groundings: GroundingTensor, threshold: float = THRESHOLD,
+                   missing: float = 0.0) -> np.ndarray:
+        """Bindings where the body holds and the head does not"""
+        body, head, valid = self.holds(groundings, threshold, missing)
+        return body & ~head & valid
+
+    @staticmethod
+    def per_object(bindings: np.ndarray) -> np.ndarray:
+        """[S, Nmax] objects bound to the first variable by some binding in ``bindings``"""
+        return bindings.any(axis=tuple(range(2, bindings.ndim)))
+
+
+@lru_cache(maxsize=MAX_CACHED_RULES)
+def compile_rule(rule: str) -> CompiledRule:
+    """Parsed and compiled ``rule``, memoized on the rule string"""
+    return CompiledRule(parse_rule(rule))
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from grounding_store import is_grounding_store
+from rule_ast import canonical_rule
+
+# ─── Persistent rule result cache ───────────────────────────────────────────
+# SQLite table of solver verdicts, satisfaction scores and consistency counts,
+# keyed by (kind, canonical rule, groundings fingerprint, threshold). Entries
+# of a groundings source whose fingerprint changed are dropped when the cache
+# is opened, and the least recently used entries are evicted beyond
+# ``max_entries``.
+RULE_CACHE = os.getenv("RULE_CACHE", "data/rule_cache.sqlite")  # "" disables caching
+MAX_ENTRIES = 200_000
+NO_THRESHOLD = -1.0   # Stored in place of a missing threshold (NULL breaks the primary key)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    kind        TEXT NOT NULL,
+    rule        TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    threshold   REAL NOT NULL,
+    source      TEXT,
+    value       TEXT NOT NULL,
+    last_used   REAL NOT NULL,
+    PRIMARY KEY (kind, rule, fingerprint, threshold)
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE INDEX IF NOT EXISTS results_source ON results (source, fingerprint);
+"""
+
+
+def _hash_file(h, path: str):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+def groundings_fingerprint(source: Union[str, List[Dict]]) -> str:
+    """
+    sha256 identifying a set of groundings. Grounding stores are hashed by
+    content; JSON directories and other files by name, size and mtime;
+    in-memory scene lists by their canonical JSON.
+    """
+    h = hashlib.sha256()
+    if not isinstance(source, str):
+        h.update(json.dumps(source, sort_keys=True, separators=(",", ":"), default=str).encode())
+        return h.hexdigest()
+    if os.path.isdir(source):
+        entries = sorted(name for name in os.listdir(source) if not name.startswith("."))
+        store = is_grounding_store(source)
+        for name in entries:
+            path = os.path.join(source, name)
+            if not os.path.isfile(path):
+                continue
+            h.update(name.encode())
+            if store and name.endswith((".npy", ".json", ".meta")):
+                _hash_file(h, path)
+            else:
+                stat = os.stat(path)
+                h.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return h.hexdigest()
+    stat = os.stat(source)
+    h.update(f"{os.path.abspath(source)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+class RuleCache:
+    """
+    On-disk memo of per-rule results for one groundings fingerprint.
+    ``source`` names the groundings (e.g. their directory) so results for an
+    older version of the same source are invalidated on open.
+    """
+
+    def __init__(self, path: str, fingerprint: str, source: Optional[str] = None,
+                 max_entries: int = MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.fingerprint = fingerprint
+        self.source = os.path.abspath(source) if source else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        if self.source:
+            cur = self.conn.execute("DELETE FROM results WHERE source = ? AND fingerprint != ?",
+                                    (self.source, fingerprint))
+            if cur.rowcount:
+                print(f"Groundings changed: invalidated {cur.rowcount} cached rule results")
+        self.conn.commit()
+
+    def _key(self, kind: str, rule: str, threshold: Optional[float]):
+        return (kind, canonical_rule(rule), self.fingerprint,
+                NO_THRESHOLD if threshold is None else float(threshold))
+
+    def get(self, kind: str, rule: str, threshold: Optional[float] = None) -> Optional[Any]:
+        key = self._key(kind, rule, threshold)
+        row = self.conn.execute(
+            "SELECT value FROM results WHERE kind = ? AND rule = ? AND fingerprint = ? AND threshold = ?",
+            key).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute(
+            "UPDATE results SET last_used = ? WHERE kind = ? AND rule = ? AND fingerprint = ? AND threshold = ?",
+            (time.time(), *key))
+        return json.loads(row[0])
+
+    def put(self, kind: str, rule: str, value: Any, threshold: Optional[float] = None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (kind, rule, fingerprint, threshold, source, value, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*self._key(kind, rule, threshold), self.source, json.dumps(value, default=_to_json), time.time()))
+
+    def get_or_compute(self, kind: str, rule: str, compute: Callable[[], Any],
+                       threshold: Optional[float] = None) -> Any:
+        value = self.get(kind, rule, threshold)
+        if value is None:
+            value = compute()
+            self.put(kind, rule, value, threshold)
+        return value
+
+    def evict(self) -> int:
+        """Drop the least recently used entries beyond max_entries"""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+            (excess,))
+        return excess
+
+    def close(self):
+        self.evict()
+        self.conn.commit()
+        self.conn.close()
+        if self.hits or self.misses:
+            print(f"Rule cache: {self.hits} hits, {self.misses} misses ({self.path})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def open_rule_cache(source: Union[str, List[Dict]], path: Optional[str] = RULE_CACHE) -> Optional[RuleCache]:
+    """RuleCache for ``source`` at ``path``, or None if caching is disabled"""
+    if not path:
+        return None
+    return RuleCache(path, groundings_fingerprint(source), source if isinstance(source, str) else None)
@@ -0,0 +1,354 @@
+import heapq
+import math
+import time
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from grounding_store import GroundingStore, is_grounding_store
+
+# ─── Vectorized association-rule miner ──────────────────────────────────────
+# Treats the groundings as an (object x predicate) truth matrix T [N, P] and
+# scores every unary rule  head(X) <- b1(X) & ... & bk(X)  at once:
+#
+#   body truth     b = prod_i T[:, bi]            (product t-norm)
+#   support        #{b >= t and head >= t} / N    (crisp, threshold t)
+#   confidence     #{b >= t and head >= t} / #{b >= t}
+#   satisfaction   mean(1 - b + b * head)         (Reichenbach implication)
+#
+# Each chunk of candidate bodies is scored against all heads with two matrix
+# products, so all (body, head) pairs of a chunk cost one GEMM.
+#
+# ``mine_apriori`` only scores bodies that are frequent: support is
+# anti-monotone (adding a conjunct never raises it), so bodies are grown one
+# predicate at a time and a candidate is dropped as soon as any of its
+# sub-bodies fell below ``min_support``. Support is counted on the distinct
+# thresholded rows of T with multiplicities, a flat stand-in for an FP-tree
+# that typically holds a few hundred rows instead of one per object.
+THRESHOLD = 0.5     # Truth value above which a grounding counts as true
+BODY_CHUNK = 128    # Candidate bodies scored per matrix product
+ARROW = "<-"
+
+
+def grounding_matrix(groundings, predicates: Optional[Sequence[str]] = None
+                     ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    (predicate names, float32 truth matrix [num_objects, num_predicates],
+    int64 scene offsets [num_scenes + 1]). ``groundings`` is a grounding
+    directory/store path, a GroundingStore or a list of scene dicts. Missing
+    groundings are read as false.
+    """
+    if isinstance(groundings, str) and is_grounding_store(groundings):
+        groundings = GroundingStore(groundings)
+    if isinstance(groundings, GroundingStore):
+        store = groundings
+        names = list(predicates) if predicates is not None else list(store.predicates)
+        truth = np.zeros((store.num_objects, len(names)), dtype=np.float32)
+        found = [p for p, name in enumerate(names) if name in store.predicates]
+        if found:
+            cols = [store.predicate_index(names[p]) for p in found]
+            truth[:, found] = np.nan_to_num(np.asarray(store.truth[:, cols], dtype=np.float32), nan=0.0)
+        return names, truth, np.asarray(store.scene_offsets, dtype=np.int64)
+
+    if isinstance(groundings, str):
+        from synthesize_rules import load_groundings
+        groundings = load_groundings(groundings)
+    if predicates is None:
+        names = list(dict.fromkeys(p for scene in groundings for obj in scene["objects"]
+                                   for p in obj["predicates"]))
+    else:
+        names = list(predicates)
+    rows = [[obj["predicates"].get(name, 0.0) for name in names]
+            for scene in groundings for obj in scene["objects"]]
+    truth = np.array(rows, dtype=np.float32).reshape(len(rows), len(names))
+    offsets = np.concatenate([[0], np.cumsum([len(scene["objects"]) for scene in groundings])]).astype(np.int64)
+    return names, np.nan_to_num(truth, nan=0.0), offsets
+
+
+def truth_matrix(groundings, predicates: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+    """(predicate names, truth matrix) of ``grounding_matrix``"""
+    names, truth, _ = grounding_matrix(groundings, predicates)
+    return names, truth
+
+
+def combined_score(satisfaction, consistency):
+    """Equal-weight combination of satisfaction and consistency used to rank rules"""
+    return (satisfaction + consistency) / 2
+
+
+def format_rule(head: str, body: Sequence[str]) -> str:
+    """Unary rule string in the synthesized_rules.json notation"""
+    return f"{head}(X) {ARROW} " + " & ".join(f"{b}(X)" for b in body)
+
+
+class RuleMiner:
+    """
+    Scores unary rules over a fixed (object x predicate) truth matrix.
+    ``scene_offsets`` (object range of every scene) enables the scene-level
+    consistency used by ``top_k``; without it every object is its own scene.
+    """
+
+    def __init__(self, predicates: Sequence[str], truth: np.ndarray, threshold: float = THRESHOLD,
+                 scene_offsets: Optional[np.ndarray] = None):
+        self.predicates = list(predicates)
+        self.truth = np.asarray(truth, dtype=np.float32)
+        self.crisp = (self.truth >= threshold).astype(np.float32)
+        self.threshold = threshold
+        self.num_objects = self.truth.shape[0]
+        if scene_offsets is None:
+            scene_offsets = np.arange(self.num_objects + 1)
+        self.scene_offsets = np.asarray(scene_offsets, dtype=np.int64)
+        self.num_scenes = len(self.scene_offsets) - 1
+        self.object_scene = np.repeat(np.arange(self.num_scenes), np.diff(self.scene_offsets))
+        self.index = {name: col for col, name in enumerate(self.predicates)}
+        self._transactions = None
+        # Predicate-major copies with an extra always-true row, so gathering
+        # the columns of a body reads contiguous memory.
+        ones = np.ones((1, self.num_objects), dtype=np.float32)
+        self._truth_rows = np.vstack([self.truth.T, ones])
+        self._crisp_rows = np.vstack([self.crisp.T, ones])
+
+    def body_rows(self, bodies: Sequence[Tuple[int, ...]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Fuzzy and crisp truth of each body, float32 [len(bodies), N] each"""
+        # Bodies are padded to a common length with the always-true row.
+        width = max((len(body) for body in bodies), default=0)
+        cols = np.full((len(bodies), max(width, 1)), len(self.predicates), dtype=np.int64)
+        for c, body in enumerate(bodies):
+            cols[c, :len(body)] = body
+        fuzzy = self._truth_rows[cols[:, 0]]
+        crisp = self._crisp_rows[cols[:, 0]]
+        for k in range(1, cols.shape[1]):
+            fuzzy *= self._truth_rows[cols[:, k]]
+            crisp *= self._crisp_rows[cols[:, k]]
+        return fuzzy, crisp
+
+    def score_bodies(self, bodies: Sequence[Tuple[int, ...]]) -> Dict[str, np.ndarray]:
+        """
+        Support, confidence and satisfaction of every (body, head) pair,
+        each a float array [len(bodies), num_predicates].
+        """
+        fuzzy, crisp = self.body_rows(bodies)
+        n = max(self.num_objects, 1)
+        body_count = crisp.sum(axis=1)                         # [C]
+        joint_count = crisp @ self.crisp                       # [C, P]
+        support = joint_count / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidence = np.where(body_count[:, None] > 0, joint_count / body_count[:, None], 0.0)
+        satisfaction = 1.0 - fuzzy.mean(axis=1)[:, None] + (fuzzy @ self.truth) / n
+        return {"body_count": body_count, "support": support,
+                "confidence": confidence, "satisfaction": satisfaction}
+
+    def transactions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Distinct thresholded rows (float32 [U, P]) and their counts [U]"""
+        if self._transactions is None:
+            rows, counts = np.unique(self.crisp.astype(np.uint8), axis=0, return_counts=True)
+            self._transactions = (rows.astype(np.float32), counts.astype(np.float64))
+        return self._transactions
+
+    def body_support(self, bodies: Sequence[Tuple[int, ...]]) -> np.ndarray:
+        """Fraction of objects on which each body holds (crisp), float [len(bodies)]"""
+        rows, counts = self.transactions()
+        support = np.empty(len(bodies), dtype=np.float64)
+        for c, body in enumerate(bodies):
+            support[c] = counts[rows[:, list(body)].all(axis=1)].sum() if body else counts.sum()
+        return support / max(self.num_objects, 1)
+
+    def frequent_bodies(self, min_support: float, max_body_len: int,
+                        body_predicates: Optional[Sequence[str]] = None) -> List[Tuple[int, ...]]:
+        """
+        Level-wise (Apriori) search for all bodies of up to ``max_body_len``
+        predicates with crisp support >= ``min_support`` that hold for at
+        least one object.
+        """
+        cols = sorted(self.index[p] for p in body_predicates) if body_predicates else list(range(len(self.predicates)))
+        level = [(col,) for col in cols]
+        level = [b for b, sup in zip(level, self.body_support(level)) if sup > 0 and sup >= min_support]
+        frequent = list(level)
+        for _ in range(1, max_body_len):
+            known = set(level)
+            candidates = []
+            # Join bodies sharing all but their last predicate, then drop any
+            # candidate with an infrequent sub-body.
+            for i, a in enumerate(level):
+                for b in level[i + 1:]:
+                    if a[:-1] != b[:-1]:
+                        break
+                    cand = a + (b[-1],)
+                    if all(cand[:k] + cand[k + 1:] in known for k in range(len(cand) - 2)):
+                        candidates.append(cand)
+            if not candidates:
+                break
+            level = [b for b, sup in zip(candidates, self.body_support(candidates)) if sup > 0 and sup >= min_support]
+            frequent.extend(level)
+        return frequent
+
+    def mine_apriori(self, min_support: float = 0.0, min_confidence: float = 0.0, max_body_len: int = 1,
+                     heads: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        ``mine`` restricted to frequent bodies: a rule's support never exceeds
+        its body's, so bodies below ``min_support`` cannot yield a rule.
+        """
+        bodies = self.frequent_bodies(min_support, max_body_len)
+        num_heads = len(heads) if heads else len(self.predicates)
+        num_preds = len(self.predicates)
+        theoretical = sum(math.comb(num_preds, k) * num_heads for k in range(1, max_body_len + 1))
+        print(f"Apriori kept {len(bodies)} frequent bodies "
+              f"({len(bodies) * num_heads}/{theoretical} candidate rules)")
+        return self.mine(min_support=min_support, min_confidence=min_confidence, heads=heads, bodies=bodies)
+
+    def iter_bodies(self, max_body_len: int, body_predicates: Optional[Sequence[str]] = None):
+        """All conjunctions of 1..max_body_len distinct predicates (column tuples)"""
+        cols = [self.index[p] for p in body_predicates] if body_predicates else list(range(len(self.predicates)))
+        for length in range(1, max_body_len + 1):
+            yield from combinations(cols, length)
+
+    def mine(self, max_body_len: int = 1, min_support: float = 0.0, min_confidence: float = 0.0,
+             heads: Optional[Sequence[str]] = None, bodies: Optional[Sequence[Tuple[int, ...]]] = None,
+             chunk_size: int = BODY_CHUNK) -> List[Dict]:
+        """
+        Score every candidate ``head(X) <- body(X)`` and keep those meeting
+        ``min_support`` and ``min_confidence``. Heads that appear in their own
+        body are skipped. Returns records sorted by satisfaction.
+        """
+        head_cols = np.array([self.index[h] for h in heads] if heads else range(len(self.predicates)))
+        bodies = list(bodies) if bodies is not None else list(self.iter_bodies(max_body_len))
+        records = []
+        scored = 0
+        start_time = time.perf_counter()
+        for start in range(0, len(bodies), chunk_size):
+            chunk = bodies[start:start + chunk_size]
+            scores = self.score_bodies(chunk)
+            # Bodies no object satisfies hold vacuously and are never kept
+            keep = ((scores["body_count"][:, None] > 0)
+                    & (scores["support"][:, head_cols] >= min_support)
+                    & (scores["confidence"][:, head_cols] >= min_confidence))
+            for c, body in enumerate(chunk):
+                for h in np.flatnonzero(keep[c]):
+                    head = int(head_cols[h])
+                    if head in body:
+                        continue
+                    records.append(self._record(head, body, scores, c))
+            scored += len(chunk) * len(head_cols)
+        elapsed = time.perf_counter() - start_time
+
+        records.sort(key=lambda r: (-r["satisfaction"], r["rule"]))
+        rate = scored / elapsed if elapsed > 0 else float("inf")
+        print(f"Scored {scored} candidate rules in {elapsed:.3f}s ({rate:,.0f} rules/s), kept {len(records)}")
+        return records
+
+    def scene_consistency(self, crisp_rows: np.ndarray) -> np.ndarray:
+        """
+        Fraction of scenes in which no object satisfies the body but not the
+        head, float [len(crisp_rows), num_predicates], like the verifier's
+        per-scene consistency.
+        """
+        violated_head = 1.0 - self.crisp
+        consistency = np.empty((crisp_rows.shape[0], len(self.predicates)), dtype=np.float64)
+        for c, row in enumerate(crisp_rows):
+            objs = np.flatnonzero(row)
+            if not len(objs):
+                consistency[c] = 1.0
+                continue
+            # objs is sorted, so each scene's objects form one run
+            scenes = self.object_scene[objs]
+            starts = np.flatnonzero(np.r_[True, scenes[1:] != scenes[:-1]])
+            violated = np.add.reduceat(violated_head[objs], starts, axis=0) > 0    # [scenes hit, P]
+            consistency[c] = 1.0 - violated.sum(axis=0) / max(self.num_scenes, 1)
+        return consistency
+
+    def top_k(self, k: int = 10, beam_width: int = 32, max_body_len: int = 3, min_support: float = 0.0,
+              min_confidence: float = 0.0, heads: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Best ``k`` rules by combined_score(satisfaction, consistency), found by
+        beam search over bodies. A bounded heap keeps the current top k; a
+        (body, head) pair is not extended once its support is below
+        ``min_support`` (support is anti-monotone) or its optimistic bound
+        cannot beat the k-th best score. Only ``beam_width`` bodies survive
+        each level, so memory stays O(k + beam_width * num_predicates).
+        Returns [] for ``k <= 0``.
+        """
+        if k <= 0:
+            return []
+        head_cols = [self.index[h] for h in heads] if heads else list(range(len(self.predicates)))
+        head_mask = np.zeros(len(self.predicates), dtype=bool)
+        head_mask[head_cols] = True
+        # Smallest truth of any predicate per object: every added conjunct
+        # multiplies the body truth by at least this much.
+        min_truth = self.truth.min(axis=1) if len(self.predicates) else np.ones(self.num_objects, np.float32)
+        violated_head = 1.0 - self.truth
+        n = max(self.num_objects, 1)
+
+        heap: List[Tuple[float, str, Dict]] = []   # min-heap of the best k rules
+        beam: List[Tuple[int, ...]] = [()]
+        scored = 0
+        start_time = time.perf_counter()
+        for depth in range(1, max_body_len + 1):
+            remaining = max_body_len - depth
+            children = sorted({tuple(sorted(body + (col,))) for body in beam
+                               for col in range(len(self.predicates)) if col not in body})
+            priorities = []
+            for start in range(0, len(children), BODY_CHUNK):
+                chunk = children[start:start + BODY_CHUNK]
+                scores = self.score_bodies(chunk)
+                fuzzy, crisp = self.body_rows(chunk)
+                consistency = self.scene_consistency(crisp)
+                combined = combined_score(scores["satisfaction"], consistency)
+                # Optimistic score of any extension by up to ``remaining`` conjuncts
+                if remaining:
+                    sat_bound = 1.0 - ((fuzzy * min_truth ** remaining) @ violated_head) / n
+                    bound = combined_score(sat_bound, 1.0)
+                else:
+                    bound = combined
+                scored += len(chunk) * len(head_cols)
+
+                for c, body in enumerate(chunk):
+                    # A body no object satisfies, and so every extension of it, is vacuous
+                    feasible = head_mask & (scores["body_count"][c] > 0) & (scores["support"][c] >= min_support)
+                    feasible[list(body)] = False
+                    for head in np.flatnonzero(feasible & (scores["confidence"][c] >= min_confidence)):
+                        score = float(combined[c, head])
+                        if len(heap) < k or score > heap[0][0]:
+                            record = self._record(int(head), body, scores, c)
+                            record["consistency"] = float(consistency[c, head])
+                            record["combined_score"] = score
+                            entry = (score, record["rule"], record)
+                            if len(heap) < k:
+                                heapq.heappush(heap, entry)
+                            else:
+                                heapq.heapreplace(heap, entry)
+                    kth = heap[0][0] if len(heap) == k else -np.inf
+                    promising = bound[c][feasible]
+                    if remaining and promising.size and promising.max() > kth:
+                        priorities.append((float(combined[c][feasible].max()), body))
+            # Keep the beam_width most promising bodies for the next level
+            beam = [body for _, body in heapq.nlargest(beam_width, priorities)]
+            if not beam:
+                break
+        elapsed = time.perf_counter() - start_time
+
+        records = [record for _, _, record in sorted(heap, key=lambda e: (-e[0], e[1]))]
+        print(f"Beam search scored {scored} candidate rules in {elapsed:.3f}s, kept top {len(records)}")
+        return records
+
+    def record(self, head: int, body: Sequence[int]) -> Dict:
+        """Record (rule, support, confidence, satisfaction) of one rule given as predicate columns"""
+        body = tuple(body)
+        return self._record(head, body, self.score_bodies([body]), 0)
+
+    def _record(self, head: int, body: Tuple[int, ...], scores: Dict[str, np.ndarray], row: int) -> Dict:
+        head_name = self.predicates[head]
+        body_names = [self.predicates[col] for col in body]
+        return {
+            "rule": format_rule(head_name, body_names),
+            "head": head_name,
+            "body": body_names,
+            "support": float(scores["support"][row, head]),
+            "confidence": float(scores["confidence"][row, head]),
+            "satisfaction": float(scores["satisfaction"][row, head]),
+        }
+
+
+def to_rule_scores(records: List[Dict]) -> List[Tuple[str, float]]:
+    """[(rule, satisfaction_score), ...] as written to synthesized_rules.json"""
+    return [(r["rule"], r["satisfaction"]) for r in records]
@@ -1,25 +1,19 @@
 import json
 import os
-from verify_rule_consistency import RuleVerifier
+from verify_rule_consistency import RuleVerifier, load_grounding_set
+from rule_ast import dedupe_rules
 
-GROUNDINGS_DIR = "data/groundings"
+GROUNDINGS_DIR = os.getenv("GROUNDINGS_DIR", "data/groundings")
 RULES_FILE = "synthesized_rules_fixed.json"
 
-def load_groundings():
-    groundings = []
-    for fname in os.listdir(GROUNDINGS_DIR):
-        if fname.endswith(".json"):
-            with open(os.path.join(GROUNDINGS_DIR, fname)) as f:
-                scene = json.load(f)
-                groundings.append((fname, scene))
-    return groundings
-
 if __name__ == "__main__":
     with open(RULES_FILE) as f:
         rules = json.load(f)
         print("Loaded rules type:", type(rules))
         print("First rule example:", rules[0])
-        rule_strings = [r[0] for r in rules] 
+        # One check per distinct rule, e.g. after fix_rules.py mapped
+        # different templates onto the same predicates
+        rule_strings = dedupe_rules([r[0] for r in rules])
 
 
 
@@ -28,15 +22,11 @@ if __name__ == "__main__":
         "is_small", "is_large", "is_metal", "is_rubber"
     ])
 
-    groundings = load_groundings()
+    # All rules are checked against all scenes in one pass
+    groundings = load_grounding_set(GROUNDINGS_DIR)
 
-    for rule in rule_strings:
-        consistent_count = 0
-        total = 0
-        for fname, scene in groundings[:100]:  # limit to 100 for speed
-            consistent, counterex = verifier.verify_rule(rule, scene)
-            total += 1
-            if consistent:
-                consistent_count += 1
-        print(f"Rule: {rule}")
+    for result in verifier.verify_rules(rule_strings, groundings):
+        consistent_count = sum(result["consistency_scores"])
+        total = len(result["consistency_scores"])
+        print(f"Rule: {result['rule']}")
         print(f"  Consistent in {consistent_count}/{total} scenes\n")
@@ -0,0 +1,176 @@
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# ─── Pairwise spatial relations ─────────────────────────────────────────────
+# CLEVR scenes ship a ``relationships`` field where relationships[r][j] lists
+# the objects that are ``r`` of object j. This module turns it into uint8
+# [N, N] matrices with M[i, j] = 1 iff object i is ``r`` of object j, e.g.
+# is_left_of[i, j] = 1 iff object i is left of object j.
+#
+# For a whole dataset the matrices are packed next to the groundings:
+#
+#   relations.meta         relation names, scene count, format version (JSON,
+#                          named so that ``scene_*.json`` globs never see it)
+#   relations.npy          uint8 [sum_s N_s * N_s, num_relations]
+#   relation_offsets.npy   int64 [num_scenes + 1] pair range of every scene
+RELATION_VERSION = 1
+RELATIONS = [
+    ("left", "is_left_of"),
+    ("right", "is_right_of"),
+    ("front", "is_front_of"),
+    ("behind", "is_behind"),
+]
+RELATION_NAMES = [name for _, name in RELATIONS]
+META_FILE = "relations.meta"
+LEGACY_META_FILE = "relations.json"  # Read as a scene by older *.json globs
+DATA_FILE = "relations.npy"
+OFFSETS_FILE = "relation_offsets.npy"
+
+
+def relation_matrices(scene: Dict) -> np.ndarray:
+    """
+    Relation tensor of one scene, uint8 [num_relations, N, N].
+    Scenes without a ``relationships`` field (e.g. the mini pipeline samples)
+    fall back to comparing coordinates: left/right on x, front/behind on y.
+    """
+    objects = scene.get("objects", [])
+    n = len(objects)
+    matrices = np.zeros((len(RELATIONS), n, n), dtype=np.uint8)
+    relationships = scene.get("relationships")
+    if relationships:
+        for r, (key, _) in enumerate(RELATIONS):
+            for j, related in enumerate(relationships.get(key, [])):
+                matrices[r, related, j] = 1
+        return matrices
+
+    if n:
+        coords = np.array([obj.get("3d_coords", obj.get("position")) for obj in objects],
+                          dtype=np.float64).reshape(n, -1)
+        matrices = coordinate_relations(coords)
+    return matrices
+
+
+def coordinate_relations(coords: np.ndarray) -> np.ndarray:
+    """
+    Relation tensor uint8 [num_relations, N, N] from object coordinates
+    [N, >=2]: left/right on x, front/behind on y.
+    """
+    x, y = coords[:, 0], coords[:, 1]
+    matrices = np.empty((len(RELATIONS), len(coords), len(coords)), dtype=np.uint8)
+    matrices[0] = x[:, None] < x[None, :]
+    matrices[1] = x[:, None] > x[None, :]
+    matrices[2] = y[:, None] > y[None, :]
+    matrices[3] = y[:, None] < y[None, :]
+    return matrices
+
+
+def pad_relation_tensors(scenes: List[Dict], max_objects: Optional[int] = None) -> np.ndarray:
+    """All scenes' relation tensors padded to uint8 [S, num_relations, Nmax, Nmax]"""
+    if max_objects is None:
+        max_objects = max((len(scene.get("objects", [])) for scene in scenes), default=0)
+    padded = np.zeros((len(scenes), len(RELATIONS), max_objects, max_objects), dtype=np.uint8)
+    for s, scene in enumerate(scenes):
+        m = relation_matrices(scene)
+        n = m.shape[1]
+        padded[s, :, :n, :n] = m
+    return padded
+
+
+def write_relation_store(out_dir: str, scenes: List[Dict]) -> str:
+    """Precompute and pack the relation matrices of ``scenes`` into ``out_dir``"""
+    blocks = []
+    offsets = np.zeros(len(scenes) + 1, dtype=np.int64)
+    for s, scene in enumerate(scenes):
+        m = relation_matrices(scene)
+        blocks.append(m.reshape(len(RELATIONS), -1).T)  # [N * N, R]
+        offsets[s + 1] = offsets[s] + blocks[-1].shape[0]
+    data = np.concatenate(blocks) if blocks else np.zeros((0, len(RELATIONS)), dtype=np.uint8)
+
+    os.makedirs(out_dir, exist_ok=True)
+    meta_path = os.path.join(out_dir, META_FILE)
+    for path in (meta_path, os.path.join(out_dir, LEGACY_META_FILE)):
+        if os.path.exists(path):
+            os.remove(path)
+    for filename, array in ((DATA_FILE, data), (OFFSETS_FILE, offsets)):
+        tmp_path = os.path.join(out_dir, f".{filename}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp_path, os.path.join(out_dir, filename))
+
+    meta = {"version": RELATION_VERSION, "relations": RELATION_NAMES, "num_scenes": len(scenes)}
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+
+def has_relation_store(path: str) -> bool:
+    """Return True if ``path`` holds precomputed relation matrices"""
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+class RelationStore:
+    """Read-only, memory-mapped view over packed relation matrices"""
+
+    def __init__(self, store_dir: str):
+        with open(os.path.join(store_dir, META_FILE), "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != RELATION_VERSION:
+            raise ValueError(f"Unsupported relation store version in {store_dir}: {self.meta.get('version')}")
+        self.names: List[str] = list(self.meta["relations"])
+        self.data = np.load(os.path.join(store_dir, DATA_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(store_dir, OFFSETS_FILE), mmap_mode="r")
+        self._index = {name: r for r, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def scene(self, scene_idx: int) -> np.ndarray:
+        """Relation tensor of one scene, uint8 [num_relations, N, N]"""
+        start, end = int(self.offsets[scene_idx]), int(self.offsets[scene_idx + 1])
+        n = int(round((end - start) ** 0.5))
+        return np.asarray(self.data[start:end]).T.reshape(len(self.names), n, n)
+
+    def matrix(self, scene_idx: int, name: str) -> np.ndarray:
+        """One relation of one scene as a uint8 [N, N] matrix"""
+        return self.scene(scene_idx)[self._index[name]]
+
+    def scene_dict(self, scene_idx: int) -> Dict[str, np.ndarray]:
+        """{relation name: [N, N] matrix} for one scene"""
+        tensor = self.scene(scene_idx)
+        return {name: tensor[r] for r, name in enumerate(self.names)}
+
+
+def load_relation_store(path: str) -> Optional[RelationStore]:
+    """RelationStore in ``path``, or None if no relations were precomputed there"""
+    return RelationStore(path) if has_relation_store(path) else None
+
+
+def attach_relations(scenes: List[Dict], path: str) -> List[Dict]:
+    """
+    Add a ``relations`` dict ({name: [N, N] uint8 matrix}) to every grounded
+    scene, looked up by its ``scene_id``. Scenes are returned unchanged if no
+    relation store sits next to the groundings.
+    """
+    store = load_relation_store(path)
+    if store is None:
+        return scenes
+    for scene in scenes:
+        scene_idx = int(scene.get("scene_id", -1))
+        if 0 <= scene_idx < len(store):
+            scene["relations"] = store.scene_dict(scene_idx)
+    return scenes
+
+
+if __name__ == "__main__":
+    # Usage: python spatial_relations.py [clevr_scenes_json] [groundings_dir]
+    scenes_json = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.getenv("CLEVR_DIR", "CLEVR_v1.0"), "scenes", "CLEVR_val_scenes.json")
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else "data/groundings"
+    with open(scenes_json, "r") as f:
+        scenes = json.load(f)["scenes"]
+    write_relation_store(out_dir, scenes)
+    print(f"✓ Precomputed {len(RELATIONS)} relations for {len(scenes)} scenes -> {out_dir}")
@@ -3,11 +3,30 @@ import z3
 import numpy as np
 from typing import List, Dict, Tuple
 import os
+import time
+import argparse
+import itertools
+import multiprocessing
+from grounding_store import GroundingStore, is_grounding_store, json_scene_files
+from spatial_relations import RELATION_NAMES, attach_relations
+from rule_miner import RuleMiner, grounding_matrix, truth_matrix, to_rule_scores
+from rule_cache import RuleCache, open_rule_cache
+from rule_ast import GroundingTensor, compile_rule, dedupe_rules, parse_rule
+
+Z3_VERDICT = "z3_verdict@reichenbach"   # Rule cache kind: [status, satisfaction_score, check latency]
+CEGIS_CONFIDENCE = 0.9   # Target confidence of the cegis engine when --min-confidence is not given
+CONFIDENCE_SCALE = 10**6  # Integer resolution of the maxsat confidence weights
+MAX_RATIO_STEPS = 20      # Dinkelbach iterations per maxsat optimum
 
 class RuleSynthesizer:
-    def __init__(self, predicates: List[str], max_vars: int = 3):
+    def __init__(self, predicates: List[str], max_vars: int = 3, min_support: float = 0.0,
+                 min_confidence: float = 0.0, max_body_len: int = 1):
         self.predicates = predicates
         self.max_vars = max_vars
+        # Mining thresholds (see mine_rules)
+        self.min_support = min_support
+        self.min_confidence = min_confidence
+        self.max_body_len = max_body_len
         self.rule_templates = self._generate_rule_templates()
         
     def _generate_rule_templates(self) -> List[str]:
@@ -27,154 +46,590 @@ class RuleSynthesizer:
         
         return templates
     
+    def instantiate_templates(self, templates: List[str] = None, relations: List[str] = RELATION_NAMES) -> List[str]:
+        """
+        Candidate rules: every template with its placeholders (head, body1, ...)
+        replaced by distinct names of matching arity. Placeholders applied to
+        one variable take self.predicates, to two variables spatial relations.
+        """
+        templates = templates if templates is not None else self.rule_templates
+        candidates = []
+        for template in templates:
+            rule = parse_rule(template)
+            arity = {}
+            for atom in rule.atoms:
+                if arity.setdefault(atom.name, atom.arity) != atom.arity:
+                    raise ValueError(f"Placeholder {atom.name} is used with different arities: {template}")
+            if any(a not in (1, 2) for a in arity.values()):
+                print(f"Skipping template with placeholders of arity other than 1 or 2: {template}")
+                continue
+            unary_slots = [p for p, a in arity.items() if a == 1]
+            binary_slots = [p for p, a in arity.items() if a == 2]
+            for unary in itertools.permutations(self.predicates, len(unary_slots)):
+                for rel in itertools.permutations(relations, len(binary_slots)):
+                    names = dict(zip(unary_slots + binary_slots, unary + rel))
+                    candidates.append(str(rule.rename(names)))
+        return candidates
+    
     def _encode_rule(self, template: str, predicates: List[str]) -> z3.ExprRef:
         """Convert a rule template into a Z3 expression"""
-        # Create variables
-        vars = {f"{chr(88 + i)}": z3.Int(f"{chr(88 + i)}") for i in range(self.max_vars)}  # Use uppercase letters X, Y, Z
+        rule = parse_rule(template)
+        if rule.arity > self.max_vars:
+            raise ValueError(f"Rule uses {rule.arity} variables, max_vars is {self.max_vars}: {template}")
         
-        # Split template into head and body. Support both Unicode and ASCII
-        # arrows for backward compatibility.
-        if "<-" in template:
-            head, body = template.split("<-")
-        else:
-            head, body = template.split("\u2190")
-        head = head.strip()
-        body = body.strip()
-        
-        # Create Z3 expressions for each predicate
-        body_exprs = []
-        # Allow either "&" or the Unicode conjunction.
-        body_parts = body.split("&") if "&" in body else body.split("\u2227")
-        for pred in body_parts:
-            pred = pred.strip()
-            pred_name, var_names = pred.split("(")
-            var_names = var_names.strip("()")
-            var_names = var_names.split(",")
-            
-            # Create Z3 variables
-            z3_vars = [vars[var.strip()] for var in var_names]
+        # One Boolean per atom, e.g. is_red(X); the body is their conjunction
+        body_expr = z3.And(*[z3.Bool(str(atom)) for atom in rule.body])
+        head_expr = z3.Bool(str(rule.head))
+        
+        return z3.Implies(body_expr, head_expr)
+    
+    def _build_base_solver(self, groundings) -> Tuple[z3.Solver, GroundingTensor, int]:
+        """
+        Assert the grounding facts once into a solver shared by all candidates.
+        ``groundings`` is a list of scene dicts or a GroundingStore.
+        Returns the solver, the groundings as a GroundingTensor (for scoring
+        candidates) and the number of asserted facts.
+        """
+        if isinstance(groundings, GroundingStore):
+            return self._build_store_solver(groundings)
+        solver = z3.Solver()
+        total_scenes = len(groundings)
+        
+        # Z3 variables by name, one per grounded (object, predicate)
+        scene_vars = {}
+        variables = []
+        num_facts = 0
+        
+        for scene_idx, scene in enumerate(groundings):
+            if scene_idx % 10 == 0:  
+                print(f"  Processing scene {scene_idx + 1}/{total_scenes}")
             
-            # Create predicate expression
-            pred_expr = z3.Bool(f"{pred_name}({','.join(map(str, z3_vars))})")
-            body_exprs.append(pred_expr)
+            for idx, obj in enumerate(scene["objects"]):
+                obj_id = obj.get('id', f'obj_{idx}')
+                for pred, score in obj["predicates"].items():
+                    var_name = f"{pred}_{obj_id}"
+                    if var_name not in scene_vars:
+                        scene_vars[var_name] = len(variables)
+                        variables.append(z3.Real(var_name))
+                    var = variables[scene_vars[var_name]]
+                    solver.add(var >= score)
+                    solver.add(var <= 1.0)
+                    num_facts += 2
         
-        # Combine body expressions with AND
-        body_expr = z3.And(*body_exprs)
+        return solver, GroundingTensor.from_scenes(groundings), num_facts
+    
+    @staticmethod
+    def _build_store_solver(store: GroundingStore) -> Tuple[z3.Solver, GroundingTensor, int]:
+        """
+        ``_build_base_solver`` read straight from the store's truth matrix.
+        Store objects have no ids, so object ``i`` of every scene shares the
+        variable ``<pred>_obj_<i>``; only its largest grounded value is
+        asserted, which is what the per-scene bounds add up to.
+        """
+        solver = z3.Solver()
+        offsets = np.asarray(store.scene_offsets, dtype=np.int64)
+        local = np.arange(store.num_objects) - offsets[store.object_scene]
+        bounds = np.full((int(local.max(initial=-1)) + 1, len(store.predicates)), np.nan, dtype=np.float32)
+        np.fmax.at(bounds, local, np.asarray(store.truth, dtype=np.float32))
         
-        # Create head expression
-        head_name, var_names = head.split("(")
-        var_names = var_names.strip("()")
-        var_names = var_names.split(",")
-        z3_vars = [vars[var.strip()] for var in var_names]
-        head_expr = z3.Bool(f"{head_name}({','.join(map(str, z3_vars))})")
+        num_facts = 0
+        for idx, row in enumerate(bounds.tolist()):
+            for pred, score in zip(store.predicates, row):
+                if score != score:  # NaN: never grounded
+                    continue
+                var = z3.Real(f"{pred}_obj_{idx}")
+                solver.add(var >= score)
+                solver.add(var <= 1.0)
+                num_facts += 2
         
-        return z3.Implies(body_expr, head_expr)
+        return solver, GroundingTensor.from_store(store), num_facts
+    
+    def _check_candidate(self, solver: z3.Solver, candidate: str,
+                         groundings: GroundingTensor) -> Tuple[str, float, float]:
+        """
+        Check one candidate on top of the grounding facts in ``solver``.
+        Returns (status, satisfaction_score or None, check latency in seconds)
+        where status is "sat", "unsat" or "unknown" (e.g. timed out).
+        """
+        # Add rule template constraint in a scope of its own
+        solver.push()
+        try:
+            solver.add(self._encode_rule(candidate, self.predicates))
+            check_start = time.perf_counter()
+            result = solver.check()
+            latency = time.perf_counter() - check_start
+            score = None
+            if result == z3.sat:
+                score = self._satisfaction_score(candidate, groundings)
+        finally:
+            # Drop the candidate, keep the grounding facts
+            solver.pop()
+        return str(result), score, latency
     
-    def synthesize_rules(self, groundings: List[Dict]) -> List[Tuple[str, float]]:
+    def synthesize_rules(self, groundings, candidates: List[str] = None,
+                         timeout_ms: int = None, cache: RuleCache = None) -> List[Tuple[str, float]]:
         """
-        Synthesize rules from grounded scenes
+        Synthesize rules from grounded scenes (a list of scene dicts or a
+        GroundingStore, see load_groundings). The grounding facts are asserted
+        once; every candidate (default: self.rule_templates) is checked in its
+        own push()/pop() scope on top of them, for at most ``timeout_ms``.
+        Each distinct rule is checked once and tautologies are skipped (see
+        rule_ast.dedupe_rules). Verdicts already in ``cache`` are reused, and
+        the solver is only built if some candidate is missing.
         Returns a list of (rule, satisfaction_score) tuples
         """
+        candidates = dedupe_rules(candidates if candidates is not None else self.rule_templates)
         rules = []
         total_scenes = len(groundings)
         
         print(f"Starting rule synthesis with {total_scenes} scenes...")
         
-        for template_idx, template in enumerate(self.rule_templates):
-            print(f"\nProcessing template {template_idx + 1}/{len(self.rule_templates)}: {template}")
-            
-            # Create Z3 solver
-            solver = z3.Solver()  
-            
-            # Dictionary to store Z3 variables
-            scene_vars = {}
-            
-            # Add grounded facts to solver
-            for scene_idx, scene in enumerate(groundings):
-                if scene_idx % 10 == 0:  
-                    print(f"  Processing scene {scene_idx + 1}/{total_scenes}")
-                
-                for idx, obj in enumerate(scene["objects"]):
-                    for pred, score in obj["predicates"].items():
-                        obj_id = obj.get('id', f'obj_{idx}')
-                        var_name = f"{pred}_{obj_id}"
-                        if var_name not in scene_vars:
-                            scene_vars[var_name] = z3.Real(var_name)
-                        var = scene_vars[var_name]
-                        solver.add(var >= score)
-                        solver.add(var <= 1.0)
-            
-            # Add rule template constraint
-            rule_expr = self._encode_rule(template, self.predicates)
-            solver.add(rule_expr)
+        cached = {}
+        if cache is not None:
+            for template in candidates:
+                verdict = cache.get(Z3_VERDICT, template)
+                if verdict is not None:
+                    cached[template] = verdict
+            print(f"Reusing {len(cached)}/{len(candidates)} cached verdicts")
+        
+        if len(cached) < len(candidates):
+            build_start = time.perf_counter()
+            solver, tensor, num_facts = self._build_base_solver(groundings)
+            if timeout_ms:
+                solver.set("timeout", timeout_ms)
+            print(f"Asserted {num_facts} grounding facts in {time.perf_counter() - build_start:.2f}s")
+        
+        # Per-candidate check latency in seconds, in candidate order
+        self.check_latencies = []
+        
+        for template_idx, template in enumerate(candidates):
+            print(f"\nProcessing template {template_idx + 1}/{len(candidates)}: {template}")
             
-            # Check if rule is satisfiable
-            if solver.check() == z3.sat:
-                model = solver.model()
-                satisfaction_score = self._compute_satisfaction_score(model, groundings, scene_vars)
+            if template in cached:
+                status, satisfaction_score, latency = cached[template]
+            else:
+                status, satisfaction_score, latency = self._check_candidate(solver, template, tensor)
+                self.check_latencies.append(latency)
+                if cache is not None and status != "unknown":
+                    cache.put(Z3_VERDICT, template, [status, satisfaction_score, latency])
+            if status == "sat":
                 rules.append((template, satisfaction_score))
-                print(f"  Found satisfiable rule with score: {satisfaction_score:.2f}")
+                print(f"  Found satisfiable rule with score: {satisfaction_score:.2f} (check {latency * 1000:.1f} ms)")
+            elif status == "unknown":
+                print(f"  Check gave up: {solver.reason_unknown()} (check {latency * 1000:.1f} ms)")
             else:
-                print("  Rule not satisfiable")
-            
-            # Clear solver to free memory
-            solver.reset()
+                print(f"  Rule not satisfiable (check {latency * 1000:.1f} ms)")
         
         # Sort rules by satisfaction score
         rules.sort(key=lambda x: x[1], reverse=True)
         
         print("\nRule synthesis complete!")
         print(f"Found {len(rules)} satisfiable rules")
+        self._report_latencies(self.check_latencies)
         
         return rules
     
-    def _compute_satisfaction_score(self, model: z3.ModelRef, groundings: List[Dict], scene_vars: Dict[str, z3.ExprRef]) -> float:
-        """Compute rule satisfaction score across all scenes"""
-        total_score = 0
-        num_scenes = len(groundings)
+    @staticmethod
+    def _report_latencies(latencies: List[float]):
+        if latencies:
+            latencies = np.array(latencies) * 1000
+            print(f"Check latency per candidate: mean {latencies.mean():.1f} ms, "
+                  f"median {np.median(latencies):.1f} ms, max {latencies.max():.1f} ms")
+    
+    def synthesize_rules_parallel(self, grounding_dir: str, candidates: List[str] = None, workers: int = 2,
+                                  timeout_ms: int = None, shards_per_worker: int = 4,
+                                  cache: RuleCache = None) -> List[Tuple[str, float]]:
+        """
+        ``synthesize_rules`` with candidates split into contiguous shards over
+        a pool of ``workers`` processes. Every worker loads the groundings from
+        ``grounding_dir`` (a memory-mapped store is shared read-only through
+        the page cache) and builds its own Z3 context once. Verdicts already
+        in ``cache`` are reused as in the serial path; only the others are
+        sharded. Results are merged by (score, candidate order), so the
+        ranking matches the serial path regardless of scheduling.
+        """
+        candidates = dedupe_rules(candidates if candidates is not None else self.rule_templates)
+        cached = []
+        if cache is not None:
+            for idx, candidate in enumerate(candidates):
+                verdict = cache.get(Z3_VERDICT, candidate)
+                if verdict is not None:
+                    cached.append((idx, candidate, *verdict))
+            print(f"Reusing {len(cached)}/{len(candidates)} cached verdicts")
+        done = {idx for idx, *_ in cached}
+        pending = [(idx, candidate) for idx, candidate in enumerate(candidates) if idx not in done]
         
-        for scene in groundings:
-            scene_score = 0
-            for obj in scene["objects"]:
-                for pred, score in obj["predicates"].items():
-                    obj_id = obj.get('id', f'obj_{scene["objects"].index(obj)}')
-                    var_name = f"{pred}_{obj_id}"
-                    if var_name in scene_vars:
-                        var = scene_vars[var_name]
-                        # Use model.eval() to get the concrete value
-                        var_value = model.eval(var)
-                        # Check if the boolean value is True
-                        if var_value == z3.BoolVal(True):
-                            scene_score += float(var_value.as_decimal(2))
-            total_score += scene_score
-        
-        return total_score / (num_scenes * len(self.predicates))
+        shard_results = []
+        if pending:
+            num_shards = max(1, min(len(pending), workers * shards_per_worker))
+            bounds = np.linspace(0, len(pending), num_shards + 1).astype(int)
+            tasks = [pending[start:end] for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+            print(f"Checking {len(pending)} candidates in {len(tasks)} shards on {workers} workers...")
+            
+            ctx = multiprocessing.get_context("spawn")
+            with ctx.Pool(workers, initializer=_init_synthesis_worker,
+                          initargs=(grounding_dir, self.predicates, self.max_vars, timeout_ms)) as pool:
+                shard_results = pool.map(_synthesize_shard, tasks)
+        
+        fresh = list(itertools.chain.from_iterable(shard_results))
+        if cache is not None:
+            for _, candidate, status, score, latency in fresh:
+                if status != "unknown":
+                    cache.put(Z3_VERDICT, candidate, [status, score, latency])
+        results = sorted(cached + fresh)
+        self.check_latencies = [latency for _, _, _, _, latency in fresh]
+        timed_out = [candidate for _, candidate, status, _, _ in results if status == "unknown"]
+        rules = [(candidate, score) for idx, candidate, status, score, _ in results if status == "sat"]
+        rules.sort(key=lambda x: x[1], reverse=True)
+        
+        print(f"Found {len(rules)} satisfiable rules, {len(timed_out)} checks gave up")
+        self._report_latencies(self.check_latencies)
+        return rules
+    
+    def mine_rules(self, groundings, max_body_len: int = None) -> List[Tuple[str, float]]:
+        """
+        Score unary rules head(X) <- body(X) over self.predicates on the
+        (object x predicate) truth matrix instead of a Z3 model. Bodies are
+        searched level-wise and pruned below self.min_support; rules must
+        also reach self.min_confidence. ``groundings`` is a list of scene
+        dicts or a grounding directory.
+        Returns (rule, satisfaction_score) tuples, best first.
+        """
+        max_body_len = max_body_len if max_body_len is not None else self.max_body_len
+        names, truth = truth_matrix(groundings, self.predicates)
+        print(f"Mining rules over {truth.shape[0]} objects x {len(names)} predicates...")
+        miner = RuleMiner(names, truth)
+        records = miner.mine_apriori(self.min_support, self.min_confidence, max_body_len)
+        return to_rule_scores(records)
 
-def load_groundings(grounding_dir: str) -> List[Dict]:
-    """Load grounded scenes from JSON files"""
+    @staticmethod
+    def _selector_problem(names: List[str], max_body_len: int, timeout_ms: int = None):
+        """
+        z3.Optimize over the choice of a unary rule: one head selector and
+        1..max_body_len body selectors per predicate, never both for the same
+        predicate. Returns (opt, head_sel, body_sel).
+        """
+        head_sel = [z3.Bool(f"head_{name}") for name in names]
+        body_sel = [z3.Bool(f"body_{name}") for name in names]
+        opt = z3.Optimize()
+        if timeout_ms:
+            opt.set("timeout", timeout_ms)
+        opt.add(z3.PbEq([(h, 1) for h in head_sel], 1))
+        opt.add(z3.PbGe([(b, 1) for b in body_sel], 1))
+        opt.add(z3.PbLe([(b, 1) for b in body_sel], max_body_len))
+        for h, b in zip(head_sel, body_sel):
+            opt.add(z3.Not(z3.And(h, b)))
+        return opt, head_sel, body_sel
+    
+    @staticmethod
+    def _row_literals(head_sel, body_sel, row: np.ndarray) -> Tuple[z3.ExprRef, z3.ExprRef]:
+        """
+        ("body holds", "head holds") on one thresholded object row: no
+        selected body predicate is false there, resp. the head's is true.
+        """
+        body = z3.And([z3.Not(body_sel[p]) for p in range(len(row)) if not row[p]])
+        head = z3.Or([head_sel[p] for p in range(len(row)) if row[p]])
+        return body, head
+    
+    @classmethod
+    def _add_row(cls, opt: z3.Optimize, head_sel, body_sel, row: np.ndarray, count: int) -> z3.ExprRef:
+        """
+        Soft constraint body -> head on one thresholded object row, weighted
+        by ``count``. Returns the "body holds on this row" literal.
+        """
+        body, head = cls._row_literals(head_sel, body_sel, row)
+        opt.add_soft(z3.Implies(body, head), int(count))
+        return body
+    
+    @staticmethod
+    def _decode_rule(model: z3.ModelRef, head_sel, body_sel) -> Tuple[int, Tuple[int, ...]]:
+        """(head column, body columns) selected in ``model``"""
+        head = next(p for p, h in enumerate(head_sel) if z3.is_true(model.eval(h, model_completion=True)))
+        body = tuple(p for p, b in enumerate(body_sel) if z3.is_true(model.eval(b, model_completion=True)))
+        return head, body
+    
+    def optimize_rules(self, groundings, top_n: int = 1, timeout_ms: int = None,
+                       max_body_len: int = None) -> List[Tuple[str, float]]:
+        """
+        MaxSAT synthesis of unary rules head(X) <- body(X) with z3.Optimize.
+        Boolean selectors pick one head and 1..max_body_len body predicates
+        from self.predicates; the body must hold on at least
+        max(min_support, 1 object) of the objects. Each optimum is the rule
+        of highest confidence, ties broken by support (see
+        _max_confidence_model). After each optimum the selector assignment
+        is blocked, giving up to ``top_n`` distinct optima, best first.
+        Returns (rule, satisfaction_score) tuples with the miner's fuzzy
+        satisfaction.
+        """
+        max_body_len = max_body_len if max_body_len is not None else self.max_body_len
+        names, truth = truth_matrix(groundings, self.predicates)
+        miner = RuleMiner(names, truth)
+        rows, counts = miner.transactions()
+        
+        opt, head_sel, body_sel = self._selector_problem(names, max_body_len, timeout_ms)
+        literals = [(*self._row_literals(head_sel, body_sel, row.astype(bool)), int(count))
+                    for row, count in zip(rows, counts)]
+        min_objects = max(int(np.ceil(self.min_support * miner.num_objects)), 1)
+        opt.add(z3.PbGe([(body, count) for body, _, count in literals], min_objects))
+        print(f"MaxSAT over {len(rows)} distinct object rows ({miner.num_objects} objects) "
+              f"x {len(names)} predicates")
+        
+        rules = []
+        for _ in range(top_n):
+            check_start = time.perf_counter()
+            found = self._max_confidence_model(opt, literals, head_sel, body_sel, miner)
+            latency = time.perf_counter() - check_start
+            if found is None:
+                break
+            model, record, steps = found
+            rules.append((record["rule"], record["satisfaction"]))
+            print(f"  Optimum {len(rules)}: {record['rule']}  (confidence {record['confidence']:.3f}, "
+                  f"support {record['support']:.3f}, satisfaction {record['satisfaction']:.3f}, "
+                  f"{steps} steps, {latency:.2f}s)")
+            
+            # Block this head/body assignment to get the next distinct optimum
+            opt.add(z3.Or([sel != model.eval(sel, model_completion=True) for sel in head_sel + body_sel]))
+        return rules
+    
+    def _max_confidence_model(self, opt: z3.Optimize, literals, head_sel, body_sel, miner: RuleMiner):
+        """
+        Selector model of the highest-confidence rule allowed by ``opt``, by
+        Dinkelbach iteration on the ratio joint / body: for the confidence c
+        of the last rule, maximize joint - c * body (soft "body and head"
+        weighted 1 per object, soft "not body" weighted c), which is positive
+        iff some rule beats c. A second objective maximizes the joint count,
+        so equally confident rules are ranked by support. Returns (model,
+        miner record, steps), or None if no rule is left or Z3 gave up.
+        """
+        best, confidence = None, 0.0
+        for step in range(1, MAX_RATIO_STEPS + 1):
+            opt.push()
+            for body, head, count in literals:
+                opt.add_soft(z3.And(body, head), count * CONFIDENCE_SCALE, id="confidence")
+                penalty = round(count * confidence * CONFIDENCE_SCALE)
+                if penalty:
+                    opt.add_soft(z3.Not(body), penalty, id="confidence")
+            for body, head, count in literals:
+                opt.add_soft(z3.And(body, head), count, id="support")
+            result = opt.check()
+            model = opt.model() if result == z3.sat else None
+            if result == z3.unknown:
+                print(f"  Optimize gave up: {opt.reason_unknown()}")
+            opt.pop()
+            if model is None:
+                return best
+            record = miner.record(*self._decode_rule(model, head_sel, body_sel))
+            if best is not None and record["confidence"] <= confidence:
+                break
+            best, confidence = (model, record, step), record["confidence"]
+        return best
+    
+    def cegis_rules(self, groundings, sample_scenes: int = 20, max_iters: int = 20,
+                    min_confidence: float = None, timeout_ms: int = None, max_body_len: int = None,
+                    seed: int = 0) -> List[Tuple[str, float]]:
+        """
+        Counterexample-guided synthesis of one unary rule. The MaxSAT problem
+        of ``optimize_rules`` starts from the objects of ``sample_scenes``
+        random scenes only. Each candidate is verified on the full truth
+        matrix; if its confidence is below ``min_confidence`` (default:
+        self.min_confidence, which must then be positive) the distinct rows
+        of its violating objects are added as new soft constraints and the
+        solver runs again, so the solver grows with the counterexamples
+        rather than the dataset. Returns [(rule, satisfaction_score)] for the accepted
+        candidate, or [] if none was found within ``max_iters``.
+        """
+        max_body_len = max_body_len if max_body_len is not None else self.max_body_len
+        if min_confidence is None:
+            min_confidence = self.min_confidence
+        if not 0.0 < min_confidence <= 1.0:
+            raise ValueError(f"cegis_rules needs a target confidence in (0, 1], got {min_confidence}; "
+                             f"pass min_confidence or set RuleSynthesizer(min_confidence=...)")
+        names, truth, offsets = grounding_matrix(groundings, self.predicates)
+        miner = RuleMiner(names, truth, scene_offsets=offsets)
+        crisp = miner.crisp.astype(bool)
+        rows, counts = miner.transactions()
+        row_count = {row.astype(bool).tobytes(): int(count) for row, count in zip(rows, counts)}
+        
+        opt, head_sel, body_sel = self._selector_problem(names, max_body_len, timeout_ms)
+        working = {}        # row bytes -> "body holds" literal
+        
+        def add_rows(objects):
+            added = 0
+            for row in np.unique(crisp[objects], axis=0):
+                key = row.tobytes()
+                if key not in working:
+                    working[key] = self._add_row(opt, head_sel, body_sel, row, row_count[key])
+                    added += 1
+            return added
+        
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(miner.num_scenes, size=min(sample_scenes, miner.num_scenes), replace=False)
+        add_rows(np.isin(miner.object_scene, sample))
+        print(f"CEGIS: {len(working)} distinct rows from {len(sample)} sampled scenes "
+              f"({miner.num_objects} objects in total), target confidence {min_confidence:g}")
+        
+        for iteration in range(1, max_iters + 1):
+            # Synthesize: best rule on the working set, with non-empty support there
+            opt.push()
+            weights = [(lit, row_count[key]) for key, lit in working.items()]
+            working_weight = sum(w for _, w in weights)
+            opt.add(z3.PbGe(weights, max(int(np.ceil(self.min_support * working_weight)), 1)))
+            synth_start = time.perf_counter()
+            result = opt.check()
+            synth_time = time.perf_counter() - synth_start
+            model = opt.model() if result == z3.sat else None
+            opt.pop()
+            if model is None:
+                print(f"  Iteration {iteration}: no candidate ({result}, {synth_time:.2f}s)")
+                return []
+            head, body = self._decode_rule(model, head_sel, body_sel)
+            
+            # Verify on the full matrix
+            verify_start = time.perf_counter()
+            body_true = crisp[:, list(body)].all(axis=1)
+            violating = np.flatnonzero(body_true & ~crisp[:, head])
+            confidence = 1.0 - len(violating) / max(int(body_true.sum()), 1)
+            verify_time = time.perf_counter() - verify_start
+            record = miner.record(head, body)
+            print(f"  Iteration {iteration}: {record['rule']}  confidence {confidence:.3f}, "
+                  f"{len(violating)} counterexamples  (synth {synth_time:.2f}s, verify {verify_time:.3f}s, "
+                  f"working set {len(working)} rows)")
+            if confidence >= min_confidence:
+                return [(record["rule"], record["satisfaction"])]
+            
+            # Refine: add the violating objects' rows to the working set
+            if not add_rows(violating):
+                print("  Counterexample rows already in the working set; stopping")
+                return []
+        print(f"  No rule reached confidence {min_confidence:g} in {max_iters} iterations")
+        return []
+    
+    def top_k_rules(self, groundings, k: int = 10, beam_width: int = 32,
+                    max_body_len: int = None) -> List[Tuple[str, float]]:
+        """
+        Best ``k`` unary rules by the combined satisfaction/consistency score
+        of analyze_rules.rank_rules, via bounded beam search (see
+        RuleMiner.top_k). Returns (rule, satisfaction_score) tuples.
+        """
+        max_body_len = max_body_len if max_body_len is not None else self.max_body_len
+        names, truth, offsets = grounding_matrix(groundings, self.predicates)
+        miner = RuleMiner(names, truth, scene_offsets=offsets)
+        records = miner.top_k(k, beam_width, max_body_len, self.min_support, self.min_confidence)
+        for r in records:
+            print(f"  {r['combined_score']:.3f}  {r['rule']}")
+        return to_rule_scores(records)
+
+    @staticmethod
+    def _satisfaction_score(rule: str, groundings: GroundingTensor) -> float:
+        """
+        Fuzzy satisfaction of ``rule`` on its own groundings: the mean
+        Reichenbach implication 1 - b + b * head over all bindings of its
+        variables to the objects of a scene, as in RuleMiner.score_bodies
+        (missing groundings are 0)
+        """
+        body, head, valid = compile_rule(rule).evaluate(groundings)
+        if not valid.any():
+            return 0.0
+        return float((1.0 - body + body * head)[valid].mean(dtype=np.float64))
+
+
+def load_groundings(grounding_dir: str):
+    """
+    Load grounded scenes: a grounding store is opened as a GroundingStore
+    (read as a matrix, without rebuilding scene dicts); JSON files are loaded
+    as scene dicts with the precomputed relation matrices attached when present.
+    """
+    if is_grounding_store(grounding_dir):
+        return GroundingStore(grounding_dir)
     groundings = []
-    for filename in os.listdir(grounding_dir):
-        if filename.endswith(".json"):
-            with open(os.path.join(grounding_dir, filename), "r") as f:
-                scene = json.load(f)
-                groundings.append(scene)
-    return groundings
+    for filename in json_scene_files(grounding_dir):
+        with open(os.path.join(grounding_dir, filename), "r") as f:
+            scene = json.load(f)
+            groundings.append(scene)
+    return attach_relations(groundings, grounding_dir)
+
+# ─── Parallel synthesis workers ─────────────────────────────────────────────
+_worker_synthesizer = None
+_worker_context = None
+
+
+def _init_synthesis_worker(grounding_dir, predicates, max_vars, timeout_ms):
+    """Pool initializer: load the groundings and assert them once per worker"""
+    global _worker_synthesizer, _worker_context
+    groundings = load_groundings(grounding_dir)
+    _worker_synthesizer = RuleSynthesizer(predicates, max_vars)
+    solver, tensor, _ = _worker_synthesizer._build_base_solver(groundings)
+    if timeout_ms:
+        solver.set("timeout", timeout_ms)
+    _worker_context = (solver, tensor)
+
+
+def _synthesize_shard(task):
+    """Check one shard of (index, candidate) pairs: [(index, rule, status, score, latency)]"""
+    solver, tensor = _worker_context
+    results = []
+    for idx, candidate in task:
+        status, score, latency = _worker_synthesizer._check_candidate(solver, candidate, tensor)
+        results.append((idx, candidate, status, score, latency))
+    return results
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthesize rules from grounded scenes")
+    parser.add_argument("--engine", choices=["z3", "miner", "beam", "maxsat", "cegis"], default="z3",
+                        help="Z3 template check, vectorized rule mining, top-k beam search, "
+                             "z3.Optimize, or counterexample-guided z3.Optimize")
+    parser.add_argument("--max-body-len", type=int, default=1, help="Body conjuncts per mined rule")
+    parser.add_argument("--min-support", type=float, default=0.0,
+                        help="Minimum fraction of objects satisfying body and head")
+    parser.add_argument("--min-confidence", type=float, default=None,
+                        help=f"Minimum fraction of body objects that satisfy the head "
+                             f"(default: 0, or {CEGIS_CONFIDENCE} as the cegis target)")
+    parser.add_argument("--top-k", type=int, default=10,
+                        help="Rules kept by the beam engine / distinct optima of the maxsat engine")
+    parser.add_argument("--beam-width", type=int, default=32, help="Bodies extended per level (beam engine)")
+    parser.add_argument("--instantiate", action="store_true",
+                        help="Check every predicate/relation assignment of the templates (z3 engine)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes checking candidates (z3 engine)")
+    parser.add_argument("--no-rule-cache", action="store_true", help="Ignore and skip the persistent rule cache")
+    parser.add_argument("--timeout-ms", type=int, default=None,
+                        help="Per-candidate Z3 check timeout (per optimum for maxsat)")
+    args = parser.parse_args()
+
     # Example predicates for CLEVR
     PREDICATES = [
         "is_red", "is_blue", "is_green", "is_cube", 
         "is_cylinder", "is_sphere", "is_large", "is_small"
     ]
     
-    # Load groundings
-    groundings = load_groundings("data/groundings")
+    grounding_dir = os.getenv("GROUNDINGS_DIR", "data/groundings")
     
     # Initialize synthesizer
-    synthesizer = RuleSynthesizer(PREDICATES)
+    min_confidence = args.min_confidence if args.min_confidence is not None else 0.0
+    synthesizer = RuleSynthesizer(PREDICATES, min_support=args.min_support,
+                                  min_confidence=min_confidence, max_body_len=args.max_body_len)
     
-    # Synthesize rules
-    rules = synthesizer.synthesize_rules(groundings)
+    # Synthesize rules (the miner reads a grounding store's matrix directly)
+    if args.engine == "miner":
+        rules = synthesizer.mine_rules(grounding_dir)
+    elif args.engine == "beam":
+        rules = synthesizer.top_k_rules(grounding_dir, args.top_k, args.beam_width)
+    elif args.engine == "maxsat":
+        rules = synthesizer.optimize_rules(grounding_dir, args.top_k, args.timeout_ms)
+    elif args.engine == "cegis":
+        target = args.min_confidence if args.min_confidence is not None else CEGIS_CONFIDENCE
+        rules = synthesizer.cegis_rules(grounding_dir, min_confidence=target, timeout_ms=args.timeout_ms)
+    else:
+        candidates = synthesizer.instantiate_templates() if args.instantiate else None
+        cache = None if args.no_rule_cache else open_rule_cache(grounding_dir)
+        if args.workers > 1:
+            rules = synthesizer.synthesize_rules_parallel(grounding_dir, candidates, args.workers, args.timeout_ms,
+                                                          cache=cache)
+        else:
+            groundings = load_groundings(grounding_dir)
+            rules = synthesizer.synthesize_rules(groundings, candidates, args.timeout_ms, cache)
+        if cache is not None:
+            cache.close()
     
     # Save results
     with open("synthesized_rules.json", "w") as f:
@@ -0,0 +1,64 @@
+import json
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+# The modules are flat scripts in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def write_json_groundings(out_dir, num_scenes, seed, red_cube=(0.5, 0.5), num_objects=2):
+    """
+    Per-scene grounding JSON files (scene_<id>.json) with is_red / is_cube
+    truth values. An object is a cube with probability red_cube[0] if red,
+    else red_cube[1].
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    for s in range(num_scenes):
+        objects = []
+        for i in range(num_objects):
+            red = rng.random() < 0.5
+            cube = rng.random() < (red_cube[0] if red else red_cube[1])
+            objects.append({"id": f"{s}_{i}", "position": [rng.uniform(-3, 3), rng.uniform(-3, 3), 0.35],
+                            "predicates": {"is_red": float(red), "is_cube": float(cube)}})
+        with open(os.path.join(out_dir, f"scene_{s:04d}.json"), "w") as f:
+            json.dump({"scene_id": s, "objects": objects}, f)
+    return str(out_dir)
+
+
+def noisy_scenes(num_scenes=60, seed=0):
+    """
+    Scene dicts of three objects with is_red / is_cube / is_large / is_small.
+    Red objects are cubes 95% of the time, others 20%; size is independent
+    of both and is_small is exactly not is_large.
+    """
+    rng = np.random.default_rng(seed)
+    scenes = []
+    for s in range(num_scenes):
+        objects = []
+        for i in range(3):
+            red = rng.random() < 0.3
+            cube = rng.random() < (0.95 if red else 0.2)
+            large = rng.random() < 0.5
+            objects.append({"id": f"{s}_{i}", "predicates": {"is_red": float(red), "is_cube": float(cube),
+                                                              "is_large": float(large), "is_small": float(not large)}})
+        scenes.append({"scene_id": s, "objects": objects})
+    return scenes
+
+
+@pytest.fixture
+def json_groundings(tmp_path):
+    """Eight two-object scenes as a per-scene JSON directory"""
+    return write_json_groundings(tmp_path / "groundings", num_scenes=8, seed=3)
+
+
+@pytest.fixture
+def isolated_cwd(tmp_path, monkeypatch):
+    """Run in tmp_path, so the default data/rule_cache.sqlite lands there"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,103 @@
+import ltn
+import numpy as np
+import torch
+
+from data_utils_clevr import (CLEVR_ATTRIBUTE_VALUES, AttributePredicate, RelationPredicate, attribute_one_hots,
+                              gather_scene_batch, iter_scene_batches, pad_scene_features, scene_pairs)
+from spatial_relations import RELATION_NAMES, pad_relation_tensors
+
+
+def clevr_scenes(sizes, seed=0):
+    """CLEVR-style scenes with x-coordinates, materials and left relationships"""
+    rng = np.random.default_rng(seed)
+    scenes = []
+    for n in sizes:
+        xs = rng.uniform(-3, 3, n).tolist()
+        objects = [{"3d_coords": [x, 0.0, 0.35], "material": str(rng.choice(["rubber", "metal"])),
+                    "color": "red", "shape": "cube", "size": "large"} for x in xs]
+        left = [[i for i in range(n) if xs[i] < xs[j]] for j in range(n)]
+        scenes.append({"objects": objects, "relationships": {"left": left}})
+    return scenes
+
+
+And = ltn.Connective(ltn.fuzzy_ops.AndProd(stable=False))
+Forall = ltn.Quantifier(ltn.fuzzy_ops.AggregPMean(p=1, stable=False), quantifier="f")
+
+
+def test_scene_pairs_match_per_scene_quantification():
+    torch.manual_seed(0)
+    sizes = [2, 5, 3]
+    features = torch.rand(len(sizes), max(sizes), 1)
+    mask = torch.arange(max(sizes))[None, :] < torch.tensor(sizes)[:, None]
+    batch_idx = torch.tensor([4, 0, 2])
+    left_of = (torch.rand(5, max(sizes), max(sizes)) < 0.5).float()
+    Soft = ltn.Predicate(func=lambda o: torch.sigmoid(3 * o[..., 2] - 1))
+    LeftOf = ltn.Predicate(RelationPredicate(left_of))
+
+    first, second = scene_pairs(features, mask, batch_idx)
+    assert len(first) == sum(n * (n - 1) for n in sizes)
+    assert torch.equal(first[:, 0], second[:, 0]) and (first[:, 1] != second[:, 1]).all()
+
+    o1, o2 = ltn.diag(ltn.Variable("x", first), ltn.Variable("y", second))
+    batched = Forall([o1, o2], And(Soft(o1), LeftOf(o1, o2))).value
+
+    # One Forall per scene over its own objects, weighted by its pair count
+    total = 0.0
+    for b, n in enumerate(sizes):
+        idx = torch.stack([batch_idx[b].expand(n), torch.arange(n)], dim=-1).float()
+        objects = torch.cat([idx, features[b, :n]], dim=-1)
+        x, y = ltn.Variable("x", objects), ltn.Variable("y", objects)
+        sat = Forall([x, y], And(Soft(x), LeftOf(x, y)), cond_vars=[x, y],
+                     cond_fn=lambda x, y: x.value[..., 1] != y.value[..., 1]).value
+        total += sat.item() * n * (n - 1)
+    assert abs(batched.item() - total / len(first)) < 1e-6
+
+
+def test_padded_batches_match_per_scene_loop():
+    scenes = clevr_scenes([2, 6, 3, 4, 5])
+    features, mask = pad_scene_features(scenes, lambda obj: [obj["3d_coords"][0]])
+    left_of = torch.from_numpy(pad_relation_tensors(scenes)[:, RELATION_NAMES.index("is_left_of")]).float()
+    assert features.shape == (5, 6, 1) and mask.sum(dim=1).tolist() == [2, 6, 3, 4, 5]
+
+    def rubber(x):
+        return torch.sigmoid(2 * x)
+
+    # Reference: the original per-scene, per-pair Python loop
+    truths = []
+    for scene in scenes:
+        objects = scene["objects"]
+        for i, a in enumerate(objects):
+            for j, b in enumerate(objects):
+                if i != j:
+                    left = float(a["3d_coords"][0] < b["3d_coords"][0])
+                    truths.append(rubber(torch.tensor(a["3d_coords"][0])).item() * left)
+
+    Rubber = ltn.Predicate(func=lambda o: rubber(o[..., 2]))
+    LeftOf = ltn.Predicate(RelationPredicate(left_of))
+    generator = torch.Generator().manual_seed(0)
+    truth_sum, pair_count = 0.0, 0
+    for batch_idx in iter_scene_batches(len(scenes), 2, shuffle=True, generator=generator):
+        x, valid = gather_scene_batch(features, mask, batch_idx)
+        assert x.shape[1] == int(valid.sum(dim=1).max())  # padding trimmed to the batch
+        first, second = scene_pairs(x, valid, batch_idx)
+        o1, o2 = ltn.diag(ltn.Variable("x", first), ltn.Variable("y", second))
+        sat = Forall([o1, o2], And(Rubber(o1), LeftOf(o1, o2))).value
+        truth_sum += sat.item() * len(first)
+        pair_count += len(first)
+    assert pair_count == len(truths)
+    assert abs(truth_sum / pair_count - float(np.mean(truths))) < 1e-6
+
+
+def test_attribute_predicate_matches_list_scan():
+    scenes = clevr_scenes([3, 5, 2], seed=1)
+    one_hots = attribute_one_hots(scenes)
+    assert one_hots["material"].shape == (3, 5, len(CLEVR_ATTRIBUTE_VALUES["material"]))
+
+    for value in CLEVR_ATTRIBUTE_VALUES["material"]:
+        Material = ltn.Predicate(AttributePredicate(one_hots, "material", value))
+        idx = torch.tensor([[s, o] for s, scene in enumerate(scenes) for o in range(len(scene["objects"]))])
+        truth = Material(ltn.Variable("x", idx.float())).value
+        expected = [float(obj["material"] == value) for scene in scenes for obj in scene["objects"]]
+        assert truth.tolist() == expected
+    # Padding slots are false for every value
+    assert one_hots["material"][2, 2:].sum() == 0
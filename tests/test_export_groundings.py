@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import torch
+
+# The predicate nets live in the models/ package next to the trained weights
+pytest.importorskip("models.color_net")
+
+from export_groundings import (compute_groundings, compute_groundings_cached, predict_truth_matrix,
+                               predict_truth_matrix_sharded, stack_scene_features)
+from grounding_cache import GroundingCache, model_fingerprint
+from predicate_nets import PREDICATE_HEADS, FusedPredicateNet
+
+
+def clevr_scenes(num_scenes, seed=0):
+    """CLEVR-style scenes of 3 to 10 objects with random coordinates"""
+    rng = np.random.default_rng(seed)
+    scenes = []
+    for _ in range(num_scenes):
+        num_objects = int(rng.integers(3, 11))
+        coords = np.column_stack([rng.uniform(-3, 3, size=(num_objects, 2)), rng.uniform(0.35, 0.7, num_objects)])
+        objects = [{"3d_coords": xyz, "color": "red", "shape": "cube", "size": "large", "material": "rubber"}
+                   for xyz in coords.tolist()]
+        scenes.append({"objects": objects})
+    return scenes
+
+
+@pytest.fixture
+def fused_net():
+    """FusedPredicateNet over freshly initialized heads"""
+    torch.manual_seed(0)
+    nets = []
+    for _, net_cls, _, label_attr in PREDICATE_HEADS:
+        net = net_cls().eval()
+        nets.append((net, getattr(net, label_attr)))
+    return FusedPredicateNet(nets).eval()
+
+
+def test_batched_inference_matches_per_scene(fused_net):
+    scenes = clevr_scenes(12)
+    names, truth, positions, offsets = compute_groundings(scenes, fused_net, batch_size=16)
+
+    assert names == fused_net.predicate_names and len(names) == 15
+    assert truth.shape == (offsets[-1], 15) and truth.dtype == np.float32
+    for s, scene in enumerate(scenes):
+        features, _ = stack_scene_features([scene])
+        with torch.no_grad():
+            expected = torch.cat([head(features) for head in fused_net.heads], dim=1).numpy()
+        rows = slice(offsets[s], offsets[s + 1])
+        np.testing.assert_allclose(truth[rows], expected, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(positions[rows], features.numpy())
+
+    # One object per forward pass reproduces the per-object export
+    np.testing.assert_allclose(predict_truth_matrix(fused_net, torch.from_numpy(positions), batch_size=1),
+                               truth, rtol=1e-5, atol=1e-6)
+
+
+def test_cached_export_recomputes_only_changed_scenes(fused_net, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    scenes = clevr_scenes(6)
+    _, expected, _, _ = compute_groundings(scenes, fused_net)
+
+    def run():
+        cache = GroundingCache(cache_dir, model_fingerprint(fused_net), fused_net.predicate_names)
+        _, truth, _, _, hashes, changed = compute_groundings_cached(scenes, fused_net, cache, batch_size=8)
+        cache.save(keep=hashes)
+        return cache, truth, changed
+
+    cache, truth, changed = run()
+    assert changed == list(range(6))
+    np.testing.assert_allclose(truth, expected, rtol=1e-5, atol=1e-6)
+
+    # Unchanged scenes are all cache hits; an edited scene is recomputed
+    scenes[2]["objects"][0]["3d_coords"][0] += 1.0
+    _, expected, _, _ = compute_groundings(scenes, fused_net)
+    cache, truth, changed = run()
+    assert changed == [2]
+    np.testing.assert_allclose(truth, expected, rtol=1e-5, atol=1e-6)
+
+    # New weights evict every cached scene
+    with torch.no_grad():
+        next(fused_net.heads[0].parameters()).add_(1.0)
+    cache, truth, changed = run()
+    assert cache.evicted == 6 and changed == list(range(6))
+
+
+def test_sharded_inference_matches_serial(fused_net, tmp_path):
+    # Workers load the heads from a model directory, as in export_groundings.py
+    for (_, _, weights_file, _), head in zip(PREDICATE_HEADS, fused_net.heads):
+        torch.save(head.state_dict(), tmp_path / weights_file)
+    scenes = clevr_scenes(9)
+    features, _ = stack_scene_features(scenes)
+
+    # A batch of 7 rows cuts through scenes, so some straddle a shard boundary
+    serial = predict_truth_matrix(fused_net, features, batch_size=7)
+    sharded = predict_truth_matrix_sharded(scenes, 3, batch_size=7, threads_per_worker=1, model_dir=str(tmp_path))
+    np.testing.assert_array_equal(sharded, serial)
@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+import torch
+
+from export_torchscript import (INT8_ATOL, META_FILE, artifact_path, check_parity, sample_coords, save_artifact,
+                                script_module)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_scripted_module_parity(tmp_path, quantize):
+    torch.manual_seed(0)
+    eager = torch.nn.Sequential(torch.nn.Linear(3, 16), torch.nn.ReLU(), torch.nn.Linear(16, 4)).eval()
+    x = sample_coords(256)
+    path = artifact_path(str(tmp_path), "net.pt", quantize)
+    assert path.endswith("net_int8.pt" if quantize else "net.pt")
+    save_artifact(script_module(eager, x, quantize), path, {"quantized": quantize})
+
+    extra_files = {META_FILE: ""}
+    scripted = torch.jit.load(path, _extra_files=extra_files)
+    assert json.loads(extra_files[META_FILE]) == {"quantized": quantize}
+    parity = check_parity(eager, scripted, x, INT8_ATOL if quantize else 1e-6)
+    assert parity["passed"], parity
+    assert (parity["max_abs_diff"] > 0) == quantize
+
+    # A perturbed module fails the check
+    with torch.no_grad():
+        eager[2].bias.add_(1.0)
+    assert not check_parity(eager, scripted, x)["passed"]
+
+
+def test_exported_artifacts_match_eager(tmp_path):
+    pytest.importorskip("models.color_net")
+    from export_torchscript import export_ltn_model, export_predicate_net, load_scripted_predicate_net
+    from predicate_nets import PREDICATE_HEADS, load_fused_predicate_net, load_ltn_model
+
+    torch.manual_seed(0)
+    for _, net_cls, weights_file, _ in PREDICATE_HEADS:
+        torch.save(net_cls().state_dict(), tmp_path / weights_file)
+    out_dir = str(tmp_path / "scripted")
+
+    path = export_predicate_net(out_dir, str(tmp_path), batch_size=64)
+    eager, scripted = load_fused_predicate_net(str(tmp_path)), load_scripted_predicate_net(path)
+    assert scripted.predicate_names == eager.predicate_names
+    assert check_parity(eager, scripted, sample_coords(64))["passed"]
+
+    ltn_path = export_ltn_model(out_dir, os.path.join(ROOT_DIR, "ltn_model.pt"), batch_size=64)
+    eager = load_ltn_model(os.path.join(ROOT_DIR, "ltn_model.pt"))
+    assert check_parity(eager, torch.jit.load(ltn_path), torch.rand(64, 15))["passed"]
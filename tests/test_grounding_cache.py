@@ -0,0 +1,48 @@
+import numpy as np
+import torch
+
+from grounding_cache import GroundingCache, model_fingerprint, scene_hash
+
+PREDICATES = ["is_red", "is_cube"]
+
+
+def test_cache_round_trip_and_eviction(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    net = torch.nn.Linear(3, 2)
+    fingerprint = model_fingerprint(net)
+    assert model_fingerprint(net) == fingerprint
+
+    cache = GroundingCache(cache_dir, fingerprint, PREDICATES)
+    rows = {"a": np.array([[0.1, 0.9]], dtype=np.float32), "b": np.array([[0.5, 0.5], [1.0, 0.0]])}
+    for key, truth in rows.items():
+        cache.put(key, truth)
+    cache.written = {"scene_0000.json": "a"}
+    cache.save()
+
+    # Same weights: every entry and the written-file index come back
+    cache = GroundingCache(cache_dir, fingerprint, PREDICATES)
+    assert cache.evicted == 0 and "a" in cache and "b" in cache
+    for key, truth in rows.items():
+        np.testing.assert_array_equal(cache.get(key), truth.astype(np.float32))
+    assert cache.written == {"scene_0000.json": "a"}
+
+    # save(keep=...) drops the scenes that are gone
+    cache.save(keep=["b"])
+    cache = GroundingCache(cache_dir, fingerprint, PREDICATES)
+    assert "a" not in cache and "b" in cache
+
+    # New weights invalidate the whole cache, as does a new predicate table
+    with torch.no_grad():
+        net.weight.add_(1.0)
+    assert model_fingerprint(net) != fingerprint
+    stale = GroundingCache(cache_dir, model_fingerprint(net), PREDICATES)
+    assert stale.evicted == 1 and "b" not in stale
+    assert GroundingCache(cache_dir, fingerprint, PREDICATES[::-1]).evicted == 1
+
+
+def test_scene_hash_follows_object_content():
+    scene = {"image_index": 0, "objects": [{"3d_coords": [0.0, 1.0, 0.35], "color": "red"}]}
+    assert scene_hash(scene) == scene_hash({"image_index": 7, "objects": [{"color": "red",
+                                                                          "3d_coords": [0.0, 1.0, 0.35]}]})
+    moved = {"objects": [{"3d_coords": [0.5, 1.0, 0.35], "color": "red"}]}
+    assert scene_hash(moved) != scene_hash(scene)
@@ -0,0 +1,64 @@
+import json
+import os
+
+import numpy as np
+
+from grounding_store import (GroundingStore, convert_json_dir, is_grounding_store, json_scene_files,
+                             load_grounding_scenes, write_scenes_to_store)
+from spatial_relations import RELATION_NAMES, load_relation_store, relation_matrices, write_relation_store
+
+
+def test_json_dir_round_trip(json_groundings, tmp_path):
+    scenes = load_grounding_scenes(json_groundings)
+    store_dir = convert_json_dir(json_groundings, str(tmp_path / "store"))
+
+    assert is_grounding_store(store_dir)
+    store = GroundingStore(store_dir)
+    assert len(store) == len(scenes)
+    assert store.num_objects == sum(len(scene["objects"]) for scene in scenes)
+    assert store.predicates == ["is_red", "is_cube"]
+    for scene_idx, scene in enumerate(scenes):
+        restored = store.scene(scene_idx)
+        assert restored["scene_id"] == scene["scene_id"]
+        assert store.scene_name(scene_idx) == f"scene_{scene['scene_id']:04d}.json"
+        for obj, restored_obj in zip(scene["objects"], restored["objects"]):
+            assert restored_obj["predicates"] == obj["predicates"]
+            np.testing.assert_allclose(restored_obj["position"], obj["position"], rtol=1e-6)
+
+
+def test_missing_predicates_stay_missing(tmp_path):
+    scenes = [{"scene_id": 0, "objects": [{"predicates": {"is_red": 1.0}},
+                                          {"predicates": {"is_cube": 0.25}}]}]
+    store = GroundingStore(write_scenes_to_store(scenes, str(tmp_path / "store")))
+    objects = store.scene(0)["objects"]
+    assert objects[0]["predicates"] == {"is_red": 1.0}
+    assert objects[1]["predicates"] == {"is_cube": 0.25}
+    assert np.isnan(store.truth[0, store.predicate_index("is_cube")])
+
+
+def test_load_without_mmap_matches(json_groundings, tmp_path):
+    store_dir = convert_json_dir(json_groundings, str(tmp_path / "store"))
+    assert GroundingStore(store_dir, mmap=False).to_scene_dicts() == GroundingStore(store_dir).to_scene_dicts()
+
+
+def test_relation_store_round_trip(json_groundings):
+    scenes = load_grounding_scenes(json_groundings)
+    write_relation_store(json_groundings, scenes)
+
+    relations = load_relation_store(json_groundings)
+    assert len(relations) == len(scenes)
+    for scene_idx, scene in enumerate(scenes):
+        np.testing.assert_array_equal(relations.scene(scene_idx), relation_matrices(scene))
+        assert set(relations.scene_dict(scene_idx)) == set(RELATION_NAMES)
+
+
+def test_relation_meta_is_not_a_scene(json_groundings):
+    scenes = load_grounding_scenes(json_groundings)
+    # A relations.json left by an older export is removed on rewrite
+    with open(os.path.join(json_groundings, "relations.json"), "w") as f:
+        json.dump({"relations": RELATION_NAMES}, f)
+    write_relation_store(json_groundings, scenes)
+
+    assert not os.path.exists(os.path.join(json_groundings, "relations.json"))
+    assert len(json_scene_files(json_groundings)) == len(scenes)
+    assert load_grounding_scenes(json_groundings) == scenes
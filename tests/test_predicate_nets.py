@@ -0,0 +1,29 @@
+import pytest
+import torch
+
+pytest.importorskip("models.color_net")
+
+from export_torchscript import sample_coords
+from predicate_nets import PREDICATE_HEADS, FusedPredicateNet, load_fused_predicate_net
+
+
+def test_fused_net_matches_its_heads(tmp_path):
+    torch.manual_seed(0)
+    for _, net_cls, weights_file, _ in PREDICATE_HEADS:
+        torch.save(net_cls().state_dict(), tmp_path / weights_file)
+    fused = load_fused_predicate_net(str(tmp_path))
+    assert isinstance(fused, FusedPredicateNet) and not fused.training
+
+    x = sample_coords(64)
+    with torch.no_grad():
+        out = fused(x)
+    assert out.shape == (64, len(fused.predicate_names)) == (64, 15)
+    assert fused.predicate_index["is_red"] == fused.predicate_names.index("is_red")
+
+    # Each head fills its own column range, in its label2idx order
+    for (group, _, _, label_attr), head in zip(PREDICATE_HEADS, fused.heads):
+        cols = fused.head_slices[group]
+        labels = sorted(getattr(head, label_attr).items(), key=lambda item: item[1])
+        assert fused.predicate_names[cols] == [f"is_{label}" for label, _ in labels]
+        with torch.no_grad():
+            torch.testing.assert_close(out[:, cols], head(x))
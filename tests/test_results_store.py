@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from results_store import (load_packed_results, load_results, load_summaries, packed_path, save_results,
+                           write_packed_results)
+from verify_rule_consistency import RuleVerifier, scene_grounding_set
+
+RESULTS = [
+    {"rule": "is_cube(X) <- is_red(X)", "consistency_scores": [True, False, True, True, False, True, True, True, False],
+     "overall_consistency": 6 / 9, "violations": 4,
+     "counterexamples": [{"scene": "scene_0001.json", "objects": ["1_0", "1_1"]},
+                         {"scene": "scene_0004.json", "objects": ["4_1"]},
+                         {"scene": "scene_0008.json", "objects": ["8_0"]}],
+     "method": "vectorized"},
+    {"rule": "d(X) <- is_red(X)", "consistency_scores": [], "overall_consistency": 1.0, "violations": 0,
+     "counterexamples": [], "method": "symbolic"},
+    {"rule": "is_red(X) <- is_cube(X)", "consistency_scores": [True, True],
+     "overall_consistency": 1.0, "violations": 0, "counterexamples": [], "method": "vectorized"},
+]
+
+
+def test_packed_round_trip(tmp_path):
+    json_path = str(tmp_path / "results.json")
+    paths = save_results(json_path, RESULTS, "packed")
+
+    assert paths == [packed_path(json_path)]
+    assert not os.path.exists(json_path)
+    assert load_results(json_path) == RESULTS
+
+
+def test_counts_without_unpacking(tmp_path):
+    write_packed_results(str(tmp_path / "results.npz"), RESULTS)
+    packed = load_packed_results(str(tmp_path / "results.json"))
+
+    assert packed is not None and packed.rules == [r["rule"] for r in RESULTS]
+    assert packed.num_consistent.tolist() == [6, 0, 2]
+    assert packed.consistency.tolist() == pytest.approx([6 / 9, 1.0, 1.0])
+
+
+def test_summaries_match_json(tmp_path):
+    json_path = str(tmp_path / "results.json")
+    save_results(json_path, RESULTS, "both")
+    packed_summaries = load_summaries(json_path)
+    os.remove(packed_path(json_path))
+    assert load_summaries(json_path) == packed_summaries
+    assert packed_summaries[1]["avg_score"] is None
+
+
+def test_newer_json_wins(tmp_path):
+    json_path = str(tmp_path / "results.json")
+    save_results(json_path, RESULTS, "packed")
+    with open(json_path, "w") as f:
+        json.dump(RESULTS[:1], f)
+    later = os.path.getmtime(packed_path(json_path)) + 1
+    os.utime(json_path, (later, later))
+    assert load_results(json_path) == RESULTS[:1]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        save_results(str(tmp_path / "results.json"), RESULTS, "csv")
+
+
+def test_integer_object_ids_round_trip(tmp_path):
+    results = [dict(RESULTS[0], counterexamples=[{"scene": "scene_0001.json", "objects": [3, 12]},
+                                                 {"scene": "scene_0004.json", "objects": ["4_1", 3]}])]
+    json_path = str(tmp_path / "results.json")
+    save_results(json_path, results, "packed")
+    restored = load_results(json_path)
+    assert restored == results
+    assert [type(obj) for obj in restored[0]["counterexamples"][1]["objects"]] == [str, int]
+
+
+def test_verifier_output_round_trips(tmp_path):
+    scenes = [(f"scene_{s:04d}.json", {"scene_id": s, "objects": [
+        {"id": 10 * s + i, "predicates": {"is_red": float(i == 0), "is_cube": float(s % 2)}} for i in range(2)]})
+        for s in range(4)]
+    results = RuleVerifier(["is_red", "is_cube"], progress=False).verify_rules(
+        ["is_cube(X) <- is_red(X)"], scene_grounding_set(scenes))
+    assert results[0]["counterexamples"][0]["objects"] == [0]
+
+    json_path = str(tmp_path / "results.json")
+    save_results(json_path, results, "packed")
+    assert load_results(json_path) == results
+
+
+def test_packed_only_removes_stale_json(tmp_path):
+    json_path = str(tmp_path / "results.json")
+    save_results(json_path, RESULTS, "both")
+    save_results(json_path, RESULTS[:1], "packed")
+    assert not os.path.exists(json_path)
+    assert load_results(json_path) == RESULTS[:1]
@@ -0,0 +1,98 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from grounding_store import load_grounding_scenes
+from rule_ast import GroundingTensor, canonical_rule, compile_rule, dedupe_rules, parse_rule
+from spatial_relations import pad_relation_tensors
+
+
+@pytest.mark.parametrize("spelling", [
+    "is_cube(X) <- is_red(X) & is_large(X)",
+    "is_cube(X) ← is_red(X) ∧ is_large(X)",
+    "is_cube(Y)<-is_large(Y) & is_red(Y)",
+    "is_cube(A) <- is_large(A) & is_red(A) & is_red(A)",
+])
+def test_canonical_spellings(spelling):
+    assert canonical_rule(spelling) == "is_cube(X) <- is_large(X) & is_red(X)"
+
+
+def test_canonical_body_variables():
+    # Body-only variables are renamed by their smallest ordering, not by name
+    assert canonical_rule("is_cube(A) <- is_red(B) & is_left_of(A,B)") == \
+        canonical_rule("is_cube(X) <- is_left_of(X,Z) & is_red(Z)")
+    assert canonical_rule("is_cube(X) <- is_left_of(X,Y)") != canonical_rule("is_cube(X) <- is_left_of(Y,X)")
+
+
+def test_parse_errors():
+    with pytest.raises(ValueError):
+        parse_rule("is_cube(X)")
+    with pytest.raises(ValueError):
+        parse_rule("is_cube(X) & is_red(X) <- is_large(X)")
+
+
+def test_dedupe_keeps_first_and_drops_tautologies():
+    rules = ["is_cube(X) <- is_red(X)", "is_cube(Y) <- is_red(Y)", "is_red(X) <- is_red(X) & is_cube(X)",
+             "is_red(X) <- is_cube(X)"]
+    assert dedupe_rules(rules) == ["is_cube(X) <- is_red(X)", "is_red(X) <- is_cube(X)"]
+
+    scored = [["is_cube(X) <- is_red(X)", 0.5], ["is_cube(Y) <- is_red(Y)", 0.9]]
+    assert dedupe_rules(scored, lambda entry: entry[0]) == scored[:1]
+
+
+def _brute_force_violations(rule, scenes, threshold=0.5):
+    """Per scene, whether some binding makes the body true and the head false"""
+    parsed = parse_rule(rule)
+    violated = []
+    for scene in scenes:
+        objects = scene["objects"]
+        xs = [obj["position"][0] for obj in objects]
+
+        def truth(atom, binding):
+            if atom.arity == 1:
+                return objects[binding[atom.args[0]]]["predicates"].get(atom.name, 0.0) >= threshold
+            i, j = (binding[arg] for arg in atom.args)
+            return atom.name == "is_left_of" and xs[i] < xs[j]
+
+        found = False
+        for values in itertools.product(range(len(objects)), repeat=len(parsed.variables)):
+            binding = dict(zip(parsed.variables, values))
+            if all(truth(atom, binding) for atom in parsed.body) and not truth(parsed.head, binding):
+                found = True
+        violated.append(found)
+    return violated
+
+
+@pytest.mark.parametrize("rule", [
+    "is_cube(X) <- is_red(X)",
+    "is_red(X) <- is_cube(X) & is_left_of(X,Y) & is_red(Y)",
+    "is_cube(Y) <- is_left_of(X,Y)",
+])
+def test_compiled_rule_matches_brute_force(json_groundings, rule):
+    scenes = load_grounding_scenes(json_groundings)
+    violations = compile_rule(rule).violations(GroundingTensor.from_scenes(scenes))
+    violated = violations.reshape(len(scenes), -1).any(axis=1)
+    np.testing.assert_array_equal(violated, _brute_force_violations(rule, scenes))
+
+
+@pytest.mark.parametrize("rule", [
+    "is_cube(X) <- is_red(X)",
+    "is_red(X) <- is_cube(X) & is_left_of(X,Y) & is_red(Y)",
+    "is_cube(X) <- is_large(X)",
+])
+def test_matrix_and_scene_groundings_agree(json_groundings, rule):
+    scenes = load_grounding_scenes(json_groundings)
+    # Drop one grounding: a missing value reads as 0 in both layouts
+    del scenes[0]["objects"][1]["predicates"]["is_cube"]
+    names = ["is_red", "is_cube"]
+    truth = np.array([[obj["predicates"].get(name, np.nan) for name in names]
+                      for scene in scenes for obj in scene["objects"]], dtype=np.float32)
+    offsets = np.cumsum([0] + [len(scene["objects"]) for scene in scenes])
+    from_matrix = GroundingTensor.from_matrix(names, truth, offsets, pad_relation_tensors(scenes))
+    from_scenes = GroundingTensor.from_scenes(scenes)
+
+    compiled = compile_rule(rule)
+    for expected, actual in zip(compiled.evaluate(from_scenes), compiled.evaluate(from_matrix)):
+        np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(compiled.violations(from_matrix), compiled.violations(from_scenes))
@@ -0,0 +1,66 @@
+import itertools
+import os
+
+import numpy as np
+
+import rule_cache
+from rule_cache import RuleCache, groundings_fingerprint
+
+
+def test_hits_by_canonical_rule_and_threshold(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with RuleCache(path, "fp") as cache:
+        assert cache.get("score", "is_cube(X) <- is_red(X)") is None
+        cache.put("score", "is_cube(X) <- is_red(X)", np.float32(0.5))
+        cache.put("score", "is_cube(X) <- is_red(X)", [1, 2], threshold=0.5)
+
+    with RuleCache(path, "fp") as cache:
+        assert cache.get("score", "is_cube(Y) <- is_red(Y)") == 0.5
+        assert cache.get("score", "is_cube(X) <- is_red(X)", threshold=0.5) == [1, 2]
+        assert cache.get("score", "is_cube(X) <- is_red(X)", threshold=0.7) is None
+        assert cache.get("verdict", "is_cube(X) <- is_red(X)") is None
+        assert cache.get_or_compute("verdict", "is_red(X) <- is_cube(X)", lambda: "sat") == "sat"
+        assert cache.get_or_compute("verdict", "is_red(X) <- is_cube(X)", lambda: "unsat") == "sat"
+        assert (cache.hits, cache.misses) == (3, 3)
+    # Another fingerprint never sees these entries
+    with RuleCache(path, "other") as cache:
+        assert cache.get("score", "is_cube(X) <- is_red(X)") is None
+
+
+def test_changed_source_invalidates_its_entries(json_groundings, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old = groundings_fingerprint(json_groundings)
+    with RuleCache(path, old, json_groundings) as cache:
+        cache.put("score", "is_cube(X) <- is_red(X)", 0.5)
+    with RuleCache(path, "fp", str(tmp_path / "elsewhere")) as cache:
+        cache.put("score", "is_cube(X) <- is_red(X)", 0.25)
+
+    # Rewriting a scene file changes the fingerprint of the directory
+    scene = os.path.join(json_groundings, "scene_0000.json")
+    with open(scene, "a") as f:
+        f.write(" ")
+    new = groundings_fingerprint(json_groundings)
+    assert new != old
+    with RuleCache(path, new, json_groundings) as cache:
+        assert cache.get("score", "is_cube(X) <- is_red(X)") is None
+    with RuleCache(path, old, json_groundings) as cache:
+        assert cache.get("score", "is_cube(X) <- is_red(X)") is None
+    with RuleCache(path, "fp", str(tmp_path / "elsewhere")) as cache:
+        assert cache.get("score", "is_cube(X) <- is_red(X)") == 0.25
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(rule_cache.time, "time", lambda: float(next(clock)))
+    path = str(tmp_path / "cache.sqlite")
+    rules = [f"is_cube(X) <- is_{color}(X)" for color in ("red", "blue", "green", "gray")]
+
+    with RuleCache(path, "fp", max_entries=3) as cache:
+        for score, rule in enumerate(rules[:3]):
+            cache.put("score", rule, score)
+        assert cache.get("score", rules[0]) == 0   # rules[1] is now the oldest
+        cache.put("score", rules[3], 3)
+
+    with RuleCache(path, "fp", max_entries=3) as cache:
+        assert cache.get("score", rules[1]) is None
+        assert [cache.get("score", rule) for rule in (rules[0], rules[2], rules[3])] == [0, 2, 3]
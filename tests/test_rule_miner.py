@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from conftest import noisy_scenes
+from rule_ast import canonical_rule
+from rule_miner import RuleMiner, combined_score, truth_matrix
+from synthesize_rules import RuleSynthesizer
+
+PREDICATES = ["is_red", "is_blue", "is_green", "is_large", "is_cube"]
+
+
+@pytest.fixture
+def miner():
+    """60 objects in 20 scenes of three; colors are mutually exclusive"""
+    rng = np.random.default_rng(0)
+    color = rng.integers(0, 3, size=60)
+    truth = np.zeros((60, len(PREDICATES)), dtype=np.float32)
+    truth[np.arange(60), color] = rng.uniform(0.6, 1.0, size=60)
+    truth[:, 3] = rng.uniform(0.0, 1.0, size=60)
+    truth[:, 4] = np.where(color == 0, rng.uniform(0.5, 1.0, size=60), rng.uniform(0.0, 0.6, size=60))
+    return RuleMiner(PREDICATES, truth, scene_offsets=np.arange(0, 61, 3))
+
+
+def _body_matches(miner, record):
+    cols = [miner.index[name] for name in record["body"]]
+    return int(miner.crisp[:, cols].all(axis=1).sum())
+
+
+def test_no_rule_with_an_unsatisfiable_body(miner):
+    # Default min_support=0.0: bodies like is_red & is_blue hold for no object
+    top = miner.top_k(k=20, beam_width=64, max_body_len=3)
+    mined = miner.mine(max_body_len=3)
+    apriori = miner.mine_apriori(max_body_len=3)
+
+    assert top and mined and apriori
+    for record in top + mined + apriori:
+        assert _body_matches(miner, record) > 0, record["rule"]
+
+
+def test_mined_scores_match_template_synthesis():
+    # Soft truth values, so the fuzzy satisfaction is not just a count
+    rng = np.random.default_rng(0)
+    scenes = noisy_scenes(num_scenes=20)
+    for scene in scenes:
+        for obj in scene["objects"]:
+            obj["predicates"] = {name: 0.8 * value + rng.uniform(0.0, 0.2) for name, value in obj["predicates"].items()}
+    names = ["is_red", "is_cube", "is_large", "is_small"]
+
+    synthesizer = RuleSynthesizer(names)
+    candidates = synthesizer.instantiate_templates(["head(X) <- body1(X)", "head(X) <- body1(X) & body2(X)"])
+    expected = {canonical_rule(rule): score for rule, score in synthesizer.synthesize_rules(scenes, candidates)}
+    mined = {canonical_rule(r["rule"]): r["satisfaction"]
+             for r in RuleMiner(*truth_matrix(scenes, names)).mine(max_body_len=2)}
+
+    # The Z3 path also keeps the bodies no object satisfies (is_large & is_small)
+    assert set(expected) - set(mined) == {"is_red(X) <- is_large(X) & is_small(X)",
+                                          "is_cube(X) <- is_large(X) & is_small(X)"}
+    assert set(mined) <= set(expected)
+    for rule, score in mined.items():
+        assert score == pytest.approx(expected[rule], abs=1e-6), rule
+
+
+@pytest.mark.parametrize("min_support, min_confidence", [(0.0, 0.0), (0.05, 0.3), (0.2, 0.6)])
+def test_apriori_pruning_keeps_the_mined_set(miner, min_support, min_confidence):
+    exhaustive = miner.mine(max_body_len=3, min_support=min_support, min_confidence=min_confidence)
+    pruned = miner.mine_apriori(min_support, min_confidence, max_body_len=3)
+    assert exhaustive and pruned == exhaustive
+    assert len(miner.frequent_bodies(min_support, 3)) < sum(1 for _ in miner.iter_bodies(3))
+
+
+def _exhaustive_top_k(miner, k, max_body_len, min_confidence=0.0):
+    """(rule, combined score) of the k best rules, scoring every body"""
+    records = miner.mine(max_body_len=max_body_len, min_confidence=min_confidence)
+    bodies = [tuple(miner.index[name] for name in record["body"]) for record in records]
+    _, crisp = miner.body_rows(bodies)
+    consistency = miner.scene_consistency(crisp)
+    scored = [(combined_score(record["satisfaction"], consistency[c, miner.index[record["head"]]]), record["rule"])
+              for c, record in enumerate(records)]
+    return sorted(scored, key=lambda entry: (-entry[0], entry[1]))[:k]
+
+
+@pytest.mark.parametrize("k, min_confidence", [(5, 0.0), (8, 0.5)])
+def test_beam_top_k_matches_exhaustive(miner, k, min_confidence):
+    # A beam wider than any level of bodies prunes by the bound only
+    top = miner.top_k(k=k, beam_width=64, max_body_len=3, min_confidence=min_confidence)
+    expected = _exhaustive_top_k(miner, k, 3, min_confidence)
+    assert [r["rule"] for r in top] == [rule for _, rule in expected]
+    assert [r["combined_score"] for r in top] == pytest.approx([score for score, _ in expected])
+
+    # A narrow beam keeps at most k rules in score order, none better than the exact top
+    narrow = miner.top_k(k=k, beam_width=2, max_body_len=3, min_confidence=min_confidence)
+    scores = [r["combined_score"] for r in narrow]
+    assert 0 < len(narrow) <= k and scores == sorted(scores, reverse=True)
+    assert scores[0] <= expected[0][0] + 1e-9
@@ -0,0 +1,31 @@
+import numpy as np
+
+from spatial_relations import RELATION_NAMES, RELATIONS, coordinate_relations, relation_matrices
+
+# Three objects along x (0 leftmost) and y (2 frontmost)
+COORDS = [[-2.0, -1.0, 0.35], [0.0, 0.0, 0.35], [2.0, 1.0, 0.35]]
+
+
+def test_clevr_relationships_semantics():
+    # CLEVR: relationships[r][j] lists the objects that are r of object j
+    relationships = {
+        "left": [[], [0], [0, 1]],
+        "right": [[1, 2], [2], []],
+        "front": [[1, 2], [2], []],
+        "behind": [[], [0], [0, 1]],
+    }
+    scene = {"objects": [{"3d_coords": xyz} for xyz in COORDS], "relationships": relationships}
+    m = dict(zip(RELATION_NAMES, relation_matrices(scene)))
+
+    # M[i, j] = 1 iff object i is r of object j
+    assert m["is_left_of"][0, 1] == 1 and m["is_left_of"][1, 0] == 0
+    for key, name in RELATIONS:
+        for j, related in enumerate(relationships[key]):
+            np.testing.assert_array_equal(np.flatnonzero(m[name][:, j]), related)
+    np.testing.assert_array_equal(m["is_left_of"], m["is_right_of"].T)
+    np.testing.assert_array_equal(m["is_front_of"], m["is_behind"].T)
+
+    # Without relationships the coordinates give the same matrices
+    np.testing.assert_array_equal(relation_matrices({"objects": [{"position": xyz} for xyz in COORDS]}),
+                                  relation_matrices(scene))
+    np.testing.assert_array_equal(coordinate_relations(np.array(COORDS)), relation_matrices(scene))
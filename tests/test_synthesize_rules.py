@@ -0,0 +1,145 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import noisy_scenes
+from grounding_store import GroundingStore, convert_json_dir
+from rule_ast import GroundingTensor, parse_rule
+from rule_cache import RuleCache, groundings_fingerprint
+from rule_miner import RuleMiner, grounding_matrix, truth_matrix
+from synthesize_rules import RuleSynthesizer, load_groundings
+
+PREDICATES = ["is_red", "is_cube"]
+NOISY_PREDICATES = ["is_red", "is_cube", "is_large", "is_small"]
+
+
+def test_parallel_synthesis_matches_serial(json_groundings, tmp_path):
+    synthesizer = RuleSynthesizer(PREDICATES)
+    candidates = synthesizer.instantiate_templates()
+    serial = synthesizer.synthesize_rules(load_groundings(json_groundings), candidates)
+    parallel = synthesizer.synthesize_rules_parallel(json_groundings, candidates, workers=2)
+    assert parallel == serial
+
+    # The parallel path fills and then reuses the cache like the serial one
+    cache_path = str(tmp_path / "rule_cache.sqlite")
+    fingerprint = groundings_fingerprint(json_groundings)
+    with RuleCache(cache_path, fingerprint, json_groundings) as cache:
+        assert synthesizer.synthesize_rules_parallel(json_groundings, candidates, workers=2, cache=cache) == serial
+        assert cache.hits == 0
+    with RuleCache(cache_path, fingerprint, json_groundings) as cache:
+        assert synthesizer.synthesize_rules_parallel(json_groundings, candidates, workers=2, cache=cache) == serial
+        assert cache.misses == 0 and cache.hits == len(candidates)
+        assert synthesizer.synthesize_rules(load_groundings(json_groundings), candidates, cache=cache) == serial
+
+
+def test_instantiate_templates_by_arity():
+    synthesizer = RuleSynthesizer(PREDICATES)
+    candidates = synthesizer.instantiate_templates(["head(X) <- body1(X) & rel(X,Y)"], relations=["is_left_of"])
+    assert candidates == ["is_red(X) <- is_cube(X) & is_left_of(X,Y)",
+                          "is_cube(X) <- is_red(X) & is_left_of(X,Y)"]
+    for candidate in candidates:
+        assert {atom.arity for atom in parse_rule(candidate).atoms} == {1, 2}
+
+    assert synthesizer.instantiate_templates(["head(X) <- body1(X,Y,Z)"]) == []
+    with pytest.raises(ValueError):
+        synthesizer.instantiate_templates(["head(X) <- head(X,Y)"])
+
+
+def test_cegis_reaches_a_realistic_target():
+    # is_cube(X) <- is_red(X) has confidence 0.933, the only one-atom body >= 0.9
+    scenes = noisy_scenes()
+    expected = "is_cube(X) <- is_red(X)"
+    rules = RuleSynthesizer(NOISY_PREDICATES).cegis_rules(scenes, sample_scenes=5, min_confidence=0.9)
+    assert [rule for rule, _ in rules] == [expected]
+    rules = RuleSynthesizer(NOISY_PREDICATES, min_confidence=0.9).cegis_rules(scenes, sample_scenes=5)
+    assert [rule for rule, _ in rules] == [expected]
+
+
+def test_cegis_without_a_target_fails_clearly():
+    with pytest.raises(ValueError, match="target confidence"):
+        RuleSynthesizer(NOISY_PREDICATES).cegis_rules(noisy_scenes())
+
+
+def test_maxsat_optima_in_confidence_order():
+    scenes = noisy_scenes()
+    rules = RuleSynthesizer(NOISY_PREDICATES, max_body_len=1).optimize_rules(scenes, top_n=2)
+    assert [rule for rule, _ in rules] == ["is_cube(X) <- is_red(X)", "is_red(X) <- is_cube(X)"]
+
+    # With two-atom bodies the best rule is the perfectly confident one, even
+    # though is_cube(X) <- is_red(X) covers twice as many objects
+    rules = RuleSynthesizer(NOISY_PREDICATES, max_body_len=2).optimize_rules(scenes, top_n=5)
+    miner = RuleMiner(*truth_matrix(scenes, NOISY_PREDICATES))
+    confidence = {record["rule"]: record["confidence"] for record in miner.mine(max_body_len=2)}
+    best = sorted(confidence.values(), reverse=True)[:5]
+    assert rules[0][0] == "is_cube(X) <- is_red(X) & is_large(X)"
+    assert [confidence[rule] for rule, _ in rules] == best
+
+
+def test_store_synthesis_matches_json_dir(json_groundings, tmp_path):
+    store_dir = convert_json_dir(json_groundings, str(tmp_path / "store"))
+    store = load_groundings(store_dir)
+    assert isinstance(store, GroundingStore)
+
+    synthesizer = RuleSynthesizer(PREDICATES)
+    candidates = synthesizer.instantiate_templates(["head(X) <- body1(X)", "head(X) <- body1(X) & rel(X,Y)"])
+    expected = synthesizer.synthesize_rules(load_groundings(json_groundings), candidates)
+    assert synthesizer.synthesize_rules(store, candidates) == expected
+    assert synthesizer.synthesize_rules_parallel(store_dir, candidates, workers=2) == expected
+    assert synthesizer.top_k_rules(store_dir, k=4) == synthesizer.top_k_rules(json_groundings, k=4)
+
+    # Predicates the store has no column for read as false, as in JSON scenes
+    _, truth, offsets = grounding_matrix(store, PREDICATES + ["is_blue"])
+    _, expected_truth, expected_offsets = grounding_matrix(json_groundings, PREDICATES + ["is_blue"])
+    np.testing.assert_array_equal(truth, expected_truth)
+    np.testing.assert_array_equal(offsets, expected_offsets)
+
+
+@pytest.mark.parametrize("rule", ["is_cube(X) <- is_red(X)", "is_red(X) <- is_cube(X) & is_left_of(X,Y)",
+                                  "is_cube(Y) <- is_red(X) & is_left_of(X,Y)"])
+def test_satisfaction_score_matches_brute_force(json_groundings, rule):
+    scenes = load_groundings(json_groundings)
+    parsed = parse_rule(rule)
+
+    # Mean of 1 - body + body * head over every binding of every scene
+    implications = []
+    for scene in scenes:
+        objects = scene["objects"]
+        xs = [obj["position"][0] for obj in objects]
+
+        def truth(atom, binding):
+            if atom.arity == 1:
+                return objects[binding[atom.args[0]]]["predicates"].get(atom.name, 0.0)
+            return float(xs[binding[atom.args[0]]] < xs[binding[atom.args[1]]])
+
+        for values in itertools.product(range(len(objects)), repeat=len(parsed.variables)):
+            binding = dict(zip(parsed.variables, values))
+            body = float(np.prod([truth(atom, binding) for atom in parsed.body]))
+            implications.append(1.0 - body + body * truth(parsed.head, binding))
+
+    score = RuleSynthesizer._satisfaction_score(rule, GroundingTensor.from_scenes(scenes))
+    assert score == pytest.approx(np.mean(implications))
+    if len(parsed.variables) == 1:
+        miner = RuleMiner(*truth_matrix(scenes, PREDICATES))
+        assert score == pytest.approx(miner.record(miner.index[parsed.head.name],
+                                                   [miner.index[atom.name] for atom in parsed.body])["satisfaction"])
+
+
+def test_shared_solver_checks_match_fresh_solvers(json_groundings):
+    synthesizer = RuleSynthesizer(PREDICATES)
+    candidates = synthesizer.instantiate_templates(["head(X) <- body1(X)", "head(X) <- body1(X) & rel(X,Y)"])
+    groundings = load_groundings(json_groundings)
+    solver, tensor, num_facts = synthesizer._build_base_solver(groundings)
+    assert len(solver.assertions()) == num_facts
+
+    for candidate in candidates:
+        shared = synthesizer._check_candidate(solver, candidate, tensor)
+        # pop() drops the candidate and keeps exactly the grounding facts
+        assert len(solver.assertions()) == num_facts and solver.num_scopes() == 0
+        fresh_solver, fresh_tensor, _ = synthesizer._build_base_solver(groundings)
+        assert shared[:2] == synthesizer._check_candidate(fresh_solver, candidate, fresh_tensor)[:2]
+
+    # The public entry point reuses one solver and reports the same verdicts
+    rules = synthesizer.synthesize_rules(groundings, candidates)
+    assert len(synthesizer.check_latencies) == len(candidates)
+    assert sorted(rules) == sorted((c, synthesizer._check_candidate(solver, c, tensor)[1]) for c in candidates)
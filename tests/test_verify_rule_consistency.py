@@ -0,0 +1,89 @@
+import json
+import os
+
+from conftest import write_json_groundings
+from grounding_store import convert_json_dir, load_grounding_scenes
+from spatial_relations import write_relation_store
+from verify_rule_consistency import (RuleVerifier, grounding_vocabulary, load_grounding_set, screen_rules,
+                                     verify_rules, verify_rules_parallel)
+
+RULES = [
+    "is_cube(X) <- is_red(X)",
+    "is_red(X) <- is_cube(X) & is_left_of(X,Y)",
+    "d(X) <- is_red(X)",
+    "is_cube(X) <- d(X)",
+]
+
+
+def test_sharded_verification_matches_serial(json_groundings):
+    predicates = grounding_vocabulary(json_groundings)
+    serial = RuleVerifier(predicates, progress=False).verify_rules(RULES, load_grounding_set(json_groundings))
+    sharded = verify_rules_parallel(RULES, json_groundings, workers=2, predicates=predicates, shards_per_worker=2)
+
+    assert sharded == serial
+    assert {result["method"] for result in serial} == {"vectorized", "z3"}
+
+
+def test_subset_verification_sees_definitions(json_groundings):
+    predicates = grounding_vocabulary(json_groundings)
+    groundings = load_grounding_set(json_groundings)
+    verifier = RuleVerifier(predicates, progress=False)
+
+    whole = verifier.verify_rules(RULES, groundings)
+    subset = verifier.verify_rules(RULES[3:], groundings, definitions=RULES)
+    assert subset == whole[3:]
+
+
+def test_cached_symbolic_results_depend_on_definitions(json_groundings, isolated_cwd):
+    def run(rules, workers=1):
+        rules_file = os.path.join(isolated_cwd, "rules.json")
+        with open(rules_file, "w") as f:
+            json.dump(rules, f)
+        results = verify_rules(rules_file, json_groundings, os.path.join(isolated_cwd, "results.json"),
+                               workers=workers, fmt="json")
+        return {result["rule"]: result for result in results}
+
+    # Alone, d is never derived and the rule holds everywhere; the cached
+    # result must not be reused once another rule defines d.
+    assert run(["is_cube(X) <- d(X)"])["is_cube(X) <- d(X)"]["overall_consistency"] == 1.0
+    assert os.path.exists(os.path.join(isolated_cwd, "data", "rule_cache.sqlite"))
+
+    rules = RULES[2:] + ["is_cube(X) <- is_red(X)"]
+    expected = RuleVerifier(grounding_vocabulary(json_groundings), progress=False).verify_rules(
+        rules, load_grounding_set(json_groundings))
+    for workers in (1, 2, 1):
+        results = run(rules, workers)
+        assert [results[rule] for rule in rules] == expected
+    assert results["is_cube(X) <- d(X)"]["overall_consistency"] == 0.75
+
+
+def test_screening_keeps_settled_definitions(tmp_path):
+    # Red objects are cubes 10% of the time: a scene of two objects is
+    # consistent with is_cube(X) <- is_red(X) with probability 0.3025.
+    groundings = write_json_groundings(tmp_path / "groundings", num_scenes=400, seed=5, red_cube=(0.1, 0.5))
+    rules = ["d(X) <- is_red(X)", "is_cube(X) <- d(X)", "is_cube(X) <- is_red(X)"]
+    screened = {result["rule"]: result for result in screen_rules(rules, groundings, block=16)}
+
+    # d(X) <- is_red(X) holds everywhere and settles first; is_cube(X) <- d(X)
+    # must still see d defined and screen exactly like the rule it unfolds to.
+    assert screened["d(X) <- is_red(X)"]["decision"] == "keep"
+    derived, direct = screened["is_cube(X) <- d(X)"], screened["is_cube(X) <- is_red(X)"]
+    assert derived["decision"] == direct["decision"] == "prune"
+    assert derived["estimate"] == direct["estimate"]
+    assert derived["scenes"] == direct["scenes"] < 400
+
+
+def test_store_verification_matches_json_dir(json_groundings, tmp_path):
+    def consistency(results):
+        return [(r["rule"], r["method"], r["overall_consistency"]) for r in results]
+
+    predicates = grounding_vocabulary(json_groundings)
+    verifier = RuleVerifier(predicates, progress=False)
+    expected = consistency(verifier.verify_rules(RULES, load_grounding_set(json_groundings)))
+
+    # Relations from object positions, then from a precomputed relation store
+    store_dir = convert_json_dir(json_groundings, str(tmp_path / "store"))
+    for _ in range(2):
+        assert grounding_vocabulary(store_dir) == predicates
+        assert consistency(verifier.verify_rules(RULES, load_grounding_set(store_dir))) == expected
+        write_relation_store(store_dir, load_grounding_scenes(json_groundings))
@@ -1,14 +1,37 @@
 import json
+import argparse
 import torch
 from torch import nn, optim
 import matplotlib.pyplot as plt
 import ltn
-from z3 import Solver, Real
+from z3 import Solver, Real, sat as z3_sat
+from export_torchscript import script_module, save_artifact, report, ATOL, INT8_ATOL
+from data_utils_clevr import (pad_scene_features, iter_scene_batches, gather_scene_batch, pair_mask,
+                              scene_pairs, RelationPredicate)
+from spatial_relations import RELATION_NAMES, pad_relation_tensors
+
+parser = argparse.ArgumentParser(description="Train rubber/metal nets with a fuzzy-logic loss")
+parser.add_argument("--scripted", action="store_true",
+                    help="Evaluate the LTN predicates with TorchScript artifacts of the trained nets")
+parser.add_argument("--quantize", action="store_true",
+                    help="int8 dynamic quantization of the TorchScript artifacts")
+parser.add_argument("--epochs", type=int, default=5)
+parser.add_argument("--batch-size", type=int, default=64, help="Scenes per batch")
+parser.add_argument("--accum-steps", type=int, default=1, help="Batches per optimizer step")
+parser.add_argument("--no-shuffle", action="store_true", help="Visit scenes in file order")
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
 
 # ─── 1) Load CLEVR val scenes ──────────────────────────────────────────────────
 with open("CLEVR_v1.0/scenes/CLEVR_val_scenes.json","r") as f:
     data = json.load(f)["scenes"]
 
+# x-coordinates of every scene with at least one pair, padded once to [S, Nmax, 1],
+# and the precomputed left-of matrices [S, Nmax, Nmax] from the CLEVR relationships
+train_scenes = [scene for scene in data if len(scene["objects"]) >= 2]
+features, mask = pad_scene_features(train_scenes, lambda o: [o["3d_coords"][0]])
+left_of = torch.from_numpy(pad_relation_tensors(train_scenes)[:, RELATION_NAMES.index("is_left_of")]).float()
+
 # ─── 2) Define neural “rubberness” and “metalness” nets ───────────────────────
 class RubberNet(nn.Module):
     def __init__(self):
@@ -24,48 +47,51 @@ class MetalNet(nn.Module):
     def forward(self, x):
         return torch.sigmoid(self.fc(x)).squeeze(1)  # → [N]
 
+torch.manual_seed(args.seed)
 rubber_net = RubberNet()
 metal_net  = MetalNet()
 opt = optim.Adam(list(rubber_net.parameters()) + list(metal_net.parameters()), lr=1e-2)
+generator = torch.Generator().manual_seed(args.seed)
 
 # ─── 3) Training loop with fuzzy‐logic loss ───────────────────────────────────
-epochs = 5
+epochs = args.epochs
 avg_sat_list, avg_loss_list = [], []
 
 for epoch in range(1, epochs+1):
     total_loss = 0.0
     total_sat  = 0.0
     count      = 0
-
-    for scene in data:
-        objs = scene["objects"]
-        N    = len(objs)
-        if N < 2: 
-            continue
-
-        # x‐coords and ground‐truth metal mask
-        xs = torch.tensor([[o["3d_coords"][0]] for o in objs], dtype=torch.float32)  # [N,1]
-        # Predict
-        pred_rub = rubber_net(xs)   # [N]
-        pred_met = metal_net(xs)    # [N]
-        
-        # Fuzzy‐implication: (rubber_i ∧ metal_j) → left
-        for i in range(N):
-            for j in range(N):
-                if i == j: continue
-                left_ij = 1.0 if xs[i] < xs[j] else 0.0
-                sat_ij  = pred_rub[i] * pred_met[j] * left_ij
-                total_loss += (1.0 - sat_ij)
-                total_sat  += sat_ij.item()
-                count     += 1
-
-    # Backpropagate average loss
     opt.zero_grad()
-    (total_loss / count).backward()
-    opt.step()
 
-    avg_sat  = total_sat / count              # this is already a Python float
-    avg_loss = (total_loss / count).item()    # .item() gives a float
+    batches = list(iter_scene_batches(len(train_scenes), args.batch_size,
+                                      shuffle=not args.no_shuffle, generator=generator))
+    for step, batch_idx in enumerate(batches):
+        xs, valid = gather_scene_batch(features, mask, batch_idx)  # [B,N,1], [B,N]
+        B, N, _ = xs.shape
+
+        # Predict once per object
+        pred_rub = rubber_net(xs.view(-1, 1)).view(B, N)   # [B,N]
+        pred_met = metal_net(xs.view(-1, 1)).view(B, N)    # [B,N]
+
+        # Fuzzy‐implication for all ordered pairs: (rubber_i ∧ metal_j) → left
+        left = left_of[batch_idx, :N, :N]                              # [B,N,N]
+        sat  = pred_rub[:, :, None] * pred_met[:, None, :] * left     # [B,N,N]
+        pairs = pair_mask(valid)
+        n_pairs   = int(pairs.sum())
+        batch_sat = sat[pairs].sum()
+
+        # Backpropagate the batch's average loss; step every accum_steps batches
+        ((1.0 - batch_sat / n_pairs) / args.accum_steps).backward()
+        if (step + 1) % args.accum_steps == 0 or step + 1 == len(batches):
+            opt.step()
+            opt.zero_grad()
+
+        total_sat  += batch_sat.item()
+        total_loss += n_pairs - batch_sat.item()
+        count      += n_pairs
+
+    avg_sat  = total_sat / count
+    avg_loss = total_loss / count
 
     avg_sat_list.append(avg_sat)
     avg_loss_list.append(avg_loss)
@@ -91,57 +117,58 @@ plt.show()
 # ─── 5) Save & reload into LTNtorch predicates ───────────────────────────────
 torch.save(rubber_net.state_dict(), "rubber_net.pt")
 torch.save(metal_net.state_dict(),  "metal_net.pt")
-
-# Wrapper classes for LTN
-class RubberLTNModel(nn.Module):
-    def __init__(self):
-        super().__init__()
-        self.net = RubberNet()
-        self.net.load_state_dict(torch.load("rubber_net.pt"))
-    def forward(self, x, idx):
-        i = idx.item() if not hasattr(idx, "value") else idx.value.item()
-        return self.net(x)[i]
-
-class MetalLTNModel(nn.Module):
-    def __init__(self):
-        super().__init__()
-        self.net = MetalNet()
-        self.net.load_state_dict(torch.load("metal_net.pt"))
-    def forward(self, x, idx):
-        i = idx.item() if not hasattr(idx, "value") else idx.value.item()
-        return self.net(x)[i]
-
-class LeftOfModel(nn.Module):
-    def forward(self, x1, x2):
-        return (x1 < x2).float()
-
-RubberLTN = ltn.Predicate(RubberLTNModel())
-MetalLTN  = ltn.Predicate(MetalLTNModel())
-LeftOf    = ltn.Predicate(LeftOfModel())
-
-# Evaluate LTN logic satisfaction across scenes
-ltotal, lcount = 0.0, 0
-for scene in data:
-    objs = scene["objects"]; N=len(objs)
-    if N<2: continue
-    coords = torch.tensor([[o["3d_coords"][0]] for o in objs], dtype=torch.float32)
-    X_data = ltn.Constant(coords)
-    for i in range(N):
-        for j in range(N):
-            if i==j: continue
-            r = RubberLTN(X_data, ltn.Constant(torch.tensor(i))).value
-            m = MetalLTN (X_data, ltn.Constant(torch.tensor(j))).value
-            l = LeftOf   (ltn.Constant(coords[i].unsqueeze(0)), ltn.Constant(coords[j].unsqueeze(0))).value
-            sat = (r * m * l).item()
-            ltotal  += sat
-            lcount  += 1
-print(f"LTN Logic Satisfaction (loaded nets): {ltotal/lcount:.4f}")
+if args.scripted:
+    example = torch.zeros(1, 1)
+    save_artifact(script_module(rubber_net, example, args.quantize), "rubber_net_scripted.pt", {"quantized": args.quantize})
+    save_artifact(script_module(metal_net, example, args.quantize), "metal_net_scripted.pt", {"quantized": args.quantize})
+
+def load_nets(scripted=False):
+    """The trained (rubber, metal) nets, eager from the state dicts or the TorchScript artifacts"""
+    if scripted:
+        return torch.jit.load("rubber_net_scripted.pt"), torch.jit.load("metal_net_scripted.pt")
+    rubber, metal = RubberNet(), MetalNet()
+    rubber.load_state_dict(torch.load("rubber_net.pt"))
+    metal.load_state_dict(torch.load("metal_net.pt"))
+    return rubber.eval(), metal.eval()
+
+# Individuals are rows (scene, object, x-coordinate) of the distinct pairs
+# within each scene (scene_pairs, paired by ltn.diag); the nets only see the
+# x-coordinate.
+And    = ltn.Connective(ltn.fuzzy_ops.AndProd(stable=False))
+Forall = ltn.Quantifier(ltn.fuzzy_ops.AggregPMean(p=1, stable=False), quantifier="f")
+LeftOf = ltn.Predicate(RelationPredicate(left_of))  # same left_of table as training
+
+def ltn_satisfaction(rubber_net, metal_net):
+    """Forall x, y (x != y): Rubber(x) & Metal(y) & LeftOf(x, y) over all training scenes"""
+    RubberLTN = ltn.Predicate(func=lambda o: rubber_net(o[..., 2:]))
+    MetalLTN  = ltn.Predicate(func=lambda o: metal_net(o[..., 2:]))
+    ltotal, lcount = 0.0, 0
+    with torch.no_grad():
+        for batch_idx in iter_scene_batches(len(train_scenes), args.batch_size, shuffle=False):
+            xs, valid = gather_scene_batch(features, mask, batch_idx)
+            first, second = scene_pairs(xs, valid, batch_idx)
+            o1, o2 = ltn.diag(ltn.Variable("x", first), ltn.Variable("y", second))
+            rule = And(And(RubberLTN(o1), MetalLTN(o2)), LeftOf(o1, o2))
+            sat = Forall([o1, o2], rule).value
+            n_pairs = len(first)
+            ltotal += sat.item() * n_pairs
+            lcount += n_pairs
+    return ltotal / lcount
+
+print(f"LTN Logic Satisfaction (loaded nets): {ltn_satisfaction(*load_nets()):.4f}")
+if args.scripted:
+    label = "int8 TorchScript" if args.quantize else "TorchScript"
+    print(f"LTN Logic Satisfaction ({label} nets): {ltn_satisfaction(*load_nets(scripted=True)):.4f}")
+    atol = INT8_ATOL if args.quantize else ATOL
+    for name, eager, scripted in zip(("rubber_net_scripted.pt", "metal_net_scripted.pt"),
+                                     load_nets(), load_nets(scripted=True)):
+        report(name, eager, scripted, features[mask], atol)
 
 # ─── 6) Z3 Synthesis Example ──────────────────────────────────────────────────
 x_r, x_m = Real("x_r"), Real("x_m")
 s = Solver()
 s.add(x_r < x_m)
-if s.check().r == s.check().r.sat:
+if s.check() == z3_sat:
     m = s.model()
     print("Z3 example:", m[x_r], "<", m[x_m])
 
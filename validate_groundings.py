@@ -1,16 +1,27 @@
 import json, os
+import numpy as np
+from grounding_store import GroundingStore, is_grounding_store, json_scene_files
 
-GROUNDINGS_DIR = "data/groundings"
+GROUNDINGS_DIR = os.getenv("GROUNDINGS_DIR", "data/groundings")
 EXPECTED_PREDICATES = 15  # set to 8 if that's the expected number
 
 error_count = 0
 
-for filename in os.listdir(GROUNDINGS_DIR):
-    if filename.endswith(".json"):
+if is_grounding_store(GROUNDINGS_DIR):
+    # Columnar store: count present (non-NaN) predicates for every object at once.
+    store = GroundingStore(GROUNDINGS_DIR)
+    found = np.count_nonzero(~np.isnan(store.truth), axis=1)
+    for row in np.flatnonzero(found != EXPECTED_PREDICATES):
+        scene_idx = int(store.object_scene[row])
+        obj_idx = int(row - store.scene_offsets[scene_idx])
+        print(f" Error in {store.scene_name(scene_idx)} — object {obj_idx}: Expected {EXPECTED_PREDICATES} predicates, found {found[row]}")
+        error_count += 1
+else:
+    for filename in json_scene_files(GROUNDINGS_DIR):
         path = os.path.join(GROUNDINGS_DIR, filename)
         with open(path, "r") as f:
             scene = json.load(f)
-        
+
         for obj in scene.get("objects", []):
             preds = obj.get("predicates", {})
             if len(preds) != EXPECTED_PREDICATES:
@@ -1,87 +1,549 @@
 # verify_rule_consistency.py
 import os
 import json
-from z3 import *
+import hashlib
+import argparse
+import math
+import itertools
+import multiprocessing
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import z3
 from tqdm import tqdm
+from grounding_store import GroundingStore, is_grounding_store, json_scene_files
+from spatial_relations import load_relation_store
+from rule_ast import (Atom, CompiledRule, GroundingTensor, Rule, canonical_rule, compile_rule, dedupe_rules,
+                      parse_rule)
+from rule_cache import open_rule_cache
+from prune_rules import THRESHOLD as PRUNE_THRESHOLD
+from results_store import FORMATS, save_results
 
-GROUNDINGS_DIR = "data/groundings"
+# ─── Batch rule verification ────────────────────────────────────────────────
+# A rule is consistent in a scene if no binding of its variables to the
+# scene's objects makes every body atom true and the head false. Groundings
+# count as true at >= THRESHOLD; missing groundings are false.
+#
+# Rules whose atoms are all grounded (predicate columns, relation tensors)
+# are decided for all scenes at once by threshold checks over the compiled
+# rule (rule_ast.CompiledRule). Rules mentioning atoms without groundings,
+# e.g. derived predicates, go to Z3: one solver per batch of such rules holds
+# a scene's facts and the completion of the batch's definitions (rules with
+# an ungrounded head): a derived atom holds iff some definition derives it,
+# so undefined atoms are false like missing groundings. A rule is consistent
+# in the scene if no model of these violates it.
+#
+# For screening many candidates, ``screen_rules`` estimates each rule's scene
+# consistency rate from scenes drawn in random order, a block at a time. A
+# rule is settled as soon as its confidence interval (Wilson or Hoeffding)
+# lies entirely above or below prune_rules.THRESHOLD. The error budget is
+# split over the looks as delta * 6 / (pi^2 t^2), so each rule's intervals
+# hold jointly however many blocks it takes: every single decision is wrong
+# with probability at most delta. This is not a family-wise guarantee; across
+# R rules about delta * R wrong decisions are expected at worst.
+#
+# Full results are written bit-packed (results_store) next to RESULTS_FILE
+# by default; --format json|both also writes the JSON list.
+GROUNDINGS_DIR = os.getenv("GROUNDINGS_DIR", "data/groundings")
+RULES_FILE = "synthesized_rules.json"
+RESULTS_FILE = "rule_verification_results.json"
 THRESHOLD = 0.5  # Predicate considered True if >= threshold
-MAX_SCENES = 100  # Limit for testing
+Z3_BATCH = 32    # Symbolic rules sharing one solver
+SHARDS_PER_WORKER = 4  # Scene shards queued per worker process (--workers)
+SCREENING_FILE = "rule_screening_results.json"
+SCREEN_BLOCK = 32      # Scenes sampled between two looks (--sequential)
+BOUNDS = ("wilson", "hoeffding")
 
-def is_rule_consistent(obj_id, preds):
-    s = Solver()
 
-    is_cube = Bool(f"is_cube_{obj_id}")
-    is_red = Bool(f"is_red_{obj_id}")
+class GroundingSet(NamedTuple):
+    tensor: GroundingTensor
+    scene_names: List[str]
+    object_ids: List[List]        # Per scene, the id of every object (as in the groundings)
 
-    cube_val = preds.get("is_cube", 0.0) >= THRESHOLD
-    red_val = preds.get("is_red", 0.0) >= THRESHOLD
 
-    s.add(is_cube == cube_val)
-    s.add(is_red == red_val)
+def iter_grounding_scenes(groundings_dir, max_scenes=None, start=0):
+    """
+    Yield (scene_name, scene) pairs from a grounding store or JSON directory
+    (in file name order), for scenes ``start`` up to ``max_scenes``.
+    Precomputed relation matrices are attached as scene["relations"].
+    Stores are rebuilt into scene dicts here for legacy callers only;
+    load_grounding_set reads them as a matrix.
+    """
+    relations = load_relation_store(groundings_dir)
 
-    # Rule: is_red(X) ← is_cube(X) → ¬(is_cube ∧ ¬is_red) should be unsatisfiable
-    s.push()
-    s.add(is_cube == True, is_red == False)
-    result = s.check()
-    debug_msg = f"Debug: obj_id={obj_id}, is_cube={cube_val}, is_red={red_val}, result={result}"
-    print(debug_msg)
-    s.pop()
+    def with_relations(scene):
+        if relations is not None and 0 <= scene.get("scene_id", -1) < len(relations):
+            scene["relations"] = relations.scene_dict(scene["scene_id"])
+        return scene
 
-    return result == unsat
+    if is_grounding_store(groundings_dir):
+        store = GroundingStore(groundings_dir)
+        total = len(store) if not max_scenes else min(max_scenes, len(store))
+        for scene_idx in range(start, total):
+            yield store.scene_name(scene_idx), with_relations(store.scene(scene_idx))
+        return
 
-def verify_rule_on_scenes():
-    print("\n🚀 Starting rule verification: IF is_red THEN is_cube\n")
+    scene_files = json_scene_files(groundings_dir)
+    if max_scenes:
+        scene_files = scene_files[:max_scenes]
+    for filename in scene_files[start:]:
+        with open(os.path.join(groundings_dir, filename)) as f:
+            yield filename, with_relations(json.load(f))
 
-    consistent_count = 0
-    inconsistent_scenes = []
+def count_grounding_scenes(groundings_dir, max_scenes=None):
+    """Number of scenes ``iter_grounding_scenes`` will yield"""
+    if is_grounding_store(groundings_dir):
+        total = len(GroundingStore(groundings_dir))
+    else:
+        total = len(json_scene_files(groundings_dir))
+    return min(total, max_scenes) if max_scenes else total
 
-    if not os.path.exists(GROUNDINGS_DIR):
-        print(f"❌ Groundings directory not found: {GROUNDINGS_DIR}")
-        return
+def grounding_vocabulary(groundings_dir, max_scenes=None) -> List[str]:
+    """
+    Predicates grounded anywhere in the groundings: the columns of a store,
+    or every name some object of a JSON directory carries. Passed to
+    RuleVerifier so that a subset of scenes classifies rules like the whole.
+    """
+    if is_grounding_store(groundings_dir):
+        return list(GroundingStore(groundings_dir).predicates)
+    names = {}
+    for _, scene in iter_grounding_scenes(groundings_dir, max_scenes):
+        for obj in scene.get("objects", []):
+            names.update(dict.fromkeys(obj.get("predicates", {})))
+    return list(names)
+
+def scene_grounding_set(named_scenes: Sequence[Tuple[str, Dict]]) -> GroundingSet:
+    """GroundingSet of (scene_name, scene dict) pairs"""
+    names = [name for name, _ in named_scenes]
+    scenes = [scene for _, scene in named_scenes]
+    object_ids = [[obj.get("id", f"{name}_obj{i}") for i, obj in enumerate(scene.get("objects", []))]
+                  for name, scene in named_scenes]
+    return GroundingSet(GroundingTensor.from_scenes(scenes), names, object_ids)
+
+def load_grounding_set(groundings_dir, max_scenes=None, start=0) -> GroundingSet:
+    """
+    GroundingSet of scenes ``start`` up to ``max_scenes`` (all by default). A
+    grounding store is wrapped as a matrix without rebuilding scene dicts,
+    reading only the rows of those scenes.
+    """
+    if not is_grounding_store(groundings_dir):
+        return scene_grounding_set(list(iter_grounding_scenes(groundings_dir, max_scenes, start)))
+
+    store = GroundingStore(groundings_dir)
+    total = count_grounding_scenes(groundings_dir, max_scenes)
+    tensor = GroundingTensor.from_store(store, start, total)
+    names = [store.scene_name(i) for i in range(start, total)]
+    object_ids = [[f"{name}_obj{i}" for i in range(size)] for name, size in zip(names, tensor.sizes.tolist())]
+    return GroundingSet(tensor, names, object_ids)
+
+def take_scenes(groundings: GroundingSet, scenes: Sequence[int]) -> GroundingSet:
+    """GroundingSet of the given scenes (by index) of ``groundings``"""
+    return GroundingSet(groundings.tensor.take(scenes),
+                        [groundings.scene_names[s] for s in scenes],
+                        [groundings.object_ids[s] for s in scenes])
+
+
+class RuleVerifier:
+    """
+    Checks many rules against one GroundingSet. ``predicates`` are names whose
+    missing groundings read as false even if no object carries them; any
+    other name without groundings makes a rule symbolic (checked by Z3).
+    """
 
-    scene_files = [f for f in os.listdir(GROUNDINGS_DIR) if f.endswith(".json")]
-    if MAX_SCENES:
-        scene_files = scene_files[:MAX_SCENES]
-    total_files = len(scene_files)
+    def __init__(self, predicates: Optional[List[str]] = None, threshold: float = THRESHOLD,
+                 z3_batch: int = Z3_BATCH, progress: bool = True):
+        self.predicates = set(predicates or [])
+        self.threshold = threshold
+        self.z3_batch = z3_batch
+        self.progress = progress
 
-    print(f"🧾 Found {total_files} scene files.\n")
+    def _grounded(self, atom: Atom, tensor: GroundingTensor) -> bool:
+        if atom.arity == 1:
+            return atom.name in self.predicates or tensor.has_predicate(atom.name)
+        if atom.arity == 2:
+            return tensor.has_relation(atom.name)
+        return False
 
-    all_scores = []
-    for idx, filename in enumerate(tqdm(scene_files, desc="🔍 Checking scenes")):
-        with open(os.path.join(GROUNDINGS_DIR, filename)) as f:
-            scene = json.load(f)
+    def definition_candidates(self, rules: Sequence[str]) -> List[str]:
+        """
+        Canonical forms of the ``rules`` that may define derived atoms: every
+        rule whose head is not a known predicate (binary heads count too, as
+        relations are only grounded where a relation tensor exists). A
+        superset of the definitions verify_rules uses, known without the data.
+        """
+        candidates = set()
+        for rule in rules:
+            head = parse_rule(rule).head
+            if head.arity != 1 or head.name not in self.predicates:
+                candidates.add(canonical_rule(rule))
+        return sorted(candidates)
 
-        for i, obj in enumerate(scene.get("objects", [])):
-            obj_id = obj.get("id", f"{filename}_obj{i}")
-            obj["id"] = obj_id
+    def verify_rules(self, rules: List[str], groundings: GroundingSet,
+                     definitions: Sequence[str] = ()) -> List[Dict]:
+        """
+        One result per rule, in ``rules`` order:
+        {"rule", "consistency_scores" (per scene, True if consistent),
+        "overall_consistency" (fraction of consistent scenes), "violations"
+        (violating bindings), "counterexamples" ([{"scene", "objects"}],
+        objects bound to the first variable of a violating binding), "method"}
+        Rules of ``definitions`` with an ungrounded head define derived atoms
+        alongside those of ``rules`` but are not checked themselves, so a
+        subset of a rule list is verified like the whole list.
+        """
+        tensor = groundings.tensor
+        parsed = [parse_rule(rule) for rule in rules]
+        symbolic = [i for i, rule in enumerate(parsed)
+                    if not all(self._grounded(atom, tensor) for atom in rule.atoms)]
+        symbolic_set = set(symbolic)
 
-            preds = obj.get("predicates", {})
-            if not preds:
-                continue
+        results = [None] * len(rules)
+        for i, rule in enumerate(rules):
+            if i not in symbolic_set:
+                violations = compile_rule(rule).violations(tensor, self.threshold)
+                per_object = CompiledRule.per_object(violations)
+                results[i] = self._result(rule, "vectorized", int(violations.sum()),
+                                          [np.flatnonzero(row).tolist() for row in per_object], groundings)
 
-            consistent = is_rule_consistent(obj_id, preds)
-            all_scores.append(consistent)
-            if consistent:
-                consistent_count += 1
+        # Every batch sees all definitions, whichever batch they are checked in
+        defining = dict.fromkeys(canonical_rule(rule) for rule in list(rules) + list(definitions))
+        definitions = [rule for rule in map(parse_rule, defining) if not self._grounded(rule.head, tensor)]
+        for start in range(0, len(symbolic), self.z3_batch):
+            batch = symbolic[start:start + self.z3_batch]
+            verdicts = self._verify_symbolic([parsed[i] for i in batch], definitions, groundings)
+            for i, (count, objects) in zip(batch, verdicts):
+                results[i] = self._result(rules[i], "z3", count, objects, groundings)
+        return results
+
+    @staticmethod
+    def merge(shards: List[List[Dict]]) -> List[Dict]:
+        """
+        Combine the verify_rules results of consecutive scene shards (same
+        rules, shards in scene order) into the results for all their scenes
+        """
+        merged = []
+        for parts in zip(*shards):
+            scores = [score for part in parts for score in part["consistency_scores"]]
+            merged.append({
+                "rule": parts[0]["rule"],
+                "consistency_scores": scores,
+                "overall_consistency": float(np.mean(scores)) if scores else 1.0,
+                "violations": sum(part["violations"] for part in parts),
+                "counterexamples": [example for part in parts for example in part["counterexamples"]],
+                "method": parts[0]["method"],
+            })
+        return merged
+
+    @staticmethod
+    def _result(rule: str, method: str, violations: int, violating_objects: List[List[int]],
+                groundings: GroundingSet) -> Dict:
+        scores = [not objects for objects in violating_objects]
+        counterexamples = [
+            {"scene": groundings.scene_names[s], "objects": [groundings.object_ids[s][i] for i in objects]}
+            for s, objects in enumerate(violating_objects) if objects
+        ]
+        return {
+            "rule": rule,
+            "consistency_scores": scores,
+            "overall_consistency": float(np.mean(scores)) if scores else 1.0,
+            "violations": violations,
+            "counterexamples": counterexamples,
+            "method": method,
+        }
+
+    def _atom_expr(self, atom: Atom, binding: Dict[str, int], scene_idx: int,
+                   tensor: GroundingTensor) -> z3.BoolRef:
+        """Grounded atoms become constants of the scene, others Booleans constrained by the definitions"""
+        objects = [binding[var] for var in atom.args]
+        if self._grounded(atom, tensor):
+            if atom.arity == 1:
+                value = tensor.column(atom.name)[scene_idx, objects[0]]
             else:
-                inconsistent_scenes.append((filename, obj_id, preds))
+                value = tensor.relation(atom.name)[scene_idx, objects[0], objects[1]]
+            return z3.BoolVal(bool(value >= self.threshold))  # NaN (missing) compares false
+        return z3.Bool(f"{atom.name}({','.join(map(str, objects))})")
 
-    print("\n✅ Rule verification complete.")
-    print(f"✅ Rule holds in {consistent_count} objects.")
-    print(f"❌ Inconsistent in {len(inconsistent_scenes)} objects.")
+    def _instances(self, rule: Rule, num_objects: int, scene_idx: int, tensor: GroundingTensor):
+        """(binding, body expressions, head expression) for every binding of ``rule`` in one scene"""
+        for objects in itertools.product(range(num_objects), repeat=rule.arity):
+            binding = dict(zip(rule.variables, objects))
+            body = [self._atom_expr(atom, binding, scene_idx, tensor) for atom in rule.body]
+            yield objects, body, self._atom_expr(rule.head, binding, scene_idx, tensor)
+
+    def _verify_symbolic(self, rules: List[Rule], definitions: List[Rule],
+                         groundings: GroundingSet) -> List[Tuple[int, List[List[int]]]]:
+        """
+        (violating bindings, per-scene violating objects) of every rule, from
+        one Z3 solver. Per scene the completed definitions are asserted once;
+        each rule's violation is then checked in its own scope. Atoms that no
+        definition derives are false.
+        """
+        tensor = groundings.tensor
+        counts = [0] * len(rules)
+        objects = [[] for _ in rules]
+        solver = z3.Solver()
+
+        for s in tqdm(range(tensor.num_scenes), desc="🔍 Checking symbolic rules", disable=not self.progress):
+            n = int(tensor.sizes[s])
+            defining = [inst for rule in definitions for inst in self._instances(rule, n, s, tensor)]
+            checked = [list(self._instances(rule, n, s, tensor)) for rule in rules]
+
+            solver.push()
+            # Clark completion: every derived atom equals the disjunction of
+            # the definition bodies deriving it; atoms nothing derives are false
+            derivations = {}
+            for _, body, head in defining:
+                derivations.setdefault(str(head), (head, []))[1].append(z3.And(*body))
+            for head, bodies in derivations.values():
+                solver.add(head == z3.Or(*bodies))
+            instances = defining + [inst for insts in checked for inst in insts]
+            free = {str(atom): atom for _, body, head in instances for atom in body + [head]
+                    if z3.is_const(atom) and not (z3.is_true(atom) or z3.is_false(atom))}
+            for name, atom in free.items():
+                if name not in derivations:
+                    solver.add(z3.Not(atom))
+
+            for r, insts in enumerate(checked):
+                violated = []
+                cases = [(binding, z3.And(*body, z3.Not(head))) for binding, body, head in insts]
+                solver.push()
+                solver.add(z3.Or(*[case for _, case in cases]))
+                if cases and solver.check() == z3.sat:
+                    model = solver.model()
+                    violated = [binding for binding, case in cases
+                                if z3.is_true(model.eval(case, model_completion=True))]
+                solver.pop()
+                counts[r] += len(violated)
+                objects[r].append(sorted({binding[0] for binding in violated if binding}))
+            solver.pop()
+        return list(zip(counts, objects))
+
+    def verify_rule(self, rule: str, scene: Dict) -> Tuple[bool, List[str]]:
+        """(consistent, counterexample object ids) of one rule in one scene dict"""
+        groundings = scene_grounding_set([(str(scene.get("scene_id", "scene")), scene)])
+        result = self.verify_rules([rule], groundings)[0]
+        examples = result["counterexamples"]
+        return result["consistency_scores"][0], examples[0]["objects"] if examples else []
 
-    if inconsistent_scenes:
-        print("\n⚠️ Example inconsistencies:")
-        for scene, obj_id, pred in inconsistent_scenes[:5]:
-            print(f"  Scene: {scene}, Object ID: {obj_id} -> Predicates: {pred}")
 
-    # Save results
-    results = [{"rule": "is_red(X) <- is_cube(X)", "consistency_scores": all_scores}]
-    with open("rule_verification_results.json", "w") as f:
+def verify_rules_parallel(rules: List[str], groundings_dir, workers: int, max_scenes=None,
+                          predicates=None, threshold=THRESHOLD,
+                          shards_per_worker: int = SHARDS_PER_WORKER, definitions: Sequence[str] = ()) -> List[Dict]:
+    """
+    RuleVerifier.verify_rules over contiguous scene shards in ``workers``
+    processes. Every worker reads only its shard (a memory-mapped store is
+    shared through the page cache); shard results are merged in scene order,
+    so the output is identical for any number of workers.
+    """
+    total = count_grounding_scenes(groundings_dir, max_scenes)
+    num_shards = max(1, min(total, workers * shards_per_worker))
+    bounds = np.linspace(0, total, num_shards + 1).astype(int)
+    tasks = [(groundings_dir, int(start), int(stop), rules, predicates, threshold, list(definitions))
+             for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+    if not tasks:
+        tasks = [(groundings_dir, 0, 0, rules, predicates, threshold, list(definitions))]
+    print(f"🧵 Verifying {len(rules)} rules on {total} scenes in {len(tasks)} shards on {workers} workers...")
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers) as pool:
+        shards = list(tqdm(pool.imap(_verify_shard, tasks), total=len(tasks), desc="🔍 Verifying shards"))
+    return RuleVerifier.merge(shards)
+
+def _verify_shard(task):
+    """Verify all rules on scenes [start, stop) of the groundings"""
+    groundings_dir, start, stop, rules, predicates, threshold, definitions = task
+    groundings = load_grounding_set(groundings_dir, stop, start)
+    return RuleVerifier(predicates, threshold, progress=False).verify_rules(rules, groundings, definitions)
+
+def confidence_interval(successes: int, trials: int, delta: float, bound: str = "wilson") -> Tuple[float, float]:
+    """Two-sided 1 - delta interval for a Bernoulli rate (Wilson score or Hoeffding)"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    if bound == "hoeffding":
+        eps = math.sqrt(math.log(2 / delta) / (2 * trials))
+        return max(0.0, p - eps), min(1.0, p + eps)
+    z = NormalDist().inv_cdf(1 - delta / 2)
+    denom = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+def screen_rules(rules: List[str], groundings_dir, threshold=PRUNE_THRESHOLD, confidence=0.95,
+                 bound="wilson", block=SCREEN_BLOCK, max_scenes=None, seed=0, predicates=None) -> List[Dict]:
+    """
+    Sequential-sampling screen of ``rules`` against ``threshold``. Returns per
+    rule {"rule", "decision" ("keep" / "prune"), "estimate" (consistent
+    fraction of the sampled scenes), "interval", "scenes" and "objects"
+    sampled, "exhausted" (settled only after every scene)}.
+    """
+    groundings = load_grounding_set(groundings_dir, max_scenes)
+    tensor = groundings.tensor
+    predicates = list(predicates or []) + grounding_vocabulary(groundings_dir, max_scenes)
+    verifier = RuleVerifier(predicates, THRESHOLD, progress=False)
+    order = np.random.default_rng(seed).permutation(tensor.num_scenes)
+    delta = 1 - confidence
+
+    consistent = np.zeros(len(rules), dtype=np.int64)
+    scenes = np.zeros(len(rules), dtype=np.int64)
+    objects = np.zeros(len(rules), dtype=np.int64)
+    intervals = [(0.0, 1.0)] * len(rules)
+    decisions = [None] * len(rules)
+    active = list(range(len(rules)))
+
+    looks = range(0, tensor.num_scenes, block)
+    for look, start in enumerate(tqdm(looks, desc="🎲 Screening rules"), 1):
+        sample = order[start:start + block]
+        # Settled rules still define derived atoms for the undecided ones
+        results = verifier.verify_rules([rules[i] for i in active], take_scenes(groundings, sample),
+                                        definitions=rules)
+        delta_look = delta * 6 / (math.pi ** 2 * look ** 2)
+        for i, result in zip(active, results):
+            consistent[i] += sum(result["consistency_scores"])
+            scenes[i] += len(sample)
+            objects[i] += int(tensor.sizes[sample].sum())
+            intervals[i] = confidence_interval(int(consistent[i]), int(scenes[i]), delta_look, bound)
+            if intervals[i][0] >= threshold:
+                decisions[i] = "keep"
+            elif intervals[i][1] < threshold:
+                decisions[i] = "prune"
+        active = [i for i in active if decisions[i] is None]
+        if not active:
+            break
+
+    screened = []
+    for i, rule in enumerate(rules):
+        estimate = float(consistent[i] / scenes[i]) if scenes[i] else 1.0
+        exhausted = decisions[i] is None
+        if exhausted:
+            # Every scene was seen, so the estimate is the exact rate
+            decisions[i] = "keep" if estimate >= threshold else "prune"
+            intervals[i] = (estimate, estimate)
+        screened.append({
+            "rule": rule,
+            "decision": decisions[i],
+            "estimate": estimate,
+            "interval": [float(intervals[i][0]), float(intervals[i][1])],
+            "scenes": int(scenes[i]),
+            "objects": int(objects[i]),
+            "exhausted": exhausted,
+        })
+    return screened
+
+def screen_rules_file(rules_file=RULES_FILE, groundings_dir=GROUNDINGS_DIR, output_file=SCREENING_FILE,
+                      confidence=0.95, bound="wilson", block=SCREEN_BLOCK, max_scenes=None, seed=0):
+    """Screen every distinct rule of ``rules_file`` and write the decisions to ``output_file``"""
+    print(f"\n🚀 Screening rules: {rules_file} against {groundings_dir} "
+          f"(threshold {PRUNE_THRESHOLD}, {confidence:.0%} {bound})\n")
+    rules = dedupe_rules(load_rules(rules_file))
+    results = screen_rules(rules, groundings_dir, PRUNE_THRESHOLD, confidence, bound, block, max_scenes, seed)
+
+    kept = [r for r in results if r["decision"] == "keep"]
+    mean_objects = np.mean([r["objects"] for r in results]) if results else 0.0
+    print(f"\n✅ {len(kept)} kept, {len(results) - len(kept)} pruned, "
+          f"{sum(r['exhausted'] for r in results)} needed every scene; "
+          f"{mean_objects:.0f} objects per rule on average")
+    with open(output_file, "w") as f:
         json.dump(results, f, indent=2)
+    print(f"✅ Results saved to {output_file}")
+    return results
+
+def load_rules(rules_file: str) -> List[str]:
+    """Rule strings of a [rule, score] list, a [{"rule": ...}] list, or a list of strings"""
+    with open(rules_file, "r") as f:
+        entries = json.load(f)
+    rules = []
+    for entry in entries:
+        if isinstance(entry, str):
+            rules.append(entry)
+        elif isinstance(entry, dict):
+            rules.append(entry["rule"])
+        else:
+            rules.append(entry[0])
+    return rules
+
+def verify_rules(rules_file=RULES_FILE, groundings_dir=GROUNDINGS_DIR, output_file=RESULTS_FILE,
+                 max_scenes=None, predicates=None, workers=1, fmt="packed"):
+    """
+    Verify every distinct rule of ``rules_file`` and write the results to
+    ``output_file`` in format ``fmt`` (see results_store.save_results),
+    across ``workers`` processes if more than one
+    """
+    print(f"\n🚀 Starting rule verification: {rules_file} against {groundings_dir}\n")
+
+    if not os.path.exists(groundings_dir):
+        print(f"❌ Groundings directory not found: {groundings_dir}")
+        return []
+
+    rules = dedupe_rules(load_rules(rules_file))
+    predicates = list(predicates or []) + grounding_vocabulary(groundings_dir, max_scenes)
+    verifier = RuleVerifier(predicates, THRESHOLD)
+
+    # Repeat runs over unchanged groundings reuse stored results. Grounded
+    # rules are keyed by the rule alone; symbolic (Z3) results depend on the
+    # definitions in the rule list, so their key also covers those.
+    kind = f"rule_consistency@{max_scenes or 'all'}"
+    definitions = verifier.definition_candidates(rules)
+    digest = hashlib.sha256("\n".join(definitions).encode()).hexdigest()[:16]
+    symbolic_kind = f"{kind}+definitions@{digest}"
+    cache = open_rule_cache(groundings_dir)
+    cached = {}
+    if cache is not None:
+        for rule in rules:
+            result = cache.get(kind, rule, threshold=THRESHOLD) or cache.get(symbolic_kind, rule, threshold=THRESHOLD)
+            if result is not None:
+                cached[rule] = dict(result, rule=rule)
+    pending = [rule for rule in rules if rule not in cached]
+
+    if pending:
+        # Cached definitions still define derived atoms for pending rules
+        if workers > 1:
+            fresh = verify_rules_parallel(pending, groundings_dir, workers, max_scenes, predicates, THRESHOLD,
+                                          definitions=rules)
+        else:
+            groundings = load_grounding_set(groundings_dir, max_scenes)
+            print(f"🧾 Checking {len(pending)} rules on {groundings.tensor.num_scenes} scenes "
+                  f"({len(cached)} cached).")
+            fresh = verifier.verify_rules(pending, groundings, definitions=rules)
+        for result in fresh:
+            cached[result["rule"]] = result
+            if cache is not None:
+                result_kind = kind if result["method"] == "vectorized" else symbolic_kind
+                cache.put(result_kind, result["rule"], result, threshold=THRESHOLD)
+    if cache is not None:
+        cache.close()
+
+    results = [cached[rule] for rule in rules]
+    print("\n✅ Rule verification complete.")
+    for result in results:
+        print(f"  {result['overall_consistency']:.3f}  {result['rule']}  "
+              f"({len(result['counterexamples'])} inconsistent scenes, {result['method']})")
 
-    print("✅ Results saved to rule_verification_results.json")
+    for path in save_results(output_file, results, fmt):
+        print(f"✅ Results saved to {path}")
+    return results
 
 if __name__ == "__main__":
-    verify_rule_on_scenes()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Verify synthesized rules against the groundings")
+    parser.add_argument("--rules", default=RULES_FILE, help="Rules JSON ([rule, score] pairs or {'rule': ...})")
+    parser.add_argument("--groundings", default=GROUNDINGS_DIR, help="Grounding store or JSON directory")
+    parser.add_argument("--output", default=RESULTS_FILE, help="Verification results JSON")
+    parser.add_argument("--max-scenes", type=int, default=None, help="Only check the first N scenes")
+    parser.add_argument("--workers", type=int, default=1, help="Processes verifying scene shards")
+    parser.add_argument("--format", choices=FORMATS, default="packed",
+                        help="Write results bit-packed (.npz next to --output), as JSON, or both")
+    parser.add_argument("--sequential", action="store_true",
+                        help=f"Only decide each rule against prune_rules.THRESHOLD by sequential sampling "
+                             f"(writes {SCREENING_FILE})")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence of each rule's sequential decision (not family-wise across rules)")
+    parser.add_argument("--bound", choices=BOUNDS, default="wilson", help="Confidence interval (--sequential)")
+    parser.add_argument("--block", type=int, default=SCREEN_BLOCK, help="Scenes sampled per look (--sequential)")
+    parser.add_argument("--seed", type=int, default=0, help="Scene order seed (--sequential)")
+    args = parser.parse_args()
+    if args.sequential:
+        output = args.output if args.output != RESULTS_FILE else SCREENING_FILE
+        screen_rules_file(args.rules, args.groundings, output, args.confidence, args.bound,
+                          args.block, args.max_scenes, args.seed)
+    else:
+        verify_rules(args.rules, args.groundings, args.output, args.max_scenes, workers=args.workers,
+                     fmt=args.format)
@@ -4,6 +4,8 @@ import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import os
 from typing import List, Dict, Any
+from rule_ast import CompiledRule, GroundingTensor, compile_rule, parse_rule
+from results_store import load_results
 
 class RuleVisualizer:
     def __init__(self, clevr_dir: str):
@@ -46,14 +48,7 @@ class RuleVisualizer:
         """Highlight objects that satisfy the rule"""
         draw = ImageDraw.Draw(img)
         
-        # Parse rule to identify relevant objects. Support either "<-" or the
-        # Unicode arrow for backward compatibility.
-        if "<-" in rule:
-            head, body = rule.split("<-")
-        else:
-            head, body = rule.split("\u2190")
-        head = head.strip()
-        body = body.strip()
+        head = str(parse_rule(rule).head)
         
         # Get object IDs that satisfy the rule
         satisfied_ids = self._get_satisfied_objects(scene, rule)
@@ -81,37 +76,12 @@ class RuleVisualizer:
     
     def _get_satisfied_objects(self, scene: Dict, rule: str) -> List[str]:
         """Determine which objects satisfy the rule"""
-        satisfied_ids = []
-        
-        # Parse rule to identify relevant objects. Handle both ASCII and
-        # Unicode arrows.
-        if "<-" in rule:
-            head, body = rule.split("<-")
-        else:
-            head, body = rule.split("\u2190")
-        head = head.strip()
-        body = body.strip()
-        
-        # Get predicate names from rule
-        predicates = set()
-        parts = body.split("&") if "&" in body else body.split("\u2227")
-        for part in [head] + parts:
-            pred_name, _ = part.split("(")
-            predicates.add(pred_name.strip())
-        
-        # Check each object
-        for obj in scene["objects"]:
-            satisfies = True
-            for pred in predicates:
-                if pred in obj["predicates"]:
-                    if obj["predicates"][pred] < 0.5:  # threshold for satisfaction
-                        satisfies = False
-                        break
-            
-            if satisfies:
-                satisfied_ids.append(obj["id"])
-        
-        return satisfied_ids
+        # Objects meeting each of the rule's predicates (ones an object
+        # lacks are ignored)
+        groundings = GroundingTensor.from_scenes([scene])
+        body, head, valid = compile_rule(rule).holds(groundings, missing=1.0)
+        satisfied = CompiledRule.per_object(body & head & valid)[0]
+        return [obj["id"] for obj, ok in zip(scene["objects"], satisfied) if ok]
     
     def visualize_rule(self, scene_id: str, rule: str, scene: Dict, output_dir: str):
         """Create visualization of rule satisfaction for a scene"""
@@ -138,8 +108,7 @@ def create_visualizations(rules_file: str, verification_file: str, clevr_dir: st
     with open(rules_file, "r") as f:
         rules = json.load(f)
     
-    with open(verification_file, "r") as f:
-        verification_results = json.load(f)
+    verification_results = load_results(verification_file)
     
     # Initialize visualizer
     visualizer = RuleVisualizer(clevr_dir)